@@ -0,0 +1,161 @@
+from sqlalchemy import text, bindparam
+from datetime import datetime
+import threading
+import json
+import time
+import os
+
+# Materialized business_data aggregates, kept in process and on disk.
+# Chart and aggregation requests read these instead of scanning MySQL;
+# sql_ingest refreshes only the groups it touched, and a scheduler thread
+# does a full refresh every AGGREGATE_REFRESH_SECONDS. Other workers pick
+# up a refresh on their next read, when the cache file's stamp changes.
+CACHE_PATH = "data/aggregate_cache.json"
+REFRESH_SECONDS = int(os.getenv("AGGREGATE_REFRESH_SECONDS", "3600"))
+
+AGGREGATES = {
+    # name -> (group column, query)
+    "sales_by_month": ("month", """
+        SELECT month, SUM(amount) AS total_sales
+        FROM business_data
+        {where}
+        GROUP BY month
+    """),
+    "sales_by_customer": ("customer_name", """
+        SELECT customer_name, SUM(amount) AS total_spent
+        FROM business_data
+        {where}
+        GROUP BY customer_name
+    """),
+}
+
+_state = None  # {"refreshed_at": iso string, name: {group: total}}
+_stamp = None  # (inode, mtime_ns, size) of CACHE_PATH when _state was read or written
+_lock = threading.Lock()
+_scheduler = None
+
+
+def _query(engine, name: str, groups=None) -> dict:
+    column, query = AGGREGATES[name]
+    if groups is None:
+        statement = text(query.format(where=""))
+        params = {}
+    else:
+        statement = text(query.format(where=f"WHERE {column} IN :groups")).bindparams(
+            bindparam("groups", expanding=True)
+        )
+        params = {"groups": list(groups)}
+
+    with engine.connect() as conn:
+        rows = conn.execute(statement, params).fetchall()
+    return {row[0]: float(row[1] or 0) for row in rows}
+
+
+def _file_stamp():
+    try:
+        st = os.stat(CACHE_PATH)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def _save(state: dict):
+    global _stamp
+
+    os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+    tmp_path = CACHE_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, CACHE_PATH)
+    _stamp = _file_stamp()
+
+
+def _load():
+    if not os.path.exists(CACHE_PATH):
+        return None
+    try:
+        with open(CACHE_PATH, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠ Failed to load aggregate cache: {e}")
+        return None
+    return state if all(name in state for name in AGGREGATES) else None
+
+
+def full_refresh(engine) -> dict:
+    """Recompute every aggregate from business_data"""
+    global _state
+
+    state = {name: _query(engine, name) for name in AGGREGATES}
+    state["refreshed_at"] = datetime.utcnow().isoformat() + "Z"
+
+    with _lock:
+        _state = state
+        _save(state)
+    print(f"✓ Refreshed aggregate cache ({len(state['sales_by_month'])} months, {len(state['sales_by_customer'])} customers)")
+    return state
+
+
+def refresh_groups(engine, months=(), customers=()):
+    """
+    Recompute only the months and customers touched by an ingest.
+    Pass the groups changed rows were in before as well as after; groups
+    left without rows are dropped. Falls back to a full refresh when there
+    is no cache yet.
+    """
+    global _state
+
+    state = get(engine)
+    updates = {}
+    if months:
+        updates["sales_by_month"] = (set(months), _query(engine, "sales_by_month", set(months)))
+    if customers:
+        updates["sales_by_customer"] = (set(customers), _query(engine, "sales_by_customer", set(customers)))
+    if not updates:
+        return
+
+    with _lock:
+        state = {name: dict(values) if name in AGGREGATES else values for name, values in state.items()}
+        for name, (groups, values) in updates.items():
+            for group in groups - values.keys():
+                state[name].pop(group, None)
+            state[name].update(values)
+        state["refreshed_at"] = datetime.utcnow().isoformat() + "Z"
+        _state = state
+        _save(state)
+    print(f"✓ Refreshed {len(months)} months and {len(customers)} customers in aggregate cache")
+
+
+def get(engine) -> dict:
+    """Current aggregates: memory (reloaded when another worker rewrote the file), then disk, then a full refresh"""
+    global _state, _stamp
+
+    stamp = _file_stamp()
+    if _state is None or stamp != _stamp:
+        with _lock:
+            if _state is None or stamp != _stamp:
+                state = _load()
+                # An unreadable file keeps whatever is already in memory
+                _state, _stamp = state or _state, stamp
+        if _state is None:
+            return full_refresh(engine)
+    return _state
+
+
+def start_scheduler(engine):
+    """Full refresh every REFRESH_SECONDS on a daemon thread"""
+    global _scheduler
+
+    if _scheduler is not None or REFRESH_SECONDS <= 0:
+        return
+
+    def run():
+        while True:
+            time.sleep(REFRESH_SECONDS)
+            try:
+                full_refresh(engine)
+            except Exception as e:
+                print(f"⚠ Scheduled aggregate refresh failed: {e}")
+
+    _scheduler = threading.Thread(target=run, name="aggregate-refresh", daemon=True)
+    _scheduler.start()
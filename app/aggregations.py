@@ -0,0 +1,302 @@
+from sqlalchemy import Table, Column, MetaData, Integer, String, Numeric, DateTime, select, func, bindparam
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+import re
+import os
+from app.business_db import get_engine
+
+# Parameterized aggregation engine over business_data.
+# Identifiers come from fixed whitelists; every value is a bound parameter,
+# and each query shape is built once and reused (SQLAlchemy also caches
+# its compiled SQL), so only parameters change between requests.
+
+business_data = Table(
+    "business_data", MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("customer_name", String(255)),
+    Column("finance_type", String(50)),
+    Column("product", String(255)),
+    Column("amount", Numeric(12, 2)),
+    Column("month", String(20)),
+    Column("quantity", Integer),
+)
+
+# Optional timestamp column (e.g. "created_at") for day/week/month buckets;
+# without it only the month column can be charted over time.
+DATE_COLUMN = os.getenv("BUSINESS_DATE_COLUMN") or None
+if DATE_COLUMN:
+    business_data.append_column(Column(DATE_COLUMN, DateTime))
+GRANULARITIES = ("day", "week", "month")
+
+DIMENSIONS = {
+    "customer": business_data.c.customer_name,
+    "month": business_data.c.month,
+    "product": business_data.c.product,
+    "finance_type": business_data.c.finance_type,
+}
+FIELDS = {
+    "amount": business_data.c.amount,
+    "quantity": business_data.c.quantity,
+}
+METRICS = {"sum", "count", "avg"}
+
+MONTHS = [
+    "january", "february", "march", "april", "may", "june", "july",
+    "august", "september", "october", "november", "december",
+]
+
+
+def month_order(label) -> int:
+    """Calendar position of a month label; unknown labels sort last"""
+    name = str(label).lower() if label else ""
+    return MONTHS.index(name) if name in MONTHS else len(MONTHS)
+
+
+@dataclass(frozen=True)
+class AggregationSpec:
+    dimension: str
+    metric: str = "sum"
+    field: str = "amount"
+    filters: tuple = ()          # ((dimension, (value, ...)), ...)
+    top_n: Optional[int] = None
+    descending: bool = True
+
+    def __post_init__(self):
+        if self.dimension not in DIMENSIONS:
+            raise ValueError(f"Unsupported dimension: {self.dimension}")
+        if self.metric not in METRICS:
+            raise ValueError(f"Unsupported metric: {self.metric}")
+        if self.field not in FIELDS:
+            raise ValueError(f"Unsupported field: {self.field}")
+        for dimension, _ in self.filters:
+            if dimension not in DIMENSIONS:
+                raise ValueError(f"Unsupported filter: {dimension}")
+
+    @property
+    def label(self) -> str:
+        measure = "Count" if self.metric == "count" else f"{'Total' if self.metric == 'sum' else 'Average'} {self.field}"
+        return f"{measure} by {self.dimension.replace('_', ' ')}"
+
+
+def _measure(metric: str, field_name: str):
+    if metric == "count":
+        return func.count().label("value")
+    return getattr(func, metric)(FIELDS[field_name]).label("value")
+
+
+def _filtered(statement, filter_dimensions: tuple):
+    for filter_dimension in filter_dimensions:
+        statement = statement.where(
+            DIMENSIONS[filter_dimension].in_(bindparam(f"filter_{filter_dimension}", expanding=True))
+        )
+    return statement
+
+
+def _filter_params(filters: tuple) -> dict:
+    return {f"filter_{dimension}": list(values) for dimension, values in filters}
+
+
+@lru_cache(maxsize=256)
+def build_statement(dimension: str, metric: str, field_name: str, filter_dimensions: tuple, limited: bool, descending: bool):
+    """Build (once per query shape) the SELECT for an aggregation"""
+    group = DIMENSIONS[dimension]
+    value = _measure(metric, field_name)
+
+    statement = _filtered(select(group.label("label"), value).group_by(group), filter_dimensions)
+
+    if limited:
+        statement = statement.order_by(value.desc() if descending else value.asc()).limit(bindparam("top_n"))
+    elif dimension != "month":
+        statement = statement.order_by(value.desc() if descending else value.asc())
+    return statement
+
+
+def run_aggregation(spec: AggregationSpec, engine=None) -> list[tuple]:
+    """Execute a spec in the database; returns [(label, value), ...]"""
+    if engine is None:
+        from app import analytics_snapshot
+        if analytics_snapshot.enabled():
+            return analytics_snapshot.run_aggregation(spec)
+
+    engine = engine or get_engine()
+
+    statement = build_statement(
+        spec.dimension, spec.metric, spec.field,
+        tuple(dimension for dimension, _ in spec.filters),
+        spec.top_n is not None, spec.descending,
+    )
+    params = _filter_params(spec.filters)
+    if spec.top_n is not None:
+        params["top_n"] = spec.top_n
+
+    with engine.connect() as conn:
+        rows = conn.execute(statement, params).fetchall()
+    return [(row[0], float(row[1]) if row[1] is not None else 0.0) for row in rows]
+
+
+def time_bucket(column, granularity: str, dialect: str):
+    """SQL expression truncating a timestamp to the start of its day/week/month"""
+    if dialect == "sqlite":
+        if granularity == "day":
+            return func.date(column)
+        if granularity == "week":
+            return func.date(column, "weekday 0", "-6 days")  # Monday
+        return func.strftime("%Y-%m-01", column)
+    if dialect == "mysql":
+        if granularity == "day":
+            return func.date(column)
+        if granularity == "week":
+            return func.subdate(func.date(column), func.weekday(column))  # Monday
+        return func.date_format(column, "%Y-%m-01")
+    return func.date_trunc(granularity, column)
+
+
+@lru_cache(maxsize=64)
+def build_series_statement(granularity: str, metric: str, field_name: str, filter_dimensions: tuple, dialect: str):
+    """Bucketed time series; grouping and ordering happen in the database"""
+    bucket = time_bucket(business_data.c[DATE_COLUMN], granularity, dialect).label("bucket")
+    statement = select(bucket, _measure(metric, field_name)).where(business_data.c[DATE_COLUMN].is_not(None))
+    return _filtered(statement, filter_dimensions).group_by("bucket").order_by("bucket")
+
+
+def run_time_series(granularity: str, metric: str = "sum", field: str = "amount", filters: tuple = (), engine=None) -> list[tuple]:
+    """Aggregate per day/week/month in time order; returns [(bucket, value), ...]"""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unsupported granularity: {granularity}")
+
+    if DATE_COLUMN is None:
+        if granularity != "month":
+            raise ValueError("Set BUSINESS_DATE_COLUMN to chart by day or week")
+        rows = run_aggregation(AggregationSpec("month", metric, field, filters), engine)
+        return sorted(rows, key=lambda row: month_order(row[0]))
+
+    # Validates metric, field and filters the same way as a grouped spec
+    AggregationSpec("month", metric, field, filters)
+    engine = engine or get_engine()
+    statement = build_series_statement(
+        granularity, metric, field, tuple(dimension for dimension, _ in filters), engine.dialect.name
+    )
+    with engine.connect() as conn:
+        rows = conn.execute(statement, _filter_params(filters)).fetchall()
+    return [
+        (row[0].isoformat()[:10] if hasattr(row[0], "isoformat") else str(row[0])[:10], float(row[1] or 0))
+        for row in rows
+    ]
+
+
+def to_chart(spec: AggregationSpec, rows: list[tuple]) -> dict:
+    if not rows:
+        return {"type": "bar", "labels": [], "datasets": []}
+
+    return {
+        "type": "bar",
+        "labels": [row[0] for row in rows],
+        "datasets": [
+            {
+                "label": spec.label,
+                "data": [row[1] for row in rows]
+            }
+        ]
+    }
+
+
+def format_value(spec: AggregationSpec, value: float) -> str:
+    """Grouped fixed-point figures; counts and unit totals as whole numbers"""
+    if spec.metric == "count" or (spec.metric == "sum" and spec.field == "quantity"):
+        return f"{value:,.0f}"
+    return f"{value:,.2f}"
+
+
+def to_answer(spec: AggregationSpec, rows: list[tuple]) -> dict:
+    dimension = spec.dimension.replace("_", " ")
+    if not rows:
+        answer = f"No data found for {spec.label.lower()}."
+    elif len(rows) == 1:
+        answer = f"{rows[0][0]} has the {'highest' if spec.descending else 'lowest'} {spec.label.lower().split(' by ')[0]}: {format_value(spec, rows[0][1])}."
+    else:
+        answer = f"{spec.label} ({dimension}: value): " + ", ".join(f"{label}: {format_value(spec, value)}" for label, value in rows) + "."
+
+    filters = " AND ".join(f"{d} IN ({', '.join(map(str, v))})" for d, v in spec.filters)
+    return {
+        "answer": answer,
+        "sources": [
+            {
+                "source": "mysql",
+                "table": "business_data",
+                "aggregation": (
+                    f"{'COUNT(*)' if spec.metric == 'count' else f'{spec.metric.upper()}({spec.field})'} "
+                    f"GROUP BY {DIMENSIONS[spec.dimension].name}"
+                    + (f" WHERE {filters}" if filters else "")
+                    + (f" LIMIT {spec.top_n}" if spec.top_n else "")
+                )
+            }
+        ]
+    }
+
+
+# ==================== QUERY PARSING ====================
+
+_DIMENSION_PATTERNS = [
+    ("customer", re.compile(r"\b(customers?|clients?|buyers?)\b")),
+    ("product", re.compile(r"\b(products?|items?)\b")),
+    ("finance_type", re.compile(r"\b(finance|financing|payment)( types?| methods?)?\b")),
+    ("month", re.compile(r"\b(months?|monthly|per month)\b")),
+]
+_AVG = re.compile(r"\b(average|avg|mean)\b")
+_COUNT = re.compile(r"\b(how many|count|number of)\b")
+_QUANTITY = re.compile(r"\b(quantity|units|sales count|items sold)\b")
+_TOP_N = re.compile(r"\btop (\d+)\b")
+_HIGHEST = re.compile(r"\b(most|highest|max|maximum|largest|biggest|best|top)\b")
+_LOWEST = re.compile(r"\b(least|lowest|min|minimum|smallest|worst|bottom)\b")
+_METRIC_CUE = re.compile(r"\b(total|sum|sales|revenue|spent|spend|amount|average|avg|mean|how many|count|number of|quantity|units)\b")
+# "may" only counts as a month after a preposition ("in may", not "may have")
+_MONTH = re.compile(r"\b(" + "|".join(m for m in MONTHS if m != "may") + r")\b|\b(?:in|for|during) (may)\b")
+
+
+def parse_filters(query: str) -> tuple:
+    """Month filters named in a question, as AggregationSpec.filters"""
+    months = [a or b for a, b in _MONTH.findall(query.lower())]
+    if not months:
+        return ()
+    # month values are stored capitalized, e.g. "January"
+    return (("month", tuple(m.title() for m in dict.fromkeys(months))),)
+
+
+def parse_query(query: str, require_measure: bool = True) -> Optional[AggregationSpec]:
+    """
+    Map a natural-language question onto an AggregationSpec, or None when
+    it does not name both a dimension and something to measure/rank.
+    Chart requests pass require_measure=False: a dimension alone means
+    total amount by that dimension.
+    """
+    q = query.lower()
+
+    dimension = next((name for name, pattern in _DIMENSION_PATTERNS if pattern.search(q)), None)
+    if dimension is None:
+        return None
+
+    top = _TOP_N.search(q)
+    highest, lowest = _HIGHEST.search(q), _LOWEST.search(q)
+    if require_measure and not (_METRIC_CUE.search(q) or top or highest or lowest):
+        return None
+
+    metric = "avg" if _AVG.search(q) else "count" if _COUNT.search(q) else "sum"
+    field_name = "quantity" if _QUANTITY.search(q) else "amount"
+
+    top_n = None
+    if top:
+        top_n = int(top.group(1))
+    elif (highest or lowest) and dimension != "month":
+        top_n = 1
+
+    filters = parse_filters(q)
+
+    return AggregationSpec(
+        dimension=dimension,
+        metric=metric,
+        field=field_name,
+        filters=filters,
+        top_n=top_n,
+        descending=not (lowest and not highest),
+    )
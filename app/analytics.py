@@ -1,34 +1,23 @@
-from sqlalchemy import  create_engine,text
-
-username = "root"
-password = ""
-host = "localhost"
-port = "3306"
-database = "ai_data_asistant"
-
-DATABASE_URL = f"mysql+pymysql://{username}:{password}@{host}:{port}/{database}"
-engine=create_engine(DATABASE_URL)
+from app import aggregate_cache
+from app.business_db import get_engine
+from app.aggregations import month_order
 
 def sales_by_month():
-    query = """
-        SELECT month, SUM(amount) AS total_sales
-        FROM business_data
-        GROUP BY month;
-
-    """
-
-    with engine.connect() as conn:
-        rows = conn.execute(text(query)).fetchall()
+    # Served from the materialized aggregate cache, not a GROUP BY per request
+    cache = aggregate_cache.get(get_engine())
+    totals = cache["sales_by_month"]
 
-    if not rows:
+    if not totals:
         return {
             "type": "bar",
             "labels": [],
-            "datasets": []
+            "datasets": [],
+            "refreshed_at": cache["refreshed_at"]
         }
 
-    labels = [row[0] for row in rows]
-    values = [float(row[1]) for row in rows]
+    # Calendar order, as spec_chart returns it; refresh_groups appends new months at the end
+    labels = sorted(totals, key=month_order)
+    values = [totals[label] for label in labels]
 
     return {
         "type": "bar",
@@ -38,28 +27,31 @@ def sales_by_month():
                 "label": "Sales by Month",
                 "data": values
             }
-        ]
+        ],
+        "refreshed_at": cache["refreshed_at"]
     }
 
 def top_customer():
-    query = """
-        SELECT customer_name, SUM(amount) AS total_spent
-        FROM business_data
-        GROUP BY customer_name
-        ORDER BY total_spent DESC
-        LIMIT 1;
+    cache = aggregate_cache.get(get_engine())
+    totals = cache["sales_by_customer"]
+
+    if not totals:
+        return {
+            "answer": "No customer data available yet.",
+            "sources": [],
+            "refreshed_at": cache["refreshed_at"]
+        }
 
-    """
-    with engine.connect() as conn:
-        row = conn.execute(text(query)).fetchone()
+    customer, total_spent = max(totals.items(), key=lambda item: item[1])
 
     return {
-        "answer": f"{row[0]} spent the most with a total of {float(row[1])}.",
+        "answer": f"{customer} spent the most with a total of {total_spent}.",
         "sources": [
             {
                 "source": "mysql",
                 "table": "business_data",
                 "aggregation": "SUM(amount) GROUP BY customer_name"
             }
-        ]
+        ],
+        "refreshed_at": cache["refreshed_at"]
     }
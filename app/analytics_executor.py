@@ -0,0 +1,119 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
+import os
+from app import business_db
+
+# Chart and aggregation work is blocking (SQLAlchemy, pandas), so async
+# endpoints hand it to this bounded thread pool instead of running it on
+# the event loop. Jobs past the queue limit are rejected, and a job that
+# times out or whose client disconnects is cancelled: still queued, it
+# never runs; already running, its database query is interrupted.
+WORKERS = int(os.getenv("ANALYTICS_WORKERS", "4"))
+MAX_QUEUE = int(os.getenv("ANALYTICS_MAX_QUEUE", "32"))
+QUERY_TIMEOUT = float(os.getenv("ANALYTICS_QUERY_TIMEOUT_SECONDS", "15"))
+DISCONNECT_POLL_SECONDS = 0.25
+
+_executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="analytics")
+_lock = threading.Lock()
+_in_flight = 0
+_metrics = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "timeouts": 0, "disconnects": 0}
+
+
+class AnalyticsBusy(Exception):
+    pass
+
+
+class AnalyticsTimeout(Exception):
+    pass
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+def _release(future):
+    global _in_flight
+
+    with _lock:
+        _in_flight -= 1
+        if future.cancelled():
+            return
+        _metrics["failed" if future.exception() else "completed"] += 1
+
+
+def _cancel(future, connections: list):
+    if not future.cancel():
+        for dbapi_connection in list(connections):
+            business_db.interrupt(dbapi_connection)
+
+
+async def _wait_for_disconnect(request):
+    while not await request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+
+
+async def run_analytics(fn, *args, request=None, timeout: float = None):
+    """
+    Run a blocking analytics call off the event loop and return its result.
+
+    Raises AnalyticsBusy when the queue is full, AnalyticsTimeout after
+    `timeout` seconds (default ANALYTICS_QUERY_TIMEOUT_SECONDS) and
+    ClientDisconnected once `request` has gone away.
+    """
+    global _in_flight
+
+    with _lock:
+        if _in_flight >= WORKERS + MAX_QUEUE:
+            _metrics["rejected"] += 1
+            raise AnalyticsBusy("Too many analytics queries in progress")
+        _in_flight += 1
+        _metrics["submitted"] += 1
+
+    connections = []
+
+    def work():
+        with business_db.track_connections(connections):
+            return fn(*args)
+
+    future = _executor.submit(work)
+    future.add_done_callback(_release)
+    job = asyncio.wrap_future(future)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request)) if request is not None else None
+
+    try:
+        done, _ = await asyncio.wait(
+            [job] + ([watcher] if watcher else []),
+            timeout=timeout or QUERY_TIMEOUT,
+            return_when=asyncio.FIRST_COMPLETED
+        )
+        if job in done:
+            return job.result()
+
+        _cancel(future, connections)
+        job.cancel()
+        with _lock:
+            if watcher in done:
+                _metrics["disconnects"] += 1
+            else:
+                _metrics["timeouts"] += 1
+        if watcher in done:
+            raise ClientDisconnected("Client disconnected before the analytics query finished")
+        raise AnalyticsTimeout(f"Analytics query exceeded {timeout or QUERY_TIMEOUT:g}s")
+    except asyncio.CancelledError:
+        _cancel(future, connections)
+        job.cancel()
+        raise
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+
+
+def executor_metrics() -> dict:
+    with _lock:
+        return {
+            "workers": WORKERS,
+            "max_queue": MAX_QUEUE,
+            "in_flight": _in_flight,
+            **_metrics,
+        }
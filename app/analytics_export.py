@@ -0,0 +1,109 @@
+from sqlalchemy import select, bindparam
+from decimal import Decimal
+from functools import lru_cache
+from typing import Iterator, Optional
+import threading
+import csv
+import io
+import json
+import os
+from app.aggregations import business_data, DIMENSIONS
+from app.business_db import get_engine
+
+# Row-level export / drill-down over business_data. Rows come off a
+# server-side cursor (stream_results + yield_per) one partition at a time
+# and are encoded as they arrive, so memory stays flat however many rows
+# match; the HTTP response pulls the next partition only after the
+# previous chunk was sent.
+#
+# Each running export holds a pooled business-db connection until its last
+# chunk is sent, so only EXPORT_MAX_CONCURRENT run at once and each one is
+# cut off after EXPORT_TIMEOUT_SECONDS, however slowly its client reads.
+EXPORT_BATCH_SIZE = int(os.getenv("ANALYTICS_EXPORT_BATCH_SIZE", "1000"))
+EXPORT_MAX_CONCURRENT = int(os.getenv("ANALYTICS_EXPORT_MAX_CONCURRENT", "2"))
+EXPORT_TIMEOUT_SECONDS = float(os.getenv("ANALYTICS_EXPORT_TIMEOUT_SECONDS", "300"))
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+COLUMNS = [column.name for column in business_data.columns]
+
+_slots = threading.BoundedSemaphore(EXPORT_MAX_CONCURRENT)
+
+
+class ExportBusy(Exception):
+    pass
+
+
+def acquire_slot():
+    """Claim one of the EXPORT_MAX_CONCURRENT export slots, or raise ExportBusy"""
+    if not _slots.acquire(blocking=False):
+        raise ExportBusy("Too many exports in progress, retry shortly")
+
+
+def release_slot():
+    _slots.release()
+
+
+@lru_cache(maxsize=64)
+def build_export_statement(filter_dimensions: tuple, limited: bool):
+    statement = select(business_data).order_by(business_data.c.id)
+    for dimension in filter_dimensions:
+        statement = statement.where(
+            DIMENSIONS[dimension].in_(bindparam(f"filter_{dimension}", expanding=True))
+        )
+    if limited:
+        statement = statement.limit(bindparam("limit"))
+    return statement
+
+
+def iter_partitions(filters: tuple = (), limit: Optional[int] = None, engine=None, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[list]:
+    """Yield matching rows as lists of at most batch_size rows, in id order"""
+    for dimension, _ in filters:
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"Unsupported filter: {dimension}")
+
+    engine = engine or get_engine()
+    statement = build_export_statement(tuple(dimension for dimension, _ in filters), limit is not None)
+    params = {f"filter_{dimension}": list(values) for dimension, values in filters}
+    if limit is not None:
+        params["limit"] = limit
+
+    with engine.connect().execution_options(stream_results=True, yield_per=batch_size) as conn:
+        result = conn.execute(statement, params)
+        for partition in result.partitions():
+            yield partition
+
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def encode_ndjson(partitions) -> Iterator[str]:
+    for partition in partitions:
+        yield "".join(
+            json.dumps({name: _json_value(value) for name, value in zip(COLUMNS, row)}) + "\n"
+            for row in partition
+        )
+
+
+def encode_csv(partitions) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for partition in partitions:
+        writer.writerows(partition)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_rows(fmt: str, filters: tuple = (), limit: Optional[int] = None, engine=None) -> Iterator[str]:
+    """Stream business_data rows matching `filters` as NDJSON or CSV text chunks"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+    partitions = iter_partitions(filters, limit, engine)
+    return encode_ndjson(partitions) if fmt == "ndjson" else encode_csv(partitions)
@@ -0,0 +1,153 @@
+from sqlalchemy import select
+import pandas as pd
+import threading
+import os
+from app.aggregations import AggregationSpec, business_data, DIMENSIONS, FIELDS
+from app.business_db import get_engine
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+except ImportError:
+    pa = None
+
+# Columnar in-process snapshot of business_data (ANALYTICS_MODE=snapshot).
+# business_data only changes at ingest time, so sql_ingest rewrites an
+# Arrow IPC file that is memory-mapped back in, and aggregations run as
+# pandas group-bys over categorical columns instead of a MySQL GROUP BY.
+# Every worker watches the file's stamp, so a refresh in one process is
+# picked up by the others on their next aggregation.
+ANALYTICS_MODE = os.getenv("ANALYTICS_MODE", "sql").lower()
+SNAPSHOT_PATH = os.getenv("ANALYTICS_SNAPSHOT_PATH", "data/business_data.arrow")
+BATCH_SIZE = int(os.getenv("ANALYTICS_SNAPSHOT_BATCH_SIZE", "50000"))
+RESULT_CACHE_SIZE = 256
+
+if ANALYTICS_MODE == "snapshot" and pa is None:
+    print("⚠ ANALYTICS_MODE=snapshot needs pyarrow; falling back to SQL aggregations")
+
+_frame = None
+_stamp = None  # (inode, mtime_ns, size) of the file _frame was loaded from
+_version = 0
+_results = {}  # (version, spec) -> rows
+_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return ANALYTICS_MODE == "snapshot" and pa is not None
+
+
+def _schema():
+    return pa.schema([
+        ("id", pa.int64()),
+        ("customer_name", pa.string()),
+        ("finance_type", pa.string()),
+        ("product", pa.string()),
+        ("amount", pa.float64()),
+        ("month", pa.string()),
+        ("quantity", pa.int64()),
+    ])
+
+
+def _to_arrow(df: pd.DataFrame, schema):
+    df = df.astype({"amount": "float64", "quantity": "Int64"})
+    for name in ("customer_name", "finance_type", "product", "month"):
+        df[name] = df[name].astype(object).where(df[name].notna(), None)
+    return pa.Table.from_pandas(df[schema.names], schema=schema, preserve_index=False)
+
+
+def _file_stamp():
+    try:
+        st = os.stat(SNAPSHOT_PATH)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def _load():
+    """Memory-map the snapshot file and swap in a fresh frame.
+
+    The mmap only saves the read buffer: to_pandas() copies the columns into
+    pandas memory (the categorical codes have to be built anyway), so the
+    resident cost of a snapshot is the size of the frame, not of the file.
+    """
+    global _frame, _stamp, _version
+
+    stamp = _file_stamp()
+    with pa.memory_map(SNAPSHOT_PATH, "r") as source:
+        table = ipc.open_file(source).read_all()
+        # Dimension columns become categoricals so group-bys work on integer codes
+        frame = table.to_pandas(strings_to_categorical=True)
+
+    with _lock:
+        _frame, _stamp = frame, stamp
+        _version += 1
+        _results.clear()
+    return frame
+
+
+def refresh(engine=None) -> int:
+    """Rewrite the snapshot from business_data and load it; returns the row count"""
+    if pa is None:
+        raise RuntimeError("pyarrow is required for the analytics snapshot")
+
+    engine = engine or get_engine()
+    schema = _schema()
+    os.makedirs(os.path.dirname(SNAPSHOT_PATH) or ".", exist_ok=True)
+    tmp_path = SNAPSHOT_PATH + ".tmp"
+
+    rows = 0
+    with engine.connect().execution_options(stream_results=True) as conn:
+        with pa.OSFile(tmp_path, "wb") as sink, ipc.new_file(sink, schema) as writer:
+            for df in pd.read_sql(select(business_data), conn, chunksize=BATCH_SIZE):
+                writer.write_table(_to_arrow(df, schema))
+                rows += len(df)
+    os.replace(tmp_path, SNAPSHOT_PATH)
+
+    _load()
+    print(f"✓ Refreshed analytics snapshot ({rows} rows)")
+    return rows
+
+
+def get_frame(engine=None) -> pd.DataFrame:
+    """Current snapshot: memory while the file is unchanged, then disk, then a rebuild"""
+    stamp = _file_stamp()
+    if stamp is None:
+        if _frame is None:
+            refresh(engine)
+    elif _frame is None or stamp != _stamp:
+        _load()
+    return _frame
+
+
+def run_aggregation(spec: AggregationSpec, engine=None) -> list[tuple]:
+    """Same contract as aggregations.run_aggregation, served from the snapshot"""
+    get_frame(engine)
+    with _lock:
+        df, key = _frame, (_version, spec)
+    rows = _results.get(key)
+    if rows is not None:
+        return rows
+
+    for dimension, values in spec.filters:
+        df = df[df[DIMENSIONS[dimension].name].isin(values)]
+
+    groups = df.groupby(DIMENSIONS[spec.dimension].name, observed=True, sort=False, dropna=False)
+    if spec.metric == "count":
+        values = groups.size()
+    else:
+        values = groups[FIELDS[spec.field].name].agg("mean" if spec.metric == "avg" else "sum")
+    values = values.fillna(0.0)
+
+    # Mirror the SQL ordering: ranked unless it is a plain by-month series
+    if spec.top_n is not None or spec.dimension != "month":
+        values = values.sort_values(ascending=not spec.descending, kind="stable")
+    if spec.top_n is not None:
+        values = values.head(spec.top_n)
+
+    rows = [(None if pd.isna(label) else label, float(value)) for label, value in values.items()]
+
+    with _lock:
+        if len(_results) >= RESULT_CACHE_SIZE:
+            _results.clear()
+        _results[key] = rows
+    return rows
@@ -1,23 +1,99 @@
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from app.database import get_db, User
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db, User
 import os
+import calendar
 import hashlib
+import threading
+import time
 import bcrypt
 
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7
+# bcrypt work factor for new hashes; existing hashes keep the cost they were made with
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
 security = HTTPBearer()
 
+# Authenticated-user cache: token -> user snapshot, so a client presenting
+# the same token again skips jwt.decode and the users lookup. Entries live
+# for USER_CACHE_TTL_SECONDS (never past the token's exp) and are dropped
+# explicitly on role, active-flag and password changes. The cache is per
+# process: other workers pick up such changes when their entry expires.
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """The fields endpoints read from the current user, detached from any session"""
+    id: int
+    username: str
+    email: str
+    role: str
+    is_active: bool
+    created_at: datetime
+
+    @classmethod
+    def of(cls, user: User) -> "UserSnapshot":
+        return cls(user.id, user.username, user.email, user.role or "user", bool(user.is_active), user.created_at)
+
+
+_user_cache = OrderedDict()  # token -> (snapshot, expires_at)
+_user_tokens = {}            # user id -> tokens cached for that user
+_user_cache_lock = threading.Lock()
+_user_cache_metrics = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def _cache_get(token: str) -> Optional[UserSnapshot]:
+    with _user_cache_lock:
+        entry = _user_cache.get(token)
+        if entry is None or entry[1] <= time.monotonic():
+            _user_cache_metrics["misses"] += 1
+            return None
+        _user_cache.move_to_end(token)
+        _user_cache_metrics["hits"] += 1
+        return entry[0]
+
+
+def _cache_put(token: str, snapshot: UserSnapshot, token_exp: Optional[float]):
+    ttl = USER_CACHE_TTL_SECONDS
+    if token_exp is not None:
+        ttl = min(ttl, token_exp - time.time())
+    if ttl <= 0:
+        return
+
+    with _user_cache_lock:
+        _user_cache[token] = (snapshot, time.monotonic() + ttl)
+        _user_tokens.setdefault(snapshot.id, set()).add(token)
+        while len(_user_cache) > USER_CACHE_MAX_ENTRIES:
+            evicted, (old, _) = _user_cache.popitem(last=False)
+            _user_tokens.get(old.id, set()).discard(evicted)
+
+
+def invalidate_user(user_id: int):
+    """Drop every cached token of a user (after role, active or password changes)"""
+    with _user_cache_lock:
+        for token in _user_tokens.pop(user_id, ()):
+            _user_cache.pop(token, None)
+        _user_cache_metrics["invalidations"] += 1
+
+
+def user_cache_metrics() -> dict:
+    with _user_cache_lock:
+        return {"entries": len(_user_cache), "ttl_seconds": USER_CACHE_TTL_SECONDS, **_user_cache_metrics}
+
 
 def hash_password(password: str) -> str:
     sha_hash = hashlib.sha256(password.encode('utf-8')).hexdigest()
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(sha_hash.encode('utf-8'), salt)
     return hashed.decode('utf-8')
 
@@ -30,20 +106,39 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         return False
 
 
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None, issued_at: Optional[int] = None):
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": int(time.time()) if issued_at is None else issued_at})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)) -> User:
+def password_changed_epoch(user: User) -> Optional[int]:
+    if user.password_changed_at is None:
+        return None
+    return calendar.timegm(user.password_changed_at.utctimetuple())
+
+
+def _issued_before_password_change(payload: dict, user: User) -> bool:
+    # iat has one-second resolution: a token from the same second as the
+    # change may predate it, so it is rejected too (see change_password)
+    changed_at = password_changed_epoch(user)
+    return changed_at is not None and payload.get("iat", 0) <= changed_at
+
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(get_async_db)) -> UserSnapshot:
     credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
+    token = credentials.credentials
+    snapshot = _cache_get(token)
+    if snapshot is not None:
+        if not snapshot.is_active:
+            raise HTTPException(status_code=400, detail="Inactive user")
+        return snapshot
+
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         # role: str = payload.get("role", "user") # Optional: extract role from token if we decided to put it there
@@ -52,24 +147,27 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
+    user = (await db.execute(select(User).where(User.username == username))).scalar_one_or_none()
+    if user is None or _issued_before_password_change(payload, user):
         raise credentials_exception
-    if not user.is_active:
+
+    snapshot = UserSnapshot.of(user)
+    _cache_put(token, snapshot, payload.get("exp"))
+    if not snapshot.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    return user
+    return snapshot
 
 
-def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
+def get_current_admin(current_user: UserSnapshot = Depends(get_current_user)) -> UserSnapshot:
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
     return current_user
 
 
-def get_current_user_optional(credentials: Optional[HTTPAuthorizationCredentials] = Depends(security), db: Session = Depends(get_db)) -> Optional[User]:
+async def get_current_user_optional(credentials: Optional[HTTPAuthorizationCredentials] = Depends(security), db: AsyncSession = Depends(get_async_db)) -> Optional[UserSnapshot]:
     if not credentials:
         return None
     try:
-        return get_current_user(credentials, db)
+        return await get_current_user(credentials, db)
     except HTTPException:
         return None
\ No newline at end of file
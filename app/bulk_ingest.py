@@ -0,0 +1,179 @@
+"""
+Bulk ingestion of a directory tree or manifest of files.
+
+Usage:
+    python -m app.bulk_ingest data/share
+    python -m app.bulk_ingest --manifest files.txt --workers 8 --batch-size 512
+
+Text extraction and splitting run in a process pool; chunks are embedded
+and committed to FAISS once per batch. Completed files are appended to a
+state file after each commit, so an interrupted run resumes where it left
+off. Each file is registered as source "file:<path>", so re-ingesting a
+file replaces its chunks instead of duplicating them; a file that now
+extracts to nothing has its old chunks removed.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from app.ingest import SUPPORTED_EXTENSIONS, extract_chunks
+
+STATE_PATH = "data/bulk_ingest.done"
+
+
+def iter_directory(root: str):
+    for dirpath, _, filenames in os.walk(root):
+        for name in sorted(filenames):
+            if os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS:
+                yield os.path.join(dirpath, name)
+
+
+def iter_manifest(path: str):
+    """One file path per line; blank lines and # comments are skipped"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+
+
+def load_done(state_path: str) -> set:
+    if not os.path.exists(state_path):
+        return set()
+    with open(state_path, "r", encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def mark_done(state_path: str, paths: list[str]):
+    os.makedirs(os.path.dirname(state_path) or ".", exist_ok=True)
+    with open(state_path, "a", encoding="utf-8") as f:
+        f.writelines(p + "\n" for p in paths)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _extract(path: str):
+    """Process pool worker: returns (path, chunks, error)"""
+    try:
+        return path, extract_chunks(path), None
+    except Exception as e:
+        return path, [], str(e)
+
+
+def _iter_extracted(paths, workers: int):
+    """Extract files in parallel, keeping a bounded number of files in flight"""
+    window = workers * 4
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = []
+        for path in paths:
+            pending.append(executor.submit(_extract, path))
+            if len(pending) >= window:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+def bulk_ingest(paths, workers: int = None, batch_size: int = 512, state_path: str = STATE_PATH) -> dict:
+    """
+    Ingest many files, committing the index once per batch of chunks.
+
+    Returns run statistics including docs/s and chunks/s.
+    """
+    from app.vectorstore import upsert_sources, delete_source, persist_vectorstore, compact_vectorstore
+
+    workers = workers or os.cpu_count() or 1
+    done = load_done(state_path)
+    todo = [p for p in paths if p not in done]
+    print(f"✓ {len(todo)} files to ingest ({len(done)} already done), {workers} workers")
+
+    stats = {"docs": 0, "chunks": 0, "duplicates": 0, "removed": 0, "skipped": len(done), "failed": 0, "batches": 0}
+    batch_sources, batch_texts, batch_metadatas, batch_paths, batch_emptied = [], [], [], [], []
+    start = time.perf_counter()
+
+    def commit():
+        if batch_texts:
+            dedup_stats = {}
+            upsert_sources(batch_sources, batch_texts, batch_metadatas, persist=False, stats=dedup_stats)
+            stats["duplicates"] += dedup_stats.get("duplicates", 0)
+        if batch_texts or batch_emptied:
+            persist_vectorstore()
+        mark_done(state_path, batch_paths)
+
+        stats["docs"] += len(batch_paths)
+        stats["chunks"] += len(batch_texts)
+        stats["batches"] += 1
+        elapsed = time.perf_counter() - start
+        print(
+            f"✓ Batch {stats['batches']}: {stats['docs']} docs, {stats['chunks']} chunks "
+            f"({stats['duplicates']} near-duplicates skipped) "
+            f"({stats['docs'] / elapsed:.1f} docs/s, {stats['chunks'] / elapsed:.1f} chunks/s)"
+        )
+        batch_sources.clear()
+        batch_texts.clear()
+        batch_metadatas.clear()
+        batch_paths.clear()
+        batch_emptied.clear()
+
+    for path, chunks, error in _iter_extracted(todo, workers):
+        if error:
+            # Failed files are not marked done, so a re-run retries them
+            print(f"⚠ Failed to extract {path}: {error}")
+            stats["failed"] += 1
+            continue
+
+        if not chunks:
+            # Nothing to index any more: drop what earlier versions of the file contributed
+            removed = delete_source(f"file:{path}", persist=False)
+            if removed:
+                stats["removed"] += removed
+                batch_emptied.append(path)
+
+        batch_sources.extend(f"file:{path}" for _ in chunks)
+        batch_texts.extend(chunks)
+        batch_metadatas.extend({"source": path} for _ in chunks)
+        batch_paths.append(path)
+
+        if len(batch_texts) >= batch_size:
+            commit()
+
+    if batch_paths:
+        commit()
+
+    # Re-ingested files leave their old chunks behind as tombstones
+    compact_vectorstore()
+
+    elapsed = time.perf_counter() - start
+    stats["seconds"] = round(elapsed, 3)
+    stats["docs_per_sec"] = round(stats["docs"] / elapsed, 2) if elapsed else 0.0
+    stats["chunks_per_sec"] = round(stats["chunks"] / elapsed, 2) if elapsed else 0.0
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk ingest files into the vectorstore")
+    parser.add_argument("path", nargs="?", help="directory to walk")
+    parser.add_argument("--manifest", help="file listing one path per line")
+    parser.add_argument("--workers", type=int, default=None, help="extraction processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=512, help="chunks per embedding batch and index commit")
+    parser.add_argument("--state", default=STATE_PATH, help="resume file of completed paths")
+    parser.add_argument("--restart", action="store_true", help="ignore previous progress")
+    args = parser.parse_args()
+
+    if not args.path and not args.manifest:
+        parser.error("a directory or --manifest is required")
+
+    if args.restart and os.path.exists(args.state):
+        os.remove(args.state)
+
+    paths = list(iter_manifest(args.manifest) if args.manifest else iter_directory(args.path))
+    stats = bulk_ingest(paths, workers=args.workers, batch_size=args.batch_size, state_path=args.state)
+    print(
+        f"\nDone: {stats['docs']} docs, {stats['chunks']} chunks ({stats['duplicates']} near-duplicates skipped, "
+        f"{stats['removed']} chunks of emptied files removed), "
+        f"{stats['failed']} failed "
+        f"in {stats['seconds']}s ({stats['docs_per_sec']} docs/s, {stats['chunks_per_sec']} chunks/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
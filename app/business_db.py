@@ -0,0 +1,216 @@
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool, StaticPool
+from contextlib import contextmanager
+import threading
+import time
+import os
+
+# Shared, pooled engine for the business_data database (analytics + SQL ingest).
+# Everything comes from the environment; point BUSINESS_DATABASE_URL at a
+# SQLite file to run against a local stand-in.
+BUSINESS_DATABASE_URL = os.getenv(
+    "BUSINESS_DATABASE_URL",
+    "mysql+pymysql://root:@localhost:3306/ai_data_asistant"
+)
+POOL_SIZE = int(os.getenv("BUSINESS_DB_POOL_SIZE", "10"))
+MAX_OVERFLOW = int(os.getenv("BUSINESS_DB_MAX_OVERFLOW", "10"))
+POOL_RECYCLE = int(os.getenv("BUSINESS_DB_POOL_RECYCLE", "1800"))  # seconds; below MySQL wait_timeout
+POOL_TIMEOUT = float(os.getenv("BUSINESS_DB_POOL_TIMEOUT", "10"))  # seconds to wait for a free connection
+CONNECT_TIMEOUT = int(os.getenv("BUSINESS_DB_CONNECT_TIMEOUT", "5"))
+STATEMENT_TIMEOUT_MS = int(os.getenv("BUSINESS_DB_STATEMENT_TIMEOUT_MS", "30000"))
+
+engine = None
+_engine_lock = threading.Lock()
+_metrics_lock = threading.Lock()
+_metrics = {}
+_tracking = threading.local()
+
+
+def _reset_metrics():
+    global _metrics
+    _metrics = {
+        "checkouts": 0,
+        "checkins": 0,
+        "connects": 0,
+        "invalidations": 0,
+        "checkout_timeouts": 0,
+        "checkout_wait_total_ms": 0.0,
+        "checkout_wait_max_ms": 0.0,
+    }
+
+
+def _count(name: str, amount=1):
+    with _metrics_lock:
+        _metrics[name] += amount
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception:
+            _count("checkout_timeouts")
+            raise
+        finally:
+            waited = (time.perf_counter() - start) * 1000
+            with _metrics_lock:
+                _metrics["checkout_wait_total_ms"] += waited
+                _metrics["checkout_wait_max_ms"] = max(_metrics["checkout_wait_max_ms"], waited)
+
+
+def _build_engine(url: str, **overrides):
+    settings = {
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_timeout": POOL_TIMEOUT,
+        "statement_timeout_ms": STATEMENT_TIMEOUT_MS,
+        **overrides,
+    }
+    statement_timeout_ms = settings.pop("statement_timeout_ms")
+
+    if url.startswith("sqlite"):
+        kwargs = {"connect_args": {"check_same_thread": False}}
+        if ":memory:" in url or url in ("sqlite://", "sqlite+pysqlite://"):
+            kwargs["poolclass"] = StaticPool
+        else:
+            kwargs.update(poolclass=MeteredQueuePool, pool_size=settings["pool_size"],
+                          max_overflow=settings["max_overflow"], pool_timeout=settings["pool_timeout"])
+    else:
+        kwargs = {
+            "poolclass": MeteredQueuePool,
+            "pool_pre_ping": True,
+            "connect_args": {"connect_timeout": CONNECT_TIMEOUT} if url.startswith("mysql") else {},
+            **settings,
+        }
+
+    new_engine = create_engine(url, **kwargs)
+    dialect = new_engine.dialect.name
+
+    @event.listens_for(new_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        _count("connects")
+        if statement_timeout_ms <= 0:
+            return
+        cursor = dbapi_connection.cursor()
+        try:
+            if dialect == "mysql":
+                # Applies to SELECTs, which is all analytics runs
+                cursor.execute(f"SET SESSION max_execution_time = {int(statement_timeout_ms)}")
+            elif dialect == "postgresql":
+                cursor.execute(f"SET statement_timeout = {int(statement_timeout_ms)}")
+        finally:
+            cursor.close()
+
+    @event.listens_for(new_engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        _count("checkouts")
+        tracked = getattr(_tracking, "connections", None)
+        if tracked is not None:
+            tracked.append(dbapi_connection)
+
+    @event.listens_for(new_engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        _count("checkins")
+        tracked = getattr(_tracking, "connections", None)
+        if tracked is not None and dbapi_connection in tracked:
+            tracked.remove(dbapi_connection)
+
+    @event.listens_for(new_engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        _count("invalidations")
+
+    return new_engine
+
+
+def get_engine():
+    """The process-wide business data engine (created on first use)"""
+    global engine
+
+    if engine is None:
+        with _engine_lock:
+            if engine is None:
+                _reset_metrics()
+                engine = _build_engine(BUSINESS_DATABASE_URL)
+    return engine
+
+
+def configure(url: str = None, **overrides):
+    """
+    Replace the shared engine, e.g. with a SQLite stand-in in tests.
+    Overrides: pool_size, max_overflow, pool_recycle, pool_timeout,
+    statement_timeout_ms.
+    """
+    global engine
+
+    with _engine_lock:
+        if engine is not None:
+            engine.dispose()
+        _reset_metrics()
+        engine = _build_engine(url or BUSINESS_DATABASE_URL, **overrides)
+    return engine
+
+
+def reset():
+    """Drop the shared engine (e.g. after a test's configure); the next get_engine() rebuilds it from the environment"""
+    global engine
+
+    with _engine_lock:
+        if engine is not None:
+            engine.dispose()
+        engine = None
+
+
+@contextmanager
+def track_connections(connections: list):
+    """Keep `connections` filled with the DBAPI connections this thread holds"""
+    _tracking.connections = connections
+    try:
+        yield connections
+    finally:
+        _tracking.connections = None
+
+
+def interrupt(dbapi_connection):
+    """Abort whatever statement is running on a checked-out connection"""
+    current = get_engine()
+    dialect = current.dialect.name
+    try:
+        if dialect == "sqlite":
+            dbapi_connection.interrupt()
+        elif dialect == "mysql":
+            # KILL QUERY has to come from another session
+            cargs, cparams = current.dialect.create_connect_args(current.url)
+            killer = current.dialect.loaded_dbapi.connect(*cargs, **cparams)
+            try:
+                killer.cursor().execute(f"KILL QUERY {int(dbapi_connection.thread_id())}")
+            finally:
+                killer.close()
+        elif dialect == "postgresql":
+            dbapi_connection.cancel()
+    except Exception as e:
+        print(f"⚠ Failed to interrupt business data query: {e}")
+
+
+def pool_metrics() -> dict:
+    """Pool occupancy and checkout counters for the shared engine"""
+    pool = get_engine().pool
+    with _metrics_lock:
+        metrics = dict(_metrics)
+
+    checkouts = metrics["checkouts"]
+    metrics["checkout_wait_avg_ms"] = round(metrics["checkout_wait_total_ms"] / checkouts, 3) if checkouts else 0.0
+    metrics["checkout_wait_total_ms"] = round(metrics["checkout_wait_total_ms"], 3)
+    metrics["checkout_wait_max_ms"] = round(metrics["checkout_wait_max_ms"], 3)
+    metrics["pool"] = {"class": type(pool).__name__, "status": pool.status()}
+    if isinstance(pool, QueuePool):
+        metrics["pool"].update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+            checked_in=pool.checkedin(),
+        )
+    return metrics
@@ -0,0 +1,182 @@
+from sqlalchemy import select, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+import threading
+import os
+from app import database, message_writer
+from app.database import Conversation, Message
+
+# Conversation context for follow-up questions. The prompt gets the last
+# HISTORY_TURNS exchanges that fit in HISTORY_TOKEN_BUDGET, plus a rolling
+# summary of everything older. The summary lives on the conversation
+# (summary, summary_through_id) and is extended in the background once
+# SUMMARY_BATCH_MESSAGES messages have slid out of the window, so the
+# prompt stays bounded however long the thread gets and no request waits
+# on the summarizer.
+HISTORY_TURNS = int(os.getenv("CONVERSATION_HISTORY_TURNS", "4"))
+HISTORY_TOKEN_BUDGET = int(os.getenv("CONVERSATION_HISTORY_TOKENS", "1500"))
+SUMMARY_MAX_TOKENS = int(os.getenv("CONVERSATION_SUMMARY_TOKENS", "300"))
+SUMMARY_BATCH_MESSAGES = int(os.getenv("CONVERSATION_SUMMARY_BATCH", "4"))
+SUMMARY_FOLD_LIMIT = 40  # messages folded per summarizer call
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summary")
+_lock = threading.Lock()
+_scheduled = set()
+_metrics = {"scheduled": 0, "updated": 0, "messages_folded": 0, "failures": 0}
+
+
+def window_messages() -> int:
+    return HISTORY_TURNS * 2
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token); no tokenizer needed"""
+    return (len(text) + 3) // 4
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    return text[:max_tokens * 4].rstrip() + "…"
+
+
+def _line(row) -> str:
+    return f"{row.role.capitalize()}: {row.content or f'[{row.mode} result]'}"
+
+
+def select_window(rows: list, budget: int = None) -> list:
+    """Newest rows (oldest first in the result) whose lines fit in `budget` tokens"""
+    budget = HISTORY_TOKEN_BUDGET if budget is None else budget
+    window, used = [], 0
+    for row in reversed(rows):
+        line = _line(row)
+        cost = estimate_tokens(line)
+        if used + cost > budget:
+            if not window:
+                # A single oversized message still gets its head in
+                window.append(_truncate(line, budget))
+            break
+        window.append(line)
+        used += cost
+    return window[::-1]
+
+
+def format_history(summary: Optional[str], window: list) -> str:
+    lines = []
+    if summary:
+        lines.append(f"Summary of earlier conversation: {_truncate(summary, SUMMARY_MAX_TOKENS)}")
+    return "\n".join(lines + window)
+
+
+def recent_messages_statement(conversation_id: int, after_id: Optional[int], limit: int):
+    """Newest messages not yet folded into the summary"""
+    return (
+        select(Message.id, Message.role, Message.content, Message.mode)
+        .where(Message.conversation_id == conversation_id, Message.id > (after_id or 0))
+        .order_by(Message.id.desc())
+        .limit(limit)
+    )
+
+
+async def load_history(db: AsyncSession, conversation: Conversation) -> str:
+    """Summary plus the recent window for `conversation`, ready for the prompt ("" for a new thread)"""
+    await message_writer.flush_async(conversation.id)
+    rows = (await db.execute(
+        # Messages that left the window but are not folded yet stay in (budget permitting)
+        recent_messages_statement(conversation.id, conversation.summary_through_id, window_messages() + SUMMARY_BATCH_MESSAGES)
+    )).all()
+    return format_history(conversation.summary, select_window(rows[::-1]))
+
+
+def summarize_turns(summary: Optional[str], lines: list) -> str:
+    """Ask the LLM to extend `summary` with `lines`"""
+    from langchain_openai import ChatOpenAI
+
+    llm = ChatOpenAI(
+        model="meta-llama/Meta-Llama-3-8B-Instruct",
+        openai_api_key=os.getenv("HUGGINGFACEHUB_API_TOKEN"),
+        openai_api_base="https://router.huggingface.co/v1",
+        temperature=0,
+        max_tokens=SUMMARY_MAX_TOKENS,
+    )
+    prompt = (
+        "Update the running summary of a conversation between a user and an assistant.\n"
+        "Keep the facts, names, numbers and open questions a follow-up question might refer to. "
+        f"Reply with the updated summary only, at most {SUMMARY_MAX_TOKENS * 3 // 4} words.\n\n"
+        f"Current summary:\n{summary or '(empty)'}\n\n"
+        "New messages:\n" + "\n".join(lines)
+    )
+    return llm.invoke(prompt).content.strip()
+
+
+def update_summary(conversation_id: int) -> int:
+    """Fold unsummarized messages older than the window into the summary; returns how many were folded"""
+    message_writer.flush(conversation_id)
+    with database.SessionLocal() as db:
+        conversation = db.get(Conversation, conversation_id)
+        if conversation is None:
+            return 0
+        through = conversation.summary_through_id or 0
+
+        # Oldest message still inside the prompt window
+        boundary = db.execute(
+            recent_messages_statement(conversation_id, through, 1).offset(window_messages() - 1)
+        ).first()
+        if boundary is None:
+            return 0
+        rows = db.execute(
+            select(Message.id, Message.role, Message.content, Message.mode)
+            .where(Message.conversation_id == conversation_id, Message.id > through, Message.id < boundary.id)
+            .order_by(Message.id)
+            .limit(SUMMARY_FOLD_LIMIT)
+        ).all()
+        if len(rows) < SUMMARY_BATCH_MESSAGES:
+            return 0
+
+        summary = summarize_turns(conversation.summary, [_truncate(_line(row), HISTORY_TOKEN_BUDGET) for row in rows])
+
+        # Only apply on top of the summary we read, and keep the sidebar order
+        result = db.execute(
+            update(Conversation)
+            .where(Conversation.id == conversation_id, func.coalesce(Conversation.summary_through_id, 0) == through)
+            .values(summary=summary, summary_through_id=rows[-1].id, updated_at=Conversation.updated_at)
+        )
+        db.commit()
+        return len(rows) if result.rowcount else 0
+
+
+def _update_in_background(conversation_id: int):
+    try:
+        folded = update_summary(conversation_id)
+        with _lock:
+            if folded:
+                _metrics["updated"] += 1
+                _metrics["messages_folded"] += folded
+    except Exception as e:
+        print(f"⚠ Summary update failed for conversation {conversation_id}: {e}")
+        with _lock:
+            _metrics["failures"] += 1
+    finally:
+        with _lock:
+            _scheduled.discard(conversation_id)
+
+
+def schedule_summary(conversation_id: int):
+    """Queue a summary update for `conversation_id` unless one is already queued"""
+    with _lock:
+        if conversation_id in _scheduled:
+            return
+        _scheduled.add(conversation_id)
+        _metrics["scheduled"] += 1
+    _executor.submit(_update_in_background, conversation_id)
+
+
+def memory_metrics() -> dict:
+    with _lock:
+        return {
+            "history_turns": HISTORY_TURNS,
+            "history_token_budget": HISTORY_TOKEN_BUDGET,
+            "in_progress": len(_scheduled),
+            **_metrics,
+        }
@@ -0,0 +1,147 @@
+from sqlalchemy import select, func, or_, and_, case
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from typing import Optional
+import base64
+import os
+from app.database import Conversation, Message
+
+# Sidebar listing: one statement returns a page of conversations together
+# with their message counts (a correlated COUNT per returned row, so only
+# the page's messages are counted and no message text is loaded). Pages are
+# keyset-paginated on (updated_at, id) descending; the cursor is the last
+# row's key, so fetching page N costs the same as fetching page 1.
+#
+# Conversation detail: messages are keyset-paginated on id, newest first.
+# Message metadata is returned as the stored JSON text, never decoded and
+# re-encoded; payloads above METADATA_INLINE_BYTES stay in the database and
+# are fetched one message at a time.
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+METADATA_INLINE_BYTES = int(os.getenv("MESSAGE_METADATA_INLINE_BYTES", "65536"))
+
+
+def encode_cursor(updated_at: datetime, conversation_id: int) -> str:
+    raw = f"{updated_at.isoformat()}|{conversation_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """(updated_at, id) from a cursor; raises ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        updated_at, conversation_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(updated_at), int(conversation_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def _message_count():
+    return (
+        select(func.count(Message.id))
+        .where(Message.conversation_id == Conversation.id)
+        .correlate(Conversation)
+        .scalar_subquery()
+    )
+
+
+def conversations_statement(user_id: int, limit: int, after: Optional[tuple] = None):
+    """Page of a user's conversations after keyset (updated_at, id), with message counts"""
+    statement = (
+        select(
+            Conversation.id,
+            Conversation.title,
+            Conversation.created_at,
+            Conversation.updated_at,
+            _message_count().label("message_count"),
+        )
+        .where(Conversation.user_id == user_id)
+        .order_by(Conversation.updated_at.desc(), Conversation.id.desc())
+        .limit(limit)
+    )
+    if after:
+        updated_at, conversation_id = after
+        statement = statement.where(or_(
+            Conversation.updated_at < updated_at,
+            and_(Conversation.updated_at == updated_at, Conversation.id < conversation_id),
+        ))
+    return statement
+
+
+async def list_conversations(db: AsyncSession, user_id: int, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> tuple[list, Optional[str]]:
+    """
+    One page of a user's conversations, most recently updated first.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    after = decode_cursor(cursor) if cursor else None
+
+    result = await db.execute(conversations_statement(user_id, limit + 1, after))
+    rows = [dict(row._mapping) for row in result]
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["updated_at"], rows[-1]["id"])
+    return rows, next_cursor
+
+
+def conversation_statement(conversation_id: int, user_id: int):
+    return select(
+        Conversation.id,
+        Conversation.title,
+        Conversation.created_at,
+        Conversation.updated_at,
+        _message_count().label("message_count"),
+    ).where(Conversation.id == conversation_id, Conversation.user_id == user_id)
+
+
+async def get_conversation(db: AsyncSession, conversation_id: int, user_id: int) -> Optional[dict]:
+    """Conversation header with its message count, or None if the user doesn't own it"""
+    row = (await db.execute(conversation_statement(conversation_id, user_id))).first()
+    return dict(row._mapping) if row else None
+
+
+def messages_statement(conversation_id: int, limit: int, before: Optional[int] = None):
+    """Page of messages older than id `before`, newest first; large metadata left in the database"""
+    size = func.length(Message.meta)
+    statement = (
+        select(
+            Message.id,
+            Message.conversation_id,
+            Message.role,
+            Message.content,
+            Message.mode,
+            Message.created_at,
+            case((size <= METADATA_INLINE_BYTES, Message.meta), else_=None).label("metadata"),
+            func.coalesce(size, 0).label("metadata_size"),
+        )
+        .where(Message.conversation_id == conversation_id)
+        .order_by(Message.id.desc())
+        .limit(limit)
+    )
+    if before is not None:
+        statement = statement.where(Message.id < before)
+    return statement
+
+
+async def list_messages(db: AsyncSession, conversation_id: int, limit: int = DEFAULT_PAGE_SIZE, before: Optional[int] = None) -> tuple[list, Optional[int]]:
+    """
+    One page of messages, newest first, older than message id `before`.
+    Returns (rows, next_before); next_before is None when no older messages remain.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    result = await db.execute(messages_statement(conversation_id, limit + 1, before))
+    rows = [dict(row._mapping) for row in result]
+    next_before = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_before = rows[-1]["id"]
+    return rows, next_before
+
+
+async def get_message_metadata(db: AsyncSession, conversation_id: int, message_id: int) -> Optional[str]:
+    """Stored metadata JSON text of one message"""
+    result = await db.execute(
+        select(Message.meta).where(Message.id == message_id, Message.conversation_id == conversation_id)
+    )
+    return result.scalar_one_or_none()
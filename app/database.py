@@ -1,14 +1,115 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, ForeignKey, Boolean
+from sqlalchemy import create_engine, event, Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool
 from datetime import datetime
 import os
 
 # Database configuration
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./ai_assistant.db")
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {})
+# SQLite profile, applied to every new connection. WAL lets readers run
+# alongside the single writer, synchronous=NORMAL is durable across app
+# crashes in WAL mode (fsync at checkpoints, not at every commit), and the
+# busy timeout makes a writer wait for the lock instead of failing with
+# "database is locked".
+SQLITE_JOURNAL_MODE = os.getenv("CHAT_DB_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("CHAT_DB_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_SIZE_KB = int(os.getenv("CHAT_DB_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE = int(os.getenv("CHAT_DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("CHAT_DB_BUSY_TIMEOUT_MS", "5000"))
+
+# Per process: one connection per busy request thread (AnyIO's default
+# threadpool has 40), most of them readers. Scale with uvicorn --workers
+# by keeping this per-worker figure, not by raising it.
+POOL_SIZE = int(os.getenv("CHAT_DB_POOL_SIZE", "10"))
+MAX_OVERFLOW = int(os.getenv("CHAT_DB_MAX_OVERFLOW", "30"))
+POOL_TIMEOUT = float(os.getenv("CHAT_DB_POOL_TIMEOUT", "10"))
+
+
+def sqlite_pragmas() -> dict:
+    return {
+        "journal_mode": SQLITE_JOURNAL_MODE,
+        "synchronous": SQLITE_SYNCHRONOUS,
+        "cache_size": -SQLITE_CACHE_SIZE_KB,
+        "mmap_size": SQLITE_MMAP_SIZE,
+        "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+        "temp_store": "MEMORY",
+    }
+
+
+def build_engine(url: str = DATABASE_URL, tuned: bool = True):
+    """Chat database engine; SQLite gets the PRAGMA profile above (tuned=False keeps SQLite defaults)"""
+    if not url.startswith("sqlite"):
+        return create_engine(url, pool_pre_ping=True, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW, pool_timeout=POOL_TIMEOUT)
+
+    if ":memory:" in url or url in ("sqlite://", "sqlite+pysqlite://"):
+        return create_engine(url, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    if not tuned:
+        return create_engine(url, connect_args={"check_same_thread": False})
+
+    pragmas = sqlite_pragmas()
+    new_engine = create_engine(
+        url,
+        # The driver's own busy wait; PRAGMA busy_timeout below sets the same in SQLite
+        connect_args={"check_same_thread": False, "timeout": pragmas["busy_timeout"] / 1000},
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
+    )
+
+    @event.listens_for(new_engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return new_engine
+
+
+def async_url(url: str) -> str:
+    """The asyncio driver URL for a sync DATABASE_URL"""
+    drivers = {"sqlite": "sqlite+aiosqlite", "mysql": "mysql+aiomysql", "postgresql": "postgresql+asyncpg"}
+    scheme, rest = url.split("://", 1)
+    return f"{drivers.get(scheme.split('+')[0], scheme)}://{rest}"
+
+
+def build_async_engine(url: str = None):
+    """Async engine for the request path, with the same SQLite profile and pool sizing"""
+    url = url or async_url(DATABASE_URL)
+    if not url.startswith("sqlite"):
+        return create_async_engine(url, pool_pre_ping=True, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW, pool_timeout=POOL_TIMEOUT)
+
+    if ":memory:" in url or url.endswith("://"):
+        return create_async_engine(url, poolclass=StaticPool)
+
+    pragmas = sqlite_pragmas()
+    new_engine = create_async_engine(
+        url,
+        connect_args={"timeout": pragmas["busy_timeout"] / 1000},
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
+    )
+
+    @event.listens_for(new_engine.sync_engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return new_engine
+
+
+# Sync engine: migrations, the message writer thread and scripts.
+# Async engine: FastAPI endpoints, so DB waits don't block the event loop.
+engine = build_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = build_async_engine(os.getenv("ASYNC_DATABASE_URL"))
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 
@@ -23,6 +124,7 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     is_active = Column(Boolean, default=True)
     role = Column(String(20), default="user")  # 'user' or 'admin'
+    password_changed_at = Column(DateTime, nullable=True)  # tokens issued earlier are rejected
     
     # Relationships
     conversations = relationship("Conversation", back_populates="user", cascade="all, delete-orphan")
@@ -37,10 +139,15 @@ class Conversation(Base):
     title = Column(String(200), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    summary = Column(Text, nullable=True)  # rolling summary of turns older than the prompt window
+    summary_through_id = Column(Integer, nullable=True)  # last message folded into the summary
     
     # Relationships
     user = relationship("User", back_populates="conversations")
     messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan")
+    
+    # Sidebar listing: WHERE user_id = ? ORDER BY updated_at DESC, id DESC
+    __table_args__ = (Index("ix_conversations_user_updated", "user_id", "updated_at", "id"),)
 
 
 # Message Model
@@ -57,11 +164,15 @@ class Message(Base):
     
     # Relationships
     conversation = relationship("Conversation", back_populates="messages")
+    
+    # Message pages and counts: WHERE conversation_id = ? ORDER BY id DESC
+    __table_args__ = (Index("ix_messages_conversation_id", "conversation_id", "id"),)
 
 
-# Create tables
+# Create tables and apply pending schema migrations
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    from app.migrations import migrate
+    migrate(engine)
 
 
 # Dependency to get DB session
@@ -71,3 +182,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Dependency to get an async DB session (endpoints)
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
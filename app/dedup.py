@@ -0,0 +1,178 @@
+import numpy as np
+import pickle
+import zlib
+import re
+import os
+
+# Near-duplicate chunk detection with MinHash signatures and LSH banding
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.9"))  # estimated Jaccard similarity
+DEDUP_MODE = os.getenv("DEDUP_MODE", "link")  # 'drop' or 'link' duplicates to the canonical chunk
+NUM_PERM = 128
+SHINGLE_WORDS = 3
+
+INDEX_PATH = "data/faiss_index/minhash.pkl"
+
+_PRIME = np.uint64(4294967291)  # largest prime below 2**32, so a*x + b fits in uint64
+_rng = np.random.default_rng(1)
+_a = _rng.integers(1, int(_PRIME), size=NUM_PERM, dtype=np.uint64)
+_b = _rng.integers(0, int(_PRIME), size=NUM_PERM, dtype=np.uint64)
+
+signatures = {}  # chunk id -> MinHash signature
+buckets = {}     # (band, band bytes) -> set of chunk ids
+_loaded = False
+
+
+def _choose_bands(threshold: float, num_perm: int):
+    """Pick (bands, rows) whose LSH S-curve threshold sits just below the target"""
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        curve = (1 / bands) ** (1 / rows)
+        if curve <= threshold and (best is None or curve > best[0]):
+            best = (curve, bands, rows)
+    return best[1], best[2]
+
+
+BANDS, ROWS = _choose_bands(DEDUP_THRESHOLD, NUM_PERM)
+
+
+def _shingles(text: str) -> set:
+    words = re.sub(r"\s+", " ", text.lower()).strip().split(" ")
+    if len(words) <= SHINGLE_WORDS:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def minhash(text: str) -> np.ndarray:
+    hashes = np.fromiter(
+        (zlib.crc32(s.encode("utf-8")) for s in _shingles(text)),
+        dtype=np.uint64
+    )
+    # (NUM_PERM, n_shingles) universal hashes, min over shingles
+    permuted = (np.outer(_a, hashes) + _b[:, None]) % _PRIME
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def _band_keys(signature: np.ndarray):
+    for band in range(BANDS):
+        yield band, signature[band * ROWS:(band + 1) * ROWS].tobytes()
+
+
+def load():
+    global signatures, buckets, _loaded
+
+    if _loaded:
+        return
+    _loaded = True
+
+    if os.path.exists(INDEX_PATH):
+        with open(INDEX_PATH, "rb") as f:
+            state = pickle.load(f)
+        # Banding depends on the threshold, so rebuild buckets from signatures
+        signatures = state.get("signatures", {})
+        buckets = {}
+        for chunk_id, signature in signatures.items():
+            _insert(chunk_id, signature)
+        print(f"✓ Loaded MinHash index with {len(signatures)} chunks")
+
+
+def save():
+    os.makedirs(os.path.dirname(INDEX_PATH), exist_ok=True)
+    tmp_path = INDEX_PATH + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump({"signatures": signatures}, f)
+    os.replace(tmp_path, INDEX_PATH)
+
+
+def _insert(chunk_id: str, signature: np.ndarray, index: tuple = None):
+    sigs, bks = index or (signatures, buckets)
+    sigs[chunk_id] = signature
+    for key in _band_keys(signature):
+        bks.setdefault(key, set()).add(chunk_id)
+
+
+def _best_match(signature: np.ndarray, index: tuple = None):
+    sigs, bks = index or (signatures, buckets)
+    candidates = set()
+    for key in _band_keys(signature):
+        candidates.update(bks.get(key, ()))
+
+    best_id, best_similarity = None, 0.0
+    for chunk_id in candidates:
+        similarity = float(np.mean(sigs[chunk_id] == signature))
+        if similarity > best_similarity:
+            best_id, best_similarity = chunk_id, similarity
+    return best_id, best_similarity
+
+
+def find_duplicate(signature: np.ndarray, index: tuple = None):
+    """Return (canonical chunk id, estimated similarity) or (None, 0.0)"""
+    best_id, best_similarity = _best_match(signature, index)
+    if best_similarity >= DEDUP_THRESHOLD:
+        return best_id, best_similarity
+    return None, 0.0
+
+
+def filter_duplicates(texts: list[str], ids: list[str]):
+    """
+    Split a batch into chunks to index and near-duplicates of chunks
+    already indexed (or earlier in the same batch). Nothing is added to
+    the index here: pass the returned signatures to add() once the kept
+    chunks are stored, so a failed write leaves no phantom canonicals.
+
+    Returns:
+        keep: indexes of texts to index
+        duplicates: {index of text: canonical chunk id}
+        pending: {chunk id: signature} for the kept chunks
+    """
+    if not DEDUP_ENABLED:
+        return list(range(len(texts))), {}, {}
+
+    load()
+    keep, duplicates = [], {}
+    batch = ({}, {})  # signatures and buckets of the kept chunks so far
+    for i, (text, chunk_id) in enumerate(zip(texts, ids)):
+        signature = minhash(text)
+        canonical_id, similarity = find_duplicate(signature)
+        batch_id, batch_similarity = find_duplicate(signature, batch)
+        if batch_similarity > similarity:
+            canonical_id = batch_id
+        if canonical_id is not None:
+            duplicates[i] = canonical_id
+        else:
+            keep.append(i)
+            _insert(chunk_id, signature, batch)
+    return keep, duplicates, batch[0]
+
+
+def add(pending: dict):
+    """Index the signatures of chunks that are now stored"""
+    load()
+    for chunk_id, signature in pending.items():
+        _insert(chunk_id, signature)
+
+
+def backfill(chunk_ids: list[str], texts: list[str]):
+    """Index chunks that were stored before deduplication was enabled"""
+    load()
+    for chunk_id, text in zip(chunk_ids, texts):
+        _insert(chunk_id, minhash(text))
+    print(f"✓ Backfilled MinHash index with {len(chunk_ids)} chunks")
+
+
+def remove(chunk_ids):
+    """Forget removed chunks so future copies of them are indexed again"""
+    load()
+    for chunk_id in chunk_ids:
+        signature = signatures.pop(chunk_id, None)
+        if signature is None:
+            continue
+        for key in _band_keys(signature):
+            bucket = buckets.get(key)
+            if bucket is not None:
+                bucket.discard(chunk_id)
+                if not bucket:
+                    del buckets[key]
@@ -0,0 +1,57 @@
+import numpy as np
+import os
+
+# Keep chart payloads bounded: time series go through LTTB, which keeps the
+# points that best preserve the visual shape; categorical series keep their
+# largest groups and fold the rest into "Other".
+CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "500"))
+
+
+def lttb(rows: list[tuple], threshold: int) -> list[tuple]:
+    """
+    Largest-Triangle-Three-Buckets over ordered (label, value) rows.
+    x is the row position, so rows should be evenly spaced buckets.
+    """
+    n = len(rows)
+    if threshold >= n or threshold < 3:
+        return list(rows)
+
+    y = np.asarray([row[1] for row in rows], dtype=float)
+    x = np.arange(n, dtype=float)
+    every = (n - 2) / (threshold - 2)
+
+    keep = [0]
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third triangle vertex
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        areas = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(areas.argmax())
+        keep.append(a)
+
+    keep.append(n - 1)
+    return [rows[i] for i in keep]
+
+
+def cap_categories(rows: list[tuple], max_points: int, additive: bool = True) -> list[tuple]:
+    """
+    Largest max_points - 1 groups plus an "Other" total for the rest.
+    Non-additive metrics (averages) just keep the largest groups.
+    """
+    if len(rows) <= max_points:
+        return list(rows)
+
+    ranked = sorted(rows, key=lambda row: row[1], reverse=True)
+    if not additive:
+        return ranked[:max_points]
+    head, tail = ranked[:max_points - 1], ranked[max_points - 1:]
+    return head + [("Other", sum(row[1] for row in tail))]
@@ -4,47 +4,70 @@ import pandas as pd
 from pypdf import PdfReader
 from docx import Document as DocxDocument
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from .vectorstore import create_vectorstore
 
-def ingest_file(path: str) -> int:
+SUPPORTED_EXTENSIONS = ['.pdf', '.txt', '.md', '.docx', '.csv', '.json']
+
+splitter = RecursiveCharacterTextSplitter(
+    chunk_size=1000,
+    chunk_overlap=200
+)
+
+
+def ingest_file(path: str, source_key: str = None, persist: bool = True, stats: dict = None) -> int:
     """
     Ingest a file of supported format into the vectorstore.
     Supported formats: .pdf, .txt, .md, .docx, .csv, .json
+    
+    Re-ingesting the same source key replaces its previous chunks.
+    Pass a stats dict to get chunk and near-duplicate counts back.
     """
-    ext = os.path.splitext(path)[1].lower()
-    full_text = ""
+    # Imported here so extraction-only callers (bulk ingest workers)
+    # don't load the embedding model
+    from .vectorstore import replace_source
+
+    source_key = source_key or f"file:{path}"
     
     try:
-        if ext == '.pdf':
-            full_text = _load_pdf(path)
-        elif ext in ['.txt', '.md']:
-            full_text = _load_text(path)
-        elif ext == '.docx':
-            full_text = _load_docx(path)
-        elif ext in ['.csv', '.json']:
-            full_text = _load_structured(path, ext)
-        else:
-            raise ValueError(f"Unsupported file format: {ext}")
-            
-        if not full_text.strip():
-            print(f"Warning: No text extracted from {path}")
-            return 0
-
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200
-        )
-        chunks = splitter.split_text(full_text)
+        chunks = extract_chunks(path)
         
-        if chunks:
-            create_vectorstore(chunks)
-            
-        return len(chunks)
+        return replace_source(
+            source_key,
+            chunks,
+            [{"source": path} for _ in chunks],
+            persist=persist,
+            stats=stats
+        )
         
     except Exception as e:
         print(f"Error ingesting file {path}: {str(e)}")
         raise e
 
+
+def extract_chunks(path: str) -> list[str]:
+    """Extract the text of a supported file and split it into chunks"""
+    full_text = extract_text(path)
+    
+    if not full_text.strip():
+        print(f"Warning: No text extracted from {path}")
+        return []
+    
+    return splitter.split_text(full_text)
+
+
+def extract_text(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    
+    if ext == '.pdf':
+        return _load_pdf(path)
+    elif ext in ['.txt', '.md']:
+        return _load_text(path)
+    elif ext == '.docx':
+        return _load_docx(path)
+    elif ext in ['.csv', '.json']:
+        return _load_structured(path, ext)
+    else:
+        raise ValueError(f"Unsupported file format: {ext}")
+
 def _load_pdf(path: str) -> str:
     reader = PdfReader(path)
     text = ""
@@ -1,16 +1,184 @@
-def is_chart_query(query:str)->bool:
-    keywords=[
-        "chart","graph","plot",
-        "show","trend","visualize",
+from dataclasses import dataclass
+from functools import lru_cache
+import hashlib
+import json
+import math
+import re
+import os
+import numpy as np
+from starlette.concurrency import run_in_threadpool
+from app.aggregations import parse_query
 
-    ]
+# Routes a question to "chart", "aggregation" or "rag" in one pass.
+# A single compiled alternation of word-boundary cues is scanned once and
+# its hits are weighted per route; when the winning margin is too small the
+# question goes to a nearest-centroid classifier over embedded prototype
+# questions, whose centroids are computed once and cached on disk.
+ROUTES = ("chart", "aggregation", "rag")
+MIN_CONFIDENCE = float(os.getenv("INTENT_MIN_CONFIDENCE", "0.7"))
+EMBEDDING_FALLBACK = os.getenv("INTENT_EMBEDDING_FALLBACK", "true").lower() == "true"
+PROTOTYPE_CACHE_PATH = "data/intent_prototypes.npz"
+SOFTMAX_TEMPERATURE = 0.05
 
+# (group name, route, weight, pattern)
+_CUES = [
+    ("chart_strong", "chart", 5.0, r"charts?|graphs?|plot(?:ted)?|visuali[sz]e|visuali[sz]ation|diagram|histogram|pie|bar chart|line chart"),
+    ("chart_weak", "chart", 1.0, r"trends?|over time|daily|weekly|monthly|per (?:day|week|month)|by (?:day|week|month)"),
+    ("aggregation", "aggregation", 1.0,
+     r"total|sum|average|avg|mean|how many|count|number of|highest|lowest|most|least|top \d+|maximum|minimum"
+     r"|max|min|spent|spend|revenue|sales|amount|ranking|rank"),
+    ("aggregation_dimension", "aggregation", 1.0, r"which (?:customer|client|product|item|month)s?|per (?:customer|product)|by (?:customer|product|finance)"),
+    ("rag", "rag", 1.5,
+     r"what is|what are|what does|explain|describe|summari[sz]e|summary|policy|policies|document|documents|according to"
+     r"|why|how (?:do|does|can|to|should)|tell me about|define|definition|meaning|procedure|guideline|contract|terms"),
+]
+_PATTERN = re.compile("|".join(f"(?P<{name}>\\b(?:{pattern})\\b)" for name, _, _, pattern in _CUES))
+_WEIGHTS = {name: (route, weight) for name, route, weight, _ in _CUES}
+
+PROTOTYPES = {
+    "chart": [
+        "show me a chart of sales by month",
+        "plot revenue over time",
+        "graph the monthly totals",
+        "visualize sales per product",
+        "draw a bar chart of customer spending",
+        "what does the sales trend look like",
+    ],
+    "aggregation": [
+        "which customer spent the most",
+        "what is the total amount of sales",
+        "how many orders did we get in march",
+        "top 5 products by revenue",
+        "average purchase amount per customer",
+        "who is our biggest buyer",
+    ],
+    "rag": [
+        "what does the refund policy say",
+        "summarize the uploaded report",
+        "explain the terms of the supplier contract",
+        "what are the onboarding steps for new employees",
+        "according to the document, when is the deadline",
+        "tell me about the company history",
+    ],
+}
+
+
+@dataclass(frozen=True)
+class Intent:
+    route: str
+    confidence: float
+    method: str  # "rules", "embedding" or "default"
+
+
+def _rule_scores(q: str) -> dict:
+    scores = dict.fromkeys(ROUTES, 0.0)
+    for match in _PATTERN.finditer(q):
+        route, weight = _WEIGHTS[match.lastgroup]
+        scores[route] += weight
+    return scores
+
+
+def _margin_confidence(scores: dict) -> tuple[str, float]:
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    (route, best), (_, second) = ranked[0], ranked[1]
+    return route, 1 - math.exp(-(best - second))
+
+
+_centroids = None  # (routes, matrix of unit vectors)
+
+
+def _prototype_key(model_name: str) -> str:
+    return hashlib.sha1(json.dumps([model_name, PROTOTYPES], sort_keys=True).encode()).hexdigest()
+
+
+def _get_centroids():
+    """Unit-length centroid per route, cached in memory and on disk per model and prototype set"""
+    global _centroids
+
+    if _centroids is not None:
+        return _centroids
+
+    from app.vectorstore import embeddings
+    key = _prototype_key(getattr(embeddings, "model_name", type(embeddings).__name__))
+
+    if os.path.exists(PROTOTYPE_CACHE_PATH):
+        try:
+            cached = np.load(PROTOTYPE_CACHE_PATH)
+            if str(cached["key"]) == key:
+                _centroids = (list(cached["routes"]), cached["centroids"])
+                return _centroids
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠ Ignoring intent prototype cache: {e}")
+
+    routes = list(PROTOTYPES)
+    centroids = []
+    for route in routes:
+        vectors = np.asarray(embeddings.embed_documents(PROTOTYPES[route]), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        centroid = vectors.mean(axis=0)
+        centroids.append(centroid / np.linalg.norm(centroid))
+    centroids = np.vstack(centroids)
+
+    os.makedirs(os.path.dirname(PROTOTYPE_CACHE_PATH), exist_ok=True)
+    with open(PROTOTYPE_CACHE_PATH, "wb") as f:
+        np.savez(f, key=key, routes=np.asarray(routes), centroids=centroids)
+    _centroids = (routes, centroids)
+    return _centroids
+
+
+def _embedding_intent(query: str) -> Intent:
+    from app.vectorstore import embeddings
+
+    routes, centroids = _get_centroids()
+    vector = np.asarray(embeddings.embed_query(query), dtype=np.float32)
+    similarities = centroids @ (vector / np.linalg.norm(vector))
+
+    weights = np.exp((similarities - similarities.max()) / SOFTMAX_TEMPERATURE)
+    probabilities = weights / weights.sum()
+    best = int(probabilities.argmax())
+    return Intent(routes[best], round(float(probabilities[best]), 3), "embedding")
+
+
+def classify_rules(query: str) -> Intent:
+    """Rules only: one regex pass, no model"""
+    q = query.lower()
+    scores = _rule_scores(q)
+    # A question the aggregation engine can answer directly is strong evidence
+    if scores["chart"] < 5 and parse_query(q) is not None:
+        scores["aggregation"] += 2.0
+
+    route, confidence = _margin_confidence(scores)
+    if confidence == 0:
+        return Intent("rag", 0.0, "default")
+    return Intent(route, round(confidence, 3), "rules")
+
+
+@lru_cache(maxsize=4096)
+def classify(query: str) -> Intent:
+    """Route and confidence for a question; ambiguous rule results use the embedding fallback"""
+    intent = classify_rules(query)
+    if intent.confidence >= MIN_CONFIDENCE or not EMBEDDING_FALLBACK:
+        return intent
+
+    try:
+        fallback = _embedding_intent(query)
+    except Exception as e:
+        print(f"⚠ Intent embedding fallback failed: {e}")
+        return intent
+    return fallback if fallback.confidence > intent.confidence else intent
+
+
+async def classify_async(query: str) -> Intent:
+    """classify() for request handlers: the regex pass runs inline, the embedding fallback on a worker thread"""
+    intent = classify_rules(query)
+    if intent.confidence >= MIN_CONFIDENCE or not EMBEDDING_FALLBACK:
+        return intent
+    return await run_in_threadpool(classify, query)
+
+
+def is_chart_query(query: str) -> bool:
+    return classify(query).route == "chart"
 
-    return any(k in query.lower() for k in keywords)
 
 def is_aggregation_query(query: str) -> bool:
-    keywords = [
-        "most", "total", "sum", "highest",
-        "maximum", "max", "spent","Which"
-    ]
-    return any(k in query.lower() for k in keywords)
+    return classify(query).route == "aggregation"
@@ -0,0 +1,106 @@
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+from langchain_classic.schema import Document
+from collections import Counter
+from typing import Any, List
+import threading
+import heapq
+import math
+
+
+def default_preprocessing_func(text: str) -> list[str]:
+    # Same tokenization as langchain's BM25Retriever
+    return text.split()
+
+
+class KeywordIndex:
+    """
+    Incremental BM25 inverted index (keyword half of hybrid search)
+
+    Unlike BM25Retriever, documents can be added and removed by id in time
+    proportional to their own length, so replacing one source never
+    rebuilds the index for the whole corpus. Queries only score documents
+    that share a term with the query. Writers and searches share a lock,
+    so a query never iterates a posting list while it is being changed.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.docs = {}        # id -> Document
+        self.doc_terms = {}   # id -> Counter of term frequencies
+        self.doc_lengths = {} # id -> number of tokens
+        self.postings = {}    # term -> {id: term frequency}
+        self.total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add_documents(self, ids: list[str], documents: list[Document]):
+        # Tokenize outside the lock; only the index updates block searches
+        analyzed = [(doc_id, doc, Counter(default_preprocessing_func(doc.page_content))) for doc_id, doc in zip(ids, documents)]
+        with self._lock:
+            for doc_id, doc, terms in analyzed:
+                if doc_id in self.docs:
+                    self.remove(doc_id)
+
+                self.docs[doc_id] = doc
+                self.doc_terms[doc_id] = terms
+                self.doc_lengths[doc_id] = sum(terms.values())
+                self.total_length += self.doc_lengths[doc_id]
+                for term, tf in terms.items():
+                    self.postings.setdefault(term, {})[doc_id] = tf
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            terms = self.doc_terms.pop(doc_id, None)
+            if terms is None:
+                return
+
+            del self.docs[doc_id]
+            self.total_length -= self.doc_lengths.pop(doc_id)
+            for term in terms:
+                posting = self.postings[term]
+                del posting[doc_id]
+                if not posting:
+                    del self.postings[term]
+
+    def search(self, query: str, k: int = 4) -> list[Document]:
+        with self._lock:
+            return self._search(query, k)
+
+    def _search(self, query: str, k: int) -> list[Document]:
+        n_docs = len(self.docs)
+        if not n_docs:
+            return []
+
+        avg_length = self.total_length / n_docs
+        scores = {}
+        for term in set(default_preprocessing_func(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            # Lucene-style idf: always positive, unlike plain BM25Okapi
+            idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, tf in posting.items():
+                norm = tf + self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+
+        top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [self.docs[doc_id] for doc_id, _ in top]
+
+    def as_retriever(self, k: int = 4) -> "KeywordRetriever":
+        return KeywordRetriever(index=self, k=k)
+
+
+class KeywordRetriever(BaseRetriever):
+    """LangChain retriever over a KeywordIndex, usable in EnsembleRetriever"""
+
+    index: Any
+    k: int = 4
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self.index.search(query, k=self.k)
@@ -1,22 +1,25 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, status
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, status, BackgroundTasks, Request, Query
 from dotenv import load_dotenv
 
 load_dotenv(override=True)
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.middleware.gzip import GZipMiddleware
+from sqlalchemy import select, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 import shutil
-import json
 from typing import Optional
 from datetime import timedelta, datetime
-from app.database import get_db, init_db, User, Conversation, Message
+from app.database import get_async_db, init_db, engine, User, Conversation, Message
 from app.auth import (
-    hash_password, 
-    verify_password, 
     create_access_token, 
     get_current_user,
     get_current_admin,
+    invalidate_user,
+    password_changed_epoch,
+    user_cache_metrics,
+    UserSnapshot,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
 from app.schemas import (
@@ -24,6 +27,8 @@ from app.schemas import (
     UserLogin, 
     Token, 
     UserResponse,
+    PasswordChange,
+    UserAdminUpdate,
     ConversationCreate,
     ConversationResponse,
     ConversationWithMessages,
@@ -31,11 +36,23 @@ from app.schemas import (
     QueryRequest
 )
 from app.ingest import ingest_file
+from app.vectorstore import delete_source, compact_vectorstore, schedule_persist, vectorstore_stats
+from app import source_registry
 from app.sql_ingest import ingest_business_data
-from app.intent import is_chart_query, is_aggregation_query
-from app.router import handle_chart_query
-from app.analytics import top_customer
-from app.rag_stream import ask_question_streaming
+from app.intent import classify_async
+from app.speculative import should_speculate, speculate, speculation_metrics
+from app.router import handle_chart_query, handle_aggregation_query, spec_chart, series_chart
+from app.aggregations import AggregationSpec
+from app.downsample import CHART_MAX_POINTS
+from app.analytics_export import export_rows, FORMATS as EXPORT_FORMATS, EXPORT_TIMEOUT_SECONDS, ExportBusy, acquire_slot, release_slot
+from app import aggregate_cache, analytics_snapshot, business_db
+from app.analytics_executor import run_analytics, executor_metrics, AnalyticsBusy, AnalyticsTimeout, ClientDisconnected
+from app.rag_stream import ask_question_events
+from app.conversation_memory import load_history, schedule_summary, memory_metrics
+from app.streaming import coalesced_frames, frame, dumps, FastJSONResponse, LimitedStreamingResponse
+from app.password_executor import hash_password_async, verify_password_async, password_executor_metrics, PasswordHashBusy
+from app import conversation_queries, message_writer
+from app.conversation_queries import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 # LangChain Caching
 from langchain_classic.globals import set_llm_cache
@@ -47,6 +64,14 @@ app = FastAPI(title="AI Data Assistant")
 # Initialize database
 init_db()
 
+# Refresh materialized chart aggregates on a schedule
+aggregate_cache.start_scheduler(business_db.get_engine())
+
+
+@app.on_event("shutdown")
+def flush_message_queue():
+    message_writer.stop()
+
 # Initialize LLM Cache
 if not os.path.exists(".cache.db"):
     print("Creating new LLM cache database...")
@@ -59,34 +84,50 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Compress JSON bodies above GZIP_MIN_BYTES (event streams are never compressed)
+app.add_middleware(GZipMiddleware, minimum_size=int(os.getenv("GZIP_MIN_BYTES", "1000")))
+
 
 # ==================== AUTH ENDPOINTS ====================
 
+async def _password_task(task, *args):
+    """Run a bcrypt task on its dedicated pool, answering 503 when the pool is saturated"""
+    try:
+        return await task(*args)
+    except PasswordHashBusy as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "1"})
+
+
 @app.post("/auth/register", response_model=Token, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Register a new user"""
     
     # Check if username exists
-    if db.query(User).filter(User.username == user_data.username).first():
+    if (await db.execute(select(User.id).where(User.username == user_data.username))).first():
         raise HTTPException(status_code=400, detail="Username already registered")
     
     # Check if email exists
-    if db.query(User).filter(User.email == user_data.email).first():
+    if (await db.execute(select(User.id).where(User.email == user_data.email))).first():
         raise HTTPException(status_code=400, detail="Email already registered")
     
+    # Give the pooled connection back while bcrypt runs
+    await db.rollback()
+    hashed_password = await _password_task(hash_password_async, user_data.password)
+    
     # Create user (default role is 'user')
     user = User(
         username=user_data.username,
         email=user_data.email,
-        hashed_password=hash_password(user_data.password),
+        hashed_password=hashed_password,
         role="user" 
     )
     
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     
     # Create access token (include role in payload if needed, but we fetch from DB)
     access_token = create_access_token(data={"sub": user.username, "role": user.role})
@@ -99,12 +140,14 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
 
 
 @app.post("/auth/login", response_model=Token)
-def login(credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(credentials: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """Login user"""
     
-    user = db.query(User).filter(User.username == credentials.username).first()
+    user = (await db.execute(select(User).where(User.username == credentials.username))).scalar_one_or_none()
+    # Give the pooled connection back while bcrypt runs
+    await db.commit()
     
-    if not user or not verify_password(credentials.password, user.hashed_password):
+    if not user or not await _password_task(verify_password_async, credentials.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password"
@@ -125,55 +168,112 @@ def login(credentials: UserLogin, db: Session = Depends(get_db)):
 # ...
 
 @app.post("/ingest/mysql")
-def ingest_mysql(current_user: User = Depends(get_current_admin)):
-    """Ingest MySQL data (admin only)"""
+def ingest_mysql(full_refresh: bool = False, current_user: UserSnapshot = Depends(get_current_admin)):
+    """Ingest new or changed MySQL rows (admin only)"""
     
-    rows = ingest_business_data()
+    stats = {}
+    rows = ingest_business_data(full_refresh=full_refresh, stats=stats)
     return {
         "status": "success",
-        "rows_ingested": rows
+        "rows_ingested": rows,
+        "duplicates_skipped": stats.get("duplicates", 0)
     }
 
 
 @app.get("/auth/me", response_model=UserResponse)
-def get_me(current_user: User = Depends(get_current_user)):
+def get_me(current_user: UserSnapshot = Depends(get_current_user)):
     """Get current user info"""
     return current_user
 
 
+@app.post("/auth/password", response_model=Token)
+async def change_password(
+    passwords: PasswordChange,
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Change password; tokens issued before the change stop working, a new one is returned"""
+    
+    user = await db.get(User, current_user.id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    # Give the pooled connection back while bcrypt runs
+    await db.commit()
+    if not await _password_task(verify_password_async, passwords.current_password, user.hashed_password):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect password")
+    
+    user.hashed_password = await _password_task(hash_password_async, passwords.new_password)
+    user.password_changed_at = datetime.utcnow().replace(microsecond=0)
+    await db.commit()
+    invalidate_user(user.id)
+    
+    # Dated just after the change, which rejects tokens from its own second
+    access_token = create_access_token(
+        data={"sub": user.username, "role": user.role}, issued_at=password_changed_epoch(user) + 1
+    )
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "user": user
+    }
+
+
+@app.patch("/admin/users/{user_id}", response_model=UserResponse)
+async def update_user(
+    user_id: int,
+    changes: UserAdminUpdate,
+    current_user: UserSnapshot = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Change a user's role or active flag (admin only)"""
+    
+    user = await db.get(User, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    if changes.role is not None:
+        user.role = changes.role
+    if changes.is_active is not None:
+        user.is_active = changes.is_active
+    await db.commit()
+    invalidate_user(user.id)
+    
+    return user
+
+
 # ==================== CONVERSATION ENDPOINTS ====================
 
 @app.get("/conversations", response_model=List[ConversationResponse])
-def get_conversations(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def get_conversations(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all conversations for current user"""
-    
-    conversations = db.query(Conversation).filter(
-        Conversation.user_id == current_user.id
-    ).order_by(Conversation.updated_at.desc()).all()
-    
-    # Add message count
-    result = []
-    for conv in conversations:
-        conv_dict = {
-            "id": conv.id,
-            "title": conv.title,
-            "created_at": conv.created_at,
-            "updated_at": conv.updated_at,
-            "message_count": len(conv.messages)
-        }
-        result.append(conv_dict)
+    """Get a page of conversations for current user, newest first
+    
+    When more pages exist, the cursor for the next one is returned in the
+    X-Next-Cursor header.
+    """
+    
+    await message_writer.flush_async()
+    try:
+        conversations, next_cursor = await conversation_queries.list_conversations(db, current_user.id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
-    return result
+    return conversations
 
 
 @app.post("/conversations", response_model=ConversationResponse)
-def create_conversation(
+async def create_conversation(
     conv_data: ConversationCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create new conversation"""
     
@@ -183,8 +283,8 @@ def create_conversation(
     )
     
     db.add(conversation)
-    db.commit()
-    db.refresh(conversation)
+    await db.commit()
+    await db.refresh(conversation)
     
     return {
         "id": conversation.id,
@@ -196,102 +296,137 @@ def create_conversation(
 
 
 @app.get("/conversations/{conversation_id}", response_model=ConversationWithMessages)
-def get_conversation(
+async def get_conversation(
     conversation_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get conversation with all messages"""
+    """Get conversation with its latest messages, oldest to newest
     
-    conversation = db.query(Conversation).filter(
-        Conversation.id == conversation_id,
-        Conversation.user_id == current_user.id
-    ).first()
+    Older messages are loaded from /conversations/{id}/messages with the
+    X-Next-Cursor header value as `before`.
+    """
     
+    await message_writer.flush_async(conversation_id)
+    conversation = await conversation_queries.get_conversation(db, conversation_id, current_user.id)
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
-    messages = []
-
-    for msg in conversation.messages:
-        messages.append({
-        "id": msg.id,
-        "conversation_id": msg.conversation_id,
-        "role": msg.role,
-        "content": msg.content,
-        "mode": msg.mode,
-        "metadata": (
-            json.loads(msg.meta)
-            if msg.meta and isinstance(msg.meta, str)
-            else msg.meta
-        ),
-        "created_at": msg.created_at,
-    })
+    
+    messages, before = await conversation_queries.list_messages(db, conversation_id, limit)
+    if before:
+        response.headers["X-Next-Cursor"] = str(before)
+    
+    return {**conversation, "messages": messages[::-1]}
 
-    return {
-    "id": conversation.id,
-    "title": conversation.title,
-    "created_at": conversation.created_at,
-    "updated_at": conversation.updated_at,
-    "message_count": len(messages),
-    "messages": messages,
-}
+
+@app.get("/conversations/{conversation_id}/messages", response_model=List[MessageResponse])
+async def get_messages(
+    conversation_id: int,
+    response: Response,
+    before: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Page of messages older than message id `before`, newest first"""
+    
+    await message_writer.flush_async(conversation_id)
+    if not await conversation_queries.get_conversation(db, conversation_id, current_user.id):
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    
+    messages, next_before = await conversation_queries.list_messages(db, conversation_id, limit, before)
+    if next_before:
+        response.headers["X-Next-Cursor"] = str(next_before)
+    
+    return messages
+
+
+@app.get("/conversations/{conversation_id}/messages/{message_id}/metadata")
+async def get_message_metadata(
+    conversation_id: int,
+    message_id: int,
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Full metadata of one message (for payloads too large to inline)"""
+    
+    await message_writer.flush_async(conversation_id)
+    if not await conversation_queries.get_conversation(db, conversation_id, current_user.id):
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    
+    meta = await conversation_queries.get_message_metadata(db, conversation_id, message_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="Metadata not found")
+    
+    return Response(content=meta, media_type="application/json")
 
 
 
 @app.delete("/conversations/{conversation_id}")
-def delete_conversation(
+async def delete_conversation(
     conversation_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a conversation"""
     
-    conversation = db.query(Conversation).filter(
-        Conversation.id == conversation_id,
-        Conversation.user_id == current_user.id
-    ).first()
-    
-    if not conversation:
+    # Queued messages would otherwise land after the delete
+    await message_writer.flush_async(conversation_id)
+    deleted = await db.execute(
+        delete(Conversation).where(Conversation.id == conversation_id, Conversation.user_id == current_user.id)
+    )
+    if not deleted.rowcount:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
-    db.delete(conversation)
-    db.commit()
+    await db.execute(delete(Message).where(Message.conversation_id == conversation_id))
+    await db.commit()
     
     return {"message": "Conversation deleted"}
 
 
 @app.patch("/conversations/{conversation_id}/title")
-def update_conversation_title(
+async def update_conversation_title(
     conversation_id: int,
     title: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update conversation title"""
     
-    conversation = db.query(Conversation).filter(
-        Conversation.id == conversation_id,
-        Conversation.user_id == current_user.id
-    ).first()
-    
-    if not conversation:
+    updated = await db.execute(
+        update(Conversation)
+        .where(Conversation.id == conversation_id, Conversation.user_id == current_user.id)
+        .values(title=title, updated_at=datetime.utcnow())
+    )
+    if not updated.rowcount:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
-    conversation.title = title
-    conversation.updated_at = datetime.utcnow()
-    db.commit()
+    await db.commit()
     
     return {"message": "Title updated"}
 
 
 # ==================== QUERY ENDPOINTS (WITH HISTORY) ====================
 
+async def _run_analytics(http_request: Request, handler, *args):
+    """Run a chart/aggregation handler on the analytics executor, mapping overload to HTTP errors"""
+    try:
+        return await run_analytics(handler, *args, request=http_request)
+    except AnalyticsBusy as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    except AnalyticsTimeout as e:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(e))
+
+
 @app.post("/ask/stream")
 async def ask_stream(
     request: QueryRequest,
+    http_request: Request,
     conversation_id: Optional[int] = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Streaming query with conversation history"""
     
@@ -300,88 +435,87 @@ async def ask_stream(
     # Validate conversation if provided
     conversation = None
     if conversation_id:
-        conversation = db.query(Conversation).filter(
-            Conversation.id == conversation_id,
-            Conversation.user_id == current_user.id
-        ).first()
+        conversation = (await db.execute(
+            select(Conversation).where(Conversation.id == conversation_id, Conversation.user_id == current_user.id)
+        )).scalar_one_or_none()
         
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
     
-    # Save user message
+    # Earlier turns for the prompt (bounded window + rolling summary), read before this question is saved
+    history = await load_history(db, conversation) if conversation else None
+    
+    # Save user message (write-behind; also bumps the conversation's updated_at)
     if conversation:
-        user_message = Message(
-            conversation_id=conversation.id,
-            role="user",
-            content=query,
-            mode="rag"
-        )
-        db.add(user_message)
-        db.commit()
-        conversation.updated_at = datetime.utcnow()
-        db.commit()
-    
-    # Handle non-streaming queries
-    if is_chart_query(query):
-        chart_data = handle_chart_query(query)
+        message_writer.enqueue_message(conversation.id, "user", query, mode="rag")
+    
+    # Handle non-streaming queries; analytics runs off the event loop
+    intent = await classify_async(query)
+    
+    # Low-confidence routing: race analytics against retrieval, keep the match
+    outcome = None
+    if should_speculate(intent):
+        try:
+            outcome = await speculate(query, intent, request=http_request)
+        except ClientDisconnected:
+            return Response(status_code=499)
+    route = outcome.route if outcome else intent.route
+    
+    if route == "chart":
+        try:
+            chart_data = outcome.result if outcome and outcome.result else await _run_analytics(http_request, handle_chart_query, query)
+        except ClientDisconnected:
+            return Response(status_code=499)
         
         if conversation:
-            assistant_message = Message(
-                conversation_id=conversation.id,
-                role="assistant",
-                content="",
-                mode="chart",
-                metadata=json.dumps(chart_data)
-            )
-            db.add(assistant_message)
-            db.commit()
+            message_writer.enqueue_message(conversation.id, "assistant", "", mode="chart", meta=dumps(chart_data).decode())
         
-        return {"mode": "chart", "chart": chart_data}
+        return FastJSONResponse({"mode": "chart", "chart": chart_data})
     
-    if is_aggregation_query(query):
-        result = top_customer()
-        
-        if conversation:
-            assistant_message = Message(
-                conversation_id=conversation.id,
-                role="assistant",
-                content=result.get("answer", ""),
-                mode="aggregation",
-                metadata=json.dumps(result.get("sources", []))
-            )
-            db.add(assistant_message)
-            db.commit()
+    # Any question that maps onto the aggregation engine skips the LLM
+    if route == "aggregation":
+        try:
+            result = outcome.result if outcome and outcome.result else await _run_analytics(http_request, handle_aggregation_query, query)
+        except ClientDisconnected:
+            return Response(status_code=499)
         
-        return {"mode": "aggregation", **result}
+        # None: no dimension to group by, so the documents answer it instead
+        if result is not None:
+            if conversation:
+                message_writer.enqueue_message(
+                    conversation.id, "assistant", result.get("answer", ""),
+                    mode="aggregation", meta=dumps(result.get("sources", [])).decode()
+                )
+            
+            return FastJSONResponse({"mode": "aggregation", **result})
     
     # Stream RAG responses
+    documents = outcome.documents if outcome else None
+    collected_answer = []
+    
+    async def answer_events():
+        async for item in ask_question_events(query, history, documents=documents):
+            # Collect answer for saving
+            if item["type"] == "token":
+                collected_answer.append(item["content"])
+            yield item
+    
     async def event_generator():
         try:
-            yield f"data: {json.dumps({'type': 'start', 'mode': 'rag'})}\n\n"
+            yield frame({"type": "start", "mode": "rag"})
             
-            collected_answer = ""
-            
-            for item in ask_question_streaming(query):
-                yield f"data: {json.dumps(item)}\n\n"
-                
-                # Collect answer for saving
-                if item["type"] == "token":
-                    collected_answer += item["content"]
+            # One frame per token unless SSE_COALESCE_MS sets a batching window
+            async for chunk in coalesced_frames(answer_events()):
+                yield chunk
             
             # Save assistant message after streaming completes
             if conversation and collected_answer:
-                assistant_message = Message(
-                    conversation_id=conversation.id,
-                    role="assistant",
-                    content=collected_answer,
-                    mode="rag"
-                )
-                db.add(assistant_message)
-                db.commit()
+                message_writer.enqueue_message(conversation.id, "assistant", "".join(collected_answer), mode="rag")
+                schedule_summary(conversation.id)
             
         except Exception as e:
-            yield f"data: {json.dumps({'type': 'error', 'content': str(e)})}\n\n"
-            yield f"data: {json.dumps({'type': 'end', 'content': None})}\n\n"
+            yield frame({"type": "error", "content": str(e)})
+            yield frame({"type": "end", "content": None})
     
     return StreamingResponse(
         event_generator(),
@@ -397,35 +531,212 @@ async def ask_stream(
 
 @app.post("/upload")
 async def upload_file(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
-    """Upload file (protected) - Supports PDF, TXT, MD, DOCX, CSV, JSON"""
+    """Upload file (protected) - Supports PDF, TXT, MD, DOCX, CSV, JSON
+    
+    Uploading a file with the same name again replaces its previous chunks.
+    """
     
     file_path = f"data/uploads/{current_user.id}_{file.filename}"
     
     with open(file_path, "wb") as buffer:
         shutil.copyfileobj(file.file, buffer)
     
-    chunks = ingest_file(file_path)
+    stats = {}
+    chunks = ingest_file(file_path, source_key=_upload_source_key(current_user, file.filename), persist=False, stats=stats)
+    background_tasks.add_task(schedule_persist)
     
     return {
         "message": "File submitted successfully",
-        "chunks_created": chunks
+        "chunks_created": chunks,
+        "duplicates_skipped": stats.get("duplicates", 0)
     }
 
 
+@app.delete("/upload/{filename}")
+def delete_upload(
+    filename: str,
+    background_tasks: BackgroundTasks,
+    current_user: UserSnapshot = Depends(get_current_user)
+):
+    """Remove an uploaded file's chunks from search"""
+    
+    removed = delete_source(_upload_source_key(current_user, filename), persist=False)
+    if not removed:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    file_path = f"data/uploads/{current_user.id}_{filename}"
+    if os.path.exists(file_path):
+        os.remove(file_path)
+    
+    background_tasks.add_task(schedule_persist)
+    return {"message": "Upload deleted", "chunks_removed": removed}
+
+
+def _upload_source_key(user: UserSnapshot, filename: str) -> str:
+    return f"upload:{user.id}:{filename}"
+
+
+# ==================== SOURCE REGISTRY (ADMIN) ====================
+
+@app.get("/sources")
+def list_sources(prefix: str = "", current_user: UserSnapshot = Depends(get_current_admin)):
+    """List registered sources and their chunk counts (admin only)"""
+    
+    return {
+        "stats": vectorstore_stats(),
+        "sources": {
+            key: len(chunk_ids)
+            for key, chunk_ids in source_registry.sources.items()
+            if key.startswith(prefix)
+        }
+    }
+
+
+@app.delete("/sources/{source_key:path}")
+def delete_source_endpoint(
+    source_key: str,
+    background_tasks: BackgroundTasks,
+    current_user: UserSnapshot = Depends(get_current_admin)
+):
+    """Remove any source (upload, file or SQL row) from search (admin only)"""
+    
+    removed = delete_source(source_key, persist=False)
+    if not removed:
+        raise HTTPException(status_code=404, detail="Source not found")
+    
+    background_tasks.add_task(schedule_persist)
+    return {"message": "Source deleted", "chunks_removed": removed}
+
+
+@app.post("/sources/compact")
+def compact_sources(current_user: UserSnapshot = Depends(get_current_admin)):
+    """Drop deleted chunks from the FAISS index now (admin only)"""
+    
+    compacted = compact_vectorstore(force=True)
+    return {"compacted": compacted, "stats": vectorstore_stats()}
+
+
 @app.post("/ingest/mysql")
-def ingest_mysql(current_user: User = Depends(get_current_admin)):
-    """Ingest MySQL data (admin only)"""
+def ingest_mysql(full_refresh: bool = False, current_user: UserSnapshot = Depends(get_current_admin)):
+    """Ingest new or changed MySQL rows (admin only)"""
     
-    rows = ingest_business_data()
+    stats = {}
+    rows = ingest_business_data(full_refresh=full_refresh, stats=stats)
     return {
         "status": "success",
-        "rows_ingested": rows
+        "rows_ingested": rows,
+        "duplicates_skipped": stats.get("duplicates", 0)
     }
 
 
+@app.get("/analytics/chart")
+async def analytics_chart(
+    http_request: Request,
+    dimension: str = "month",
+    granularity: Optional[str] = None,
+    metric: str = "sum",
+    field: str = "amount",
+    month: Optional[List[str]] = Query(None),
+    max_points: int = Query(CHART_MAX_POINTS, ge=3, le=10000),
+    current_user: UserSnapshot = Depends(get_current_user)
+):
+    """Chart by dimension, or by day/week/month when granularity is set, capped at max_points"""
+    
+    filters = (("month", tuple(month)),) if month else ()
+    try:
+        if granularity:
+            return FastJSONResponse(await _run_analytics(http_request, series_chart, granularity, metric, field, filters, max_points))
+        spec = AggregationSpec(dimension, metric, field, filters)
+        return FastJSONResponse(await _run_analytics(http_request, spec_chart, spec, max_points))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ClientDisconnected:
+        return Response(status_code=499)
+
+
+@app.get("/analytics/export")
+def export_analytics(
+    format: str = "ndjson",
+    customer: Optional[List[str]] = Query(None),
+    product: Optional[List[str]] = Query(None),
+    finance_type: Optional[List[str]] = Query(None),
+    month: Optional[List[str]] = Query(None),
+    limit: Optional[int] = Query(None, ge=1),
+    current_user: UserSnapshot = Depends(get_current_admin)
+):
+    """Stream the business_data rows behind a chart or aggregation as NDJSON or CSV (admin only)
+    
+    Filters narrow the rows down, e.g. ?customer=Alice&month=January drills into one bar.
+    Concurrent exports are capped and each is cut off after EXPORT_TIMEOUT_SECONDS.
+    """
+    
+    filters = tuple(
+        (dimension, tuple(values))
+        for dimension, values in (("customer", customer), ("product", product), ("finance_type", finance_type), ("month", month))
+        if values
+    )
+    try:
+        body = export_rows(format, filters, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        acquire_slot()
+    except ExportBusy as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "5"})
+    
+    return LimitedStreamingResponse(
+        body,
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="business_data.{format}"'},
+        timeout=EXPORT_TIMEOUT_SECONDS,
+        on_close=release_slot
+    )
+
+
+@app.post("/analytics/refresh")
+def refresh_analytics(current_user: UserSnapshot = Depends(get_current_admin)):
+    """Recompute the materialized chart aggregates now (admin only)"""
+    
+    engine = business_db.get_engine()
+    cache = aggregate_cache.full_refresh(engine)
+    if analytics_snapshot.enabled():
+        analytics_snapshot.refresh(engine)
+    return {"status": "success", "refreshed_at": cache["refreshed_at"]}
+
+
+@app.get("/admin/metrics/business-db")
+def business_db_metrics(current_user: UserSnapshot = Depends(get_current_admin)):
+    """Connection pool usage for the business data database (admin only)"""
+    
+    return business_db.pool_metrics()
+
+
+@app.get("/admin/metrics/auth")
+def auth_metrics(current_user: UserSnapshot = Depends(get_current_admin)):
+    """Authenticated-user cache and bcrypt pool load (admin only)"""
+    
+    return {"user_cache": user_cache_metrics(), "password_hashing": password_executor_metrics()}
+
+
+@app.get("/admin/metrics/chat-db")
+def chat_db_metrics(current_user: UserSnapshot = Depends(get_current_admin)):
+    """Write-behind message queue, chat database pool and summary updates (admin only)"""
+    
+    return {**message_writer.writer_metrics(), "pool": engine.pool.status(), "summaries": memory_metrics()}
+
+
+@app.get("/admin/metrics/analytics")
+def analytics_metrics(current_user: UserSnapshot = Depends(get_current_admin)):
+    """Analytics executor load and speculative routing outcomes (admin only)"""
+    
+    return {**executor_metrics(), "speculation": speculation_metrics()}
+
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
\ No newline at end of file
@@ -0,0 +1,186 @@
+from sqlalchemy import insert, update
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+import asyncio
+import threading
+import os
+from app import database
+from app.database import Message, Conversation
+
+# Write-behind persistence for chat messages. Requests queue their
+# messages and return; a background thread writes everything queued in one
+# transaction (inserts plus one updated_at bump per conversation) every
+# FLUSH_INTERVAL_MS, or sooner once FLUSH_BATCH_SIZE messages are waiting.
+#
+# Read-your-writes: anything that reads a conversation calls
+# flush(conversation_id) first, which writes synchronously if that
+# conversation still has queued or in-flight messages. The queue is per
+# process, so with several workers this holds for requests served by the
+# same worker. stop() flushes whatever is left at shutdown.
+#
+# A batch that fails is retried up to FLUSH_MAX_RETRIES times, then written
+# row by row so one bad message cannot block the queue; rows that still
+# fail are logged and dropped.
+ENABLED = os.getenv("MESSAGE_WRITE_BEHIND", "true").lower() == "true"
+FLUSH_INTERVAL_MS = int(os.getenv("MESSAGE_FLUSH_INTERVAL_MS", "50"))
+FLUSH_BATCH_SIZE = int(os.getenv("MESSAGE_FLUSH_BATCH_SIZE", "200"))
+FLUSH_MAX_RETRIES = int(os.getenv("MESSAGE_FLUSH_MAX_RETRIES", "3"))
+
+_lock = threading.Lock()        # guards _queue, _pending and _metrics
+_flush_lock = threading.Lock()  # one writer transaction at a time
+_wakeup = threading.Event()
+_queue = []
+_pending = Counter()            # conversation_id -> queued or in-flight messages
+_thread = None
+_stopping = False
+_failed_attempts = 0            # consecutive failed batch writes
+_metrics = {"queued": 0, "written": 0, "flushes": 0, "max_batch": 0, "failures": 0, "dropped": 0}
+
+
+def _write(batch: list):
+    """Insert a batch of messages and bump each conversation's updated_at, in one transaction"""
+    touched = {}
+    for row in batch:
+        touched[row["conversation_id"]] = max(row["created_at"], touched.get(row["conversation_id"], row["created_at"]))
+
+    with database.SessionLocal() as db:
+        db.execute(insert(Message), batch)
+        for conversation_id, updated_at in touched.items():
+            db.execute(update(Conversation).where(Conversation.id == conversation_id).values(updated_at=updated_at))
+        db.commit()
+
+
+def _write_rows(batch: list) -> int:
+    """Write each message in its own transaction; rows that still fail are logged and dropped"""
+    written = 0
+    for row in batch:
+        try:
+            _write([row])
+            written += 1
+        except Exception as e:
+            print(f"⚠ Dropping {row['role']} message for conversation {row['conversation_id']}: {e}")
+    return written
+
+
+def _flush() -> int:
+    global _failed_attempts
+
+    with _flush_lock:
+        with _lock:
+            batch = _queue[:]
+            del _queue[:]
+        if not batch:
+            return 0
+
+        try:
+            _write(batch)
+            written = len(batch)
+        except Exception as e:
+            _failed_attempts += 1
+            with _lock:
+                _metrics["failures"] += 1
+            if _failed_attempts <= FLUSH_MAX_RETRIES:
+                print(f"⚠ Message flush failed, retrying {len(batch)} messages: {e}")
+                with _lock:
+                    _queue[:0] = batch
+                return 0
+            print(f"⚠ Message flush failed {_failed_attempts} times, writing {len(batch)} messages one by one: {e}")
+            written = _write_rows(batch)
+        _failed_attempts = 0
+
+        with _lock:
+            _pending.subtract(row["conversation_id"] for row in batch)
+            for conversation_id in [cid for cid, count in _pending.items() if count <= 0]:
+                del _pending[conversation_id]
+            _metrics["written"] += written
+            _metrics["dropped"] += len(batch) - written
+            _metrics["flushes"] += 1
+            _metrics["max_batch"] = max(_metrics["max_batch"], len(batch))
+        return written
+
+
+def _run():
+    while True:
+        _wakeup.wait(FLUSH_INTERVAL_MS / 1000)
+        _wakeup.clear()
+        _flush()
+        if _stopping:
+            return
+
+
+def _ensure_started():
+    global _thread
+
+    if _thread is not None:
+        return
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_run, name="message-writer", daemon=True)
+            _thread.start()
+
+
+def enqueue_message(conversation_id: int, role: str, content: str, mode: str = "rag", meta: Optional[str] = None):
+    """Persist a message (and touch its conversation) without waiting for the commit"""
+    row = {
+        "conversation_id": conversation_id,
+        "role": role,
+        "content": content,
+        "mode": mode,
+        "meta": meta,
+        "created_at": datetime.utcnow(),
+    }
+    if not ENABLED or _stopping:
+        _write([row])
+        return
+
+    _ensure_started()
+    with _lock:
+        _queue.append(row)
+        _pending[conversation_id] += 1
+        _metrics["queued"] += 1
+        full = len(_queue) >= FLUSH_BATCH_SIZE
+    if full:
+        _wakeup.set()
+
+
+def flush(conversation_id: Optional[int] = None) -> int:
+    """
+    Write queued messages now if `conversation_id` (or any conversation,
+    when None) has some pending; returns the number written by this call
+    """
+    with _lock:
+        if not _pending or (conversation_id is not None and conversation_id not in _pending):
+            return 0
+    return _flush()
+
+
+async def flush_async(conversation_id: Optional[int] = None) -> int:
+    """flush() for async endpoints: free when nothing is pending, otherwise written off the event loop"""
+    with _lock:
+        if not _pending or (conversation_id is not None and conversation_id not in _pending):
+            return 0
+    return await asyncio.to_thread(_flush)
+
+
+def stop():
+    """Flush everything and stop the writer thread (application shutdown)"""
+    global _stopping, _thread
+
+    _stopping = True
+    if _thread is not None:
+        _wakeup.set()
+        _thread.join()
+        _thread = None
+    _flush()
+
+
+def writer_metrics() -> dict:
+    with _lock:
+        return {
+            "enabled": ENABLED,
+            "flush_interval_ms": FLUSH_INTERVAL_MS,
+            "queue_depth": len(_queue),
+            "pending_conversations": len(_pending),
+            **_metrics,
+        }
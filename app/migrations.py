@@ -0,0 +1,200 @@
+"""
+Versioned schema migrations for the chat database.
+
+Each migration runs once, in its own transaction, and is recorded in
+schema_version. Migrations are idempotent (they check the live schema
+first), so a database created by an older create_all converges on the
+same schema. On SQLite the transaction takes the write lock up front
+(BEGIN IMMEDIATE): a second worker starting at once waits, then finds the
+version already recorded and skips it.
+
+Usage:
+    python -m app.migrations            # apply pending migrations
+    python -m app.migrations --check    # also EXPLAIN the hot queries
+"""
+from sqlalchemy import Table, MetaData, Column, Integer, String, DateTime, select, insert, inspect
+from sqlalchemy.exc import IntegrityError, OperationalError
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import argparse
+import sys
+from app.database import engine as default_engine, Base, User, Conversation, Message
+
+schema_version = Table(
+    "schema_version", MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String(200), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def _columns(conn, table: str) -> set:
+    return {column["name"] for column in inspect(conn).get_columns(table)}
+
+
+def _add_column(conn, table, column: Column):
+    """ALTER TABLE ... ADD COLUMN unless the column is already there"""
+    if column.name in _columns(conn, table.name):
+        return
+    ddl = column.type.compile(dialect=conn.dialect)
+    default = f" DEFAULT '{column.default.arg}'" if column.default is not None and isinstance(column.default.arg, str) else ""
+    conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {ddl}{default}")
+
+
+def _create_tables(conn):
+    Base.metadata.create_all(conn)
+
+
+def _add_user_role(conn):
+    _add_column(conn, User.__table__, User.__table__.c.role)
+    conn.execute(User.__table__.update().where(User.role.is_(None)).values(role="user"))
+
+
+def _hot_path_indexes(conn):
+    for table in (Conversation.__table__, Message.__table__):
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def _add_password_changed_at(conn):
+    _add_column(conn, User.__table__, User.__table__.c.password_changed_at)
+
+
+def _add_conversation_summary(conn):
+    _add_column(conn, Conversation.__table__, Conversation.__table__.c.summary)
+    _add_column(conn, Conversation.__table__, Conversation.__table__.c.summary_through_id)
+
+
+# (version, description, upgrade(connection)); append only, never renumber
+MIGRATIONS = [
+    (1, "create users, conversations and messages", _create_tables),
+    (2, "users.role column", _add_user_role),
+    (3, "composite indexes for conversation listing and message pages", _hot_path_indexes),
+    (4, "users.password_changed_at column", _add_password_changed_at),
+    (5, "conversations.summary and summary_through_id columns", _add_conversation_summary),
+]
+
+
+@contextmanager
+def _migration_transaction(engine):
+    if engine.dialect.name != "sqlite":
+        with engine.begin() as conn:
+            yield conn
+        return
+
+    # pysqlite would only BEGIN (deferred) at the first write, after the
+    # schema checks; take the write lock before them instead
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT")
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.exec_driver_sql("ROLLBACK")
+            raise
+        conn.exec_driver_sql("COMMIT")
+
+
+def applied_versions(engine=None) -> set:
+    engine = engine or default_engine
+    with _migration_transaction(engine) as conn:
+        schema_version.create(conn, checkfirst=True)
+        return set(conn.execute(select(schema_version.c.version)).scalars())
+
+
+def migrate(engine=None, target: int = None) -> list:
+    """Apply pending migrations up to `target` (default: all); returns the versions applied"""
+    engine = engine or default_engine
+    done = applied_versions(engine)
+    applied = []
+
+    for version, description, upgrade in MIGRATIONS:
+        if version in done or (target is not None and version > target):
+            continue
+        try:
+            with _migration_transaction(engine) as conn:
+                # Re-check under the lock: another worker may have just applied it
+                recorded = conn.execute(
+                    select(schema_version.c.version).where(schema_version.c.version == version)
+                ).first()
+                if not recorded:
+                    upgrade(conn)
+                    conn.execute(insert(schema_version).values(
+                        version=version, description=description, applied_at=datetime.utcnow()
+                    ))
+        except (IntegrityError, OperationalError):
+            # Another worker got there first (e.g. MySQL, whose DDL commits
+            # immediately): fine if the version is now recorded
+            if version in applied_versions(engine):
+                continue
+            raise
+        if recorded:
+            continue
+        applied.append(version)
+        print(f"✓ Applied migration {version}: {description}")
+
+    return applied
+
+
+def hot_queries() -> dict:
+    """The statements behind the conversation endpoints and auth, with representative parameters"""
+    from app.conversation_queries import conversations_statement, conversation_statement, messages_statement
+    from app.conversation_memory import recent_messages_statement
+
+    return {
+        "auth_user_by_username": select(User).where(User.username == "alice"),
+        "list_conversations": conversations_statement(1, 51),
+        "list_conversations_after_cursor": conversations_statement(1, 51, (datetime.utcnow() - timedelta(days=1), 100)),
+        "get_conversation": conversation_statement(1, 1),
+        "list_messages": messages_statement(1, 51),
+        "list_messages_before": messages_statement(1, 51, 1000),
+        "ask_stream_conversation": select(Conversation).where(Conversation.id == 1, Conversation.user_id == 1),
+        "history_window": recent_messages_statement(1, 100, 8),
+    }
+
+
+def explain_hot_queries(engine=None) -> dict:
+    """EXPLAIN QUERY PLAN detail lines per hot query (SQLite only)"""
+    engine = engine or default_engine
+    if engine.dialect.name != "sqlite":
+        return {}
+
+    plans = {}
+    with engine.connect() as conn:
+        for name, statement in hot_queries().items():
+            sql = str(statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+            plans[name] = [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+    return plans
+
+
+def unindexed_queries(plans: dict) -> dict:
+    """Hot queries whose plan scans a whole table or sorts in a temp B-tree"""
+    return {
+        name: lines for name, lines in plans.items()
+        if any(line.startswith("SCAN ") or "TEMP B-TREE" in line for line in lines)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply chat database migrations")
+    parser.add_argument("--target", type=int, help="stop after this version")
+    parser.add_argument("--check", action="store_true", help="fail if a hot query is not served by an index")
+    args = parser.parse_args()
+
+    migrate(target=args.target)
+    print(f"✓ Schema at version {max(applied_versions(), default=0)}")
+
+    if args.check:
+        plans = explain_hot_queries()
+        if not plans:
+            print("⚠ Query plan check only supports SQLite")
+            return
+        bad = unindexed_queries(plans)
+        for name, lines in plans.items():
+            print(f"{'⚠' if name in bad else '✓'} {name}: {' | '.join(lines)}")
+        if bad:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
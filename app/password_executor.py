@@ -0,0 +1,82 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
+import time
+import os
+from app.auth import hash_password, verify_password
+
+# bcrypt is deliberately slow CPU work, so register, login and password
+# changes run it on this small dedicated pool rather than AnyIO's shared
+# threadpool: a login burst then queues here (and is turned away with 503
+# once the queue is full) while every other endpoint keeps its threads.
+WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
+_executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="bcrypt")
+_lock = threading.Lock()
+_in_flight = 0
+_metrics = {
+    "submitted": 0, "completed": 0, "rejected": 0,
+    "max_in_flight": 0, "queue_wait_total_ms": 0.0, "queue_wait_max_ms": 0.0,
+}
+
+
+class PasswordHashBusy(Exception):
+    pass
+
+
+def _release(future):
+    global _in_flight
+
+    with _lock:
+        _in_flight -= 1
+        if not future.cancelled():
+            _metrics["completed"] += 1
+
+
+async def _run(fn, *args):
+    global _in_flight
+
+    with _lock:
+        if _in_flight >= WORKERS + MAX_QUEUE:
+            _metrics["rejected"] += 1
+            raise PasswordHashBusy("Too many logins in progress, retry shortly")
+        _in_flight += 1
+        _metrics["submitted"] += 1
+        _metrics["max_in_flight"] = max(_metrics["max_in_flight"], _in_flight)
+
+    queued_at = time.perf_counter()
+
+    def work():
+        waited = (time.perf_counter() - queued_at) * 1000
+        with _lock:
+            _metrics["queue_wait_total_ms"] += waited
+            _metrics["queue_wait_max_ms"] = max(_metrics["queue_wait_max_ms"], waited)
+        return fn(*args)
+
+    # The slot is held until bcrypt finishes, even if the request is
+    # cancelled meanwhile: the pool thread keeps running until then
+    future = _executor.submit(work)
+    future.add_done_callback(_release)
+    return await asyncio.wrap_future(future)
+
+
+async def hash_password_async(password: str) -> str:
+    """hash_password on the bcrypt pool; raises PasswordHashBusy when the queue is full"""
+    return await _run(hash_password, password)
+
+
+async def verify_password_async(password: str, hashed_password: str) -> bool:
+    """verify_password on the bcrypt pool; raises PasswordHashBusy when the queue is full"""
+    return await _run(verify_password, password, hashed_password)
+
+
+def password_executor_metrics() -> dict:
+    with _lock:
+        return {
+            "workers": WORKERS,
+            "max_queue": MAX_QUEUE,
+            "in_flight": _in_flight,
+            "queue_depth": max(0, _in_flight - WORKERS),
+            **_metrics,
+        }
@@ -2,7 +2,10 @@ from langchain_openai import ChatOpenAI
 from langchain_classic.chains import RetrievalQA
 from langchain_core.prompts import PromptTemplate
 from langchain_classic.callbacks.base import BaseCallbackHandler
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
 from app.vectorstore import get_hybrid_retriever
+import asyncio
 import os, time
 from queue import Queue, Empty
 from threading import Thread
@@ -10,51 +13,31 @@ from threading import Thread
 class StreamingCallbackHandler(BaseCallbackHandler):
     """Custom callback handler for streaming LLM responses"""
     
-    def __init__(self, queue: Queue):
-        self.queue = queue
+    def __init__(self, put):
+        self.put = put
     
     def on_llm_new_token(self, token: str, **kwargs) -> None:
         """Called when LLM generates a new token"""
-        self.queue.put({"type": "token", "content": token})
+        self.put({"type": "token", "content": token})
     
     def on_llm_end(self, *args, **kwargs) -> None:
         """Called when LLM finishes generating"""
-        self.queue.put({"type": "end", "content": None})
+        self.put({"type": "end", "content": None})
     
     def on_llm_error(self, error: Exception, **kwargs) -> None:
         """Called when LLM encounters an error"""
-        self.queue.put({"type": "error", "content": str(error)})
+        self.put({"type": "error", "content": str(error)})
 
-def ask_question_streaming(question: str):
-    """
-    Real Streaming RAG Query
-    Uses ChatOpenAI with Hugging Face Router
-    """
-    print(f"DEBUG: ask_question_streaming called with: {question}") # DEBUG
-    queue = Queue()
-    
-    try:
-        print("DEBUG: Getting retriever...") # DEBUG
-        retriever = get_hybrid_retriever(k=3)
-        
-        if not retriever:
-            yield {"type": "error", "content": "No documents ingested yet."}
-            yield {"type": "end", "content": None}
-            return
-
-        # Initialize LLM with Hugging Face Router
-        llm = ChatOpenAI(
-            model="meta-llama/Meta-Llama-3-8B-Instruct",
-            openai_api_key=os.getenv("HUGGINGFACEHUB_API_TOKEN"),
-            openai_api_base="https://router.huggingface.co/v1",
-            temperature=0.2,
-            max_tokens=512,
-            streaming=True,
-            callbacks=[StreamingCallbackHandler(queue)]
-        )
-
-        # RAG Prompt Template
-        prompt_template = """
+class DocumentsRetriever(BaseRetriever):
+    """Serves documents that were already retrieved, e.g. during speculative routing"""
+
+    documents: list
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> list:
+        return self.documents
+
+
+PROMPT_TEMPLATE = """
         You are a helpful AI assistant. Use the following pieces of context to answer the question at the end.
         
         **Instructions:**
@@ -62,6 +45,10 @@ def ask_question_streaming(question: str):
         2. If the answer involves a process, break it down into **numbered steps**.
         3. Use **bold text** for key terms or important values.
         4. If the answer is not in the context, say "I don't have enough information to answer that based on the provided documents."
+        5. Use the conversation so far only to understand follow-up questions; answer from the context.
+
+        Conversation so far:
+        {history}
 
         Context:
         {context}
@@ -71,50 +58,107 @@ def ask_question_streaming(question: str):
         Answer:
         """
 
-        PROMPT = PromptTemplate(
-            template=prompt_template, input_variables=["context", "question"]
-        )
-        
-        qa = RetrievalQA.from_chain_type(
-            llm=llm,
-            chain_type="stuff",
-            retriever=retriever,
-            chain_type_kwargs={"prompt": PROMPT},
-            return_source_documents=False
-        )
-        
-        # Run the chain in a separate thread so we can yield tokens from the queue
-        def run_chain():
-            try:
-                qa.invoke({"query": question})
-            except Exception as e:
-                queue.put({"type": "error", "content": str(e)})
-                queue.put({"type": "end", "content": None})
-
-        thread = Thread(target=run_chain)
-        thread.start()
-        
-        # Yield tokens from the queue as they become available
-        while True:
-            try:
-                # Wait for next token
-                token = queue.get(timeout=60.0) # 60s timeout to prevent hanging
-                
-                if token['type'] == 'end':
-                    yield {"type": "end", "content": None}
-                    break
-                
-                if token['type'] == 'error':
-                    yield token
-                    break
-                
-                yield token
-                
-            except Empty:
-                yield {"type": "error", "content": "Timeout waiting for response"}
-                break
-        
-    except Exception as e:
-        print(f"Error during streaming RAG: {e}")
-        yield {"type": "error", "content": str(e)}
-        yield {"type": "end", "content": None}
\ No newline at end of file
+# Seconds to wait for the next event before giving up on the LLM
+EVENT_TIMEOUT_SECONDS = 60.0
+
+
+def _start_chain(question: str, history: str, documents: list, put):
+    """
+    Build and run the RAG chain on its own thread. Every event goes to
+    put(event); the last one is an "end" or an "error".
+    """
+    def run_chain():
+        try:
+            retriever = DocumentsRetriever(documents=documents) if documents else get_hybrid_retriever(k=3)
+
+            if not retriever:
+                put({"type": "error", "content": "No documents ingested yet."})
+                put({"type": "end", "content": None})
+                return
+
+            # Initialize LLM with Hugging Face Router
+            llm = ChatOpenAI(
+                model="meta-llama/Meta-Llama-3-8B-Instruct",
+                openai_api_key=os.getenv("HUGGINGFACEHUB_API_TOKEN"),
+                openai_api_base="https://router.huggingface.co/v1",
+                temperature=0.2,
+                max_tokens=512,
+                streaming=True,
+                callbacks=[StreamingCallbackHandler(put)]
+            )
+
+            PROMPT = PromptTemplate(
+                template=PROMPT_TEMPLATE, input_variables=["context", "question"],
+                partial_variables={"history": history or "(new conversation)"}
+            )
+
+            qa = RetrievalQA.from_chain_type(
+                llm=llm,
+                chain_type="stuff",
+                retriever=retriever,
+                chain_type_kwargs={"prompt": PROMPT},
+                return_source_documents=False
+            )
+            qa.invoke({"query": question})
+        except Exception as e:
+            print(f"Error during streaming RAG: {e}")
+            put({"type": "error", "content": str(e)})
+            put({"type": "end", "content": None})
+
+    Thread(target=run_chain, daemon=True).start()
+
+
+def ask_question_streaming(question: str, history: str = None, documents: list = None):
+    """
+    Real Streaming RAG Query
+    Uses ChatOpenAI with Hugging Face Router
+    `history` is the bounded conversation context (see conversation_memory).
+    Pass `documents` to answer from an earlier retrieval instead of searching again.
+    """
+    queue = Queue()
+    _start_chain(question, history, documents, queue.put)
+
+    # Yield tokens from the queue as they become available
+    while True:
+        try:
+            token = queue.get(timeout=EVENT_TIMEOUT_SECONDS)  # prevent hanging
+        except Empty:
+            yield {"type": "error", "content": "Timeout waiting for response"}
+            break
+
+        yield token
+        if token["type"] in ("end", "error"):
+            break
+
+
+async def ask_question_events(question: str, history: str = None, documents: list = None):
+    """
+    ask_question_streaming for the event loop: the chain thread hands events
+    over through an asyncio queue, so no second thread waits on the tokens.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+
+    def put(event):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+        except RuntimeError:
+            pass  # loop closed (client went away at shutdown)
+
+    _start_chain(question, history, documents, put)
+
+    while True:
+        # A timer handle per event is much cheaper than wait_for()
+        deadline = object()
+        timer = loop.call_later(EVENT_TIMEOUT_SECONDS, queue.put_nowait, deadline)
+        event = await queue.get()
+        timer.cancel()
+        if event is deadline:
+            yield {"type": "error", "content": "Timeout waiting for response"}
+            break
+        if not isinstance(event, dict):
+            continue  # an earlier deadline that fired just as its event arrived
+
+        yield event
+        if event["type"] in ("end", "error"):
+            break
@@ -1,17 +1,94 @@
+import re
 from app.analytics import top_customer,sales_by_month
-def handle_chart_query(query: str):
-    q = query.lower()
+from app.aggregations import (
+    AggregationSpec, parse_query, parse_filters, run_aggregation, run_time_series, to_chart, to_answer, DATE_COLUMN, month_order
+)
+from app.downsample import lttb, cap_categories, CHART_MAX_POINTS
 
-    month_keywords = ["month", "monthly", "per month"]
-    customer_keywords = ["customer", "client", "buyer"]
+# Specs answered from the materialized aggregate cache
+SALES_BY_MONTH = AggregationSpec(dimension="month")
+TOP_CUSTOMER = AggregationSpec(dimension="customer", top_n=1)
 
-    if any(k in q for k in month_keywords):
+_GRANULARITY_PATTERNS = [
+    ("day", re.compile(r"\b(daily|per day|by day|each day)\b")),
+    ("week", re.compile(r"\b(weekly|per week|by week|each week)\b")),
+]
+
+
+def spec_chart(spec: AggregationSpec, max_points: int = CHART_MAX_POINTS) -> dict:
+    """Grouped chart with at most max_points bars"""
+    rows = run_aggregation(spec)
+    if spec.dimension == "month":
+        points = sorted(rows, key=lambda row: month_order(row[0]))
+    else:
+        points = cap_categories(rows, max_points, additive=spec.metric != "avg")
+    return {**to_chart(spec, points), "total_points": len(rows)}
+
+
+def series_chart(granularity: str, metric: str = "sum", field: str = "amount", filters: tuple = (), max_points: int = CHART_MAX_POINTS) -> dict:
+    """Time-bucketed line chart, LTTB-downsampled to max_points"""
+    rows = run_time_series(granularity, metric, field, filters)
+    spec = AggregationSpec("month", metric, field, filters)
+    chart = to_chart(spec, lttb(rows, max_points))
+    if chart["datasets"]:
+        chart["datasets"][0]["label"] = f"{spec.label.split(' by ')[0]} per {granularity}"
+    return {**chart, "type": "line", "total_points": len(rows)}
+
+
+def handle_chart_query(query: str, max_points: int = CHART_MAX_POINTS):
+    spec = parse_query(query, require_measure=False)
+
+    granularity = next((name for name, pattern in _GRANULARITY_PATTERNS if pattern.search(query.lower())), None)
+    if granularity and DATE_COLUMN:
+        if spec is None:
+            return series_chart(granularity, filters=parse_filters(query), max_points=max_points)
+        return series_chart(granularity, spec.metric, spec.field, spec.filters, max_points)
+
+    if spec is None:
+        return {
+            "error": "Chart type not supported"
+        }
+
+    if spec == SALES_BY_MONTH:
         return sales_by_month()
 
-    if any(k in q for k in customer_keywords):
+    if spec == TOP_CUSTOMER:
         return top_customer()
 
-    return {
-        "error": "Chart type not supported"
-    }
+    return spec_chart(spec, max_points)
+
+
+def speculative_analytics(query: str, route: str):
+    """
+    Analytics answer for speculative routing: only when the question parses
+    into a spec and the result has data, otherwise None.
+    """
+    spec = parse_query(query, require_measure=route != "chart")
+    if spec is None:
+        return None
+
+    if route == "chart":
+        chart = handle_chart_query(query)
+        return chart if chart.get("labels") else None
+
+    if spec == TOP_CUSTOMER:
+        result = top_customer()
+        return result if result.get("sources") else None
+
+    rows = run_aggregation(spec)
+    return to_answer(spec, rows) if rows else None
+
+
+def handle_aggregation_query(query: str):
+    """
+    Answer an aggregation question from SQL, or None when it does not
+    parse into a spec (the caller falls back to RAG).
+    """
+    spec = parse_query(query)
+    if spec is None:
+        return None
+
+    if spec == TOP_CUSTOMER:
+        return top_customer()
 
+    return to_answer(spec, run_aggregation(spec))
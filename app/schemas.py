@@ -20,6 +20,16 @@ class QueryRequest(BaseModel):
     query: str
 
 
+class PasswordChange(BaseModel):
+    current_password: str
+    new_password: str = Field(..., min_length=6)
+
+
+class UserAdminUpdate(BaseModel):
+    role: Optional[str] = Field(default=None, pattern="^(user|admin)$")
+    is_active: Optional[bool] = None
+
+
 class UserResponse(BaseModel):
     id: int
     username: str
@@ -67,7 +77,8 @@ class MessageResponse(BaseModel):
     role: str
     content: str
     mode: str
-    metadata: Optional[Any] = None
+    metadata: Optional[Any] = None  # stored JSON text; None when deferred
+    metadata_size: int = 0
     created_at: datetime
     
     class Config:
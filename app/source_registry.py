@@ -0,0 +1,87 @@
+import json
+import os
+
+REGISTRY_PATH = "data/faiss_index/sources.json"
+
+# Which chunk ids came from which source (upload, file or SQL row).
+# Source keys look like "upload:<user_id>:<filename>", "file:<path>" or
+# "mysql:business_data:<row id>".
+sources = {}      # source key -> list of chunk ids
+tombstones = set()  # chunk ids removed from search but still in FAISS
+_refs = {}        # chunk id -> number of sources using it (near-duplicates share chunks)
+_loaded = False
+
+
+def load():
+    global sources, tombstones, _loaded
+
+    if _loaded:
+        return
+    _loaded = True
+
+    if os.path.exists(REGISTRY_PATH):
+        with open(REGISTRY_PATH, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        sources = state.get("sources", {})
+        tombstones = set(state.get("tombstones", []))
+        for chunk_ids in sources.values():
+            for chunk_id in chunk_ids:
+                _refs[chunk_id] = _refs.get(chunk_id, 0) + 1
+        print(f"✓ Loaded source registry with {len(sources)} sources")
+
+
+def save():
+    os.makedirs(os.path.dirname(REGISTRY_PATH), exist_ok=True)
+    tmp_path = REGISTRY_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"sources": sources, "tombstones": sorted(tombstones)}, f)
+    os.replace(tmp_path, REGISTRY_PATH)
+
+
+def register(source_key: str, chunk_ids: list[str]):
+    load()
+    sources.setdefault(source_key, []).extend(chunk_ids)
+    for chunk_id in chunk_ids:
+        _refs[chunk_id] = _refs.get(chunk_id, 0) + 1
+
+
+def unregister(source_key: str) -> tuple[int, list[str]]:
+    """
+    Forget a source and tombstone the chunks no other source still uses
+
+    Returns:
+        number of chunks the source had, and the ids that were tombstoned
+    """
+    load()
+    chunk_ids = sources.pop(source_key, [])
+    dead = []
+    for chunk_id in chunk_ids:
+        _refs[chunk_id] -= 1
+        if _refs[chunk_id] <= 0:
+            del _refs[chunk_id]
+            dead.append(chunk_id)
+    tombstones.update(dead)
+    return len(chunk_ids), dead
+
+
+def is_registered(chunk_id: str) -> bool:
+    return chunk_id in _refs
+
+
+def is_live(metadata: dict) -> bool:
+    """FAISS search filter: hide tombstoned chunks until compaction"""
+    return metadata.get("chunk_id") not in tombstones
+
+
+def clear_tombstones(chunk_ids):
+    tombstones.difference_update(chunk_ids)
+
+
+def stats(total_chunks: int) -> dict:
+    load()
+    return {
+        "sources": len(sources),
+        "chunks": total_chunks,
+        "tombstones": len(tombstones),
+        "tombstone_ratio": round(len(tombstones) / total_chunks, 4) if total_chunks else 0.0,
+    }
@@ -0,0 +1,150 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+import asyncio
+import threading
+import os
+from app.intent import Intent, MIN_CONFIDENCE
+from app.router import speculative_analytics
+from app.vectorstore import hybrid_search
+from app.analytics_executor import run_analytics, ClientDisconnected
+
+# Speculative routing for low-confidence intents: the analytics answer and
+# the document retrieval start together, and the path that matches the
+# question wins while the other is cancelled. A path matches when the
+# question parses into an aggregation with data, or when retrieval finds a
+# chunk above RAG_MIN_RELEVANCE; if both match, the classifier's guess
+# decides, so a matching guessed path can win without waiting for the other.
+ENABLED = os.getenv("SPECULATIVE_ROUTING", "true").lower() == "true"
+MAX_CONCURRENT = int(os.getenv("SPECULATIVE_MAX_CONCURRENT", "8"))
+RAG_MIN_RELEVANCE = float(os.getenv("SPECULATIVE_RAG_MIN_RELEVANCE", "0.35"))
+TIMEOUT = float(os.getenv("SPECULATIVE_TIMEOUT_SECONDS", "5"))
+RAG_K = 3
+
+_retrieval_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT, thread_name_prefix="speculative-retrieval")
+_lock = threading.Lock()
+_active = 0
+_metrics = {"speculated": 0, "skipped_budget": 0, "analytics_won": 0, "rag_won": 0, "undecided": 0, "cancelled": 0}
+
+
+@dataclass
+class Outcome:
+    route: str                         # "chart", "aggregation" or "rag"
+    result: Optional[dict] = None      # analytics payload when an analytics path won
+    documents: Optional[list] = None   # retrieved chunks when RAG won
+    relevance: float = 0.0
+
+
+def should_speculate(intent: Intent) -> bool:
+    return ENABLED and intent.confidence < MIN_CONFIDENCE
+
+
+def _acquire() -> bool:
+    global _active
+
+    with _lock:
+        if _active >= MAX_CONCURRENT:
+            _metrics["skipped_budget"] += 1
+            return False
+        _active += 1
+        _metrics["speculated"] += 1
+        return True
+
+
+def _release():
+    global _active
+
+    with _lock:
+        _active -= 1
+
+
+def _count(name: str):
+    with _lock:
+        _metrics[name] += 1
+
+
+async def _analytics(query: str, route: str, request):
+    try:
+        return await run_analytics(speculative_analytics, query, route, request=request, timeout=TIMEOUT)
+    except ClientDisconnected:
+        raise
+    except Exception as e:
+        print(f"⚠ Speculative analytics skipped: {e}")
+        return None
+
+
+async def _retrieval(query: str):
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_retrieval_executor, hybrid_search, query, RAG_K)
+    except Exception as e:
+        print(f"⚠ Speculative retrieval failed: {e}")
+        return None
+
+
+async def speculate(query: str, intent: Intent, request=None) -> Optional[Outcome]:
+    """
+    Race analytics against retrieval for an ambiguous question.
+    Returns None when the speculation budget is used up (follow the intent).
+    Raises ClientDisconnected if the client goes away meanwhile.
+    """
+    if not _acquire():
+        return None
+
+    analytics_route = "chart" if intent.route == "chart" else "aggregation"
+    guessed = "rag" if intent.route == "rag" else "analytics"
+    tasks = {
+        "analytics": asyncio.ensure_future(_analytics(query, analytics_route, request)),
+        "rag": asyncio.ensure_future(_retrieval(query)),
+    }
+    matches = {}
+
+    def match(name: str, value) -> bool:
+        if name == "analytics":
+            return value is not None
+        return value is not None and bool(value[0]) and value[1] >= RAG_MIN_RELEVANCE
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + TIMEOUT
+    try:
+        pending = set(tasks.values())
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, timeout=max(0.0, deadline - loop.time()), return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                break
+            for name, task in tasks.items():
+                if task in done:
+                    matches[name] = task.result() if match(name, task.result()) else None
+
+            # The guessed path matching settles it; otherwise wait for the other
+            if matches.get(guessed) is not None:
+                break
+            if guessed in matches and any(matches.get(name) is not None for name in tasks):
+                break
+    finally:
+        for task in tasks.values():
+            if not task.done():
+                task.cancel()
+                _count("cancelled")
+        _release()
+
+    winner = guessed if matches.get(guessed) is not None else next(
+        (name for name in tasks if matches.get(name) is not None), None
+    )
+    if winner == "analytics":
+        _count("analytics_won")
+        return Outcome(analytics_route, result=matches["analytics"])
+    if winner == "rag":
+        _count("rag_won")
+        documents, relevance = matches["rag"]
+        return Outcome("rag", documents=documents, relevance=relevance)
+
+    _count("undecided")
+    return Outcome(intent.route)
+
+
+def speculation_metrics() -> dict:
+    with _lock:
+        return {"max_concurrent": MAX_CONCURRENT, "active": _active, **_metrics}
@@ -1,37 +1,161 @@
-from sqlalchemy import create_engine
+from sqlalchemy import text
 import pandas as pd
-from app.vectorstore import add_texts
-
-username = "root"
-password = ""
-host = "localhost"
-port = "3306"
-database = "ai_data_asistant"
-
-DATABASE_URL = f"mysql+pymysql://{username}:{password}@{host}:{port}/{database}"
-
-def ingest_business_data():
-    engine = create_engine(DATABASE_URL)
-    df = pd.read_sql("SELECT * FROM business_data", engine)
-
-    texts = []
-    metadatas = []
-
-    for _, row in df.iterrows():
-        text = (
-            f"Customer {row.customer_name} made a {row.finance_type} "
-            f"purchase of {row.product} worth {row.amount} "
-            f"in {row.month}. Sales count: {row.quantity}."
-        )
-
-        texts.append(text)
-        metadatas.append({
-            "source": "mysql",
-            "table": "business_data",
-            "customer": row.customer_name,
-            "month": row.month,
-            "finance": row.finance_type
-        })
-
-    add_texts(texts=texts, metadatas=metadatas)
-    return len(texts)
\ No newline at end of file
+import json
+import os
+from app.vectorstore import upsert_sources, persist_vectorstore, compact_vectorstore, source_metadatas
+from app import aggregate_cache, analytics_snapshot
+from app.business_db import get_engine
+
+# Incremental ingestion settings
+TABLE = "business_data"
+KEY_COLUMN = os.getenv("SQL_INGEST_KEY_COLUMN", "id")
+WATERMARK_COLUMN = os.getenv("SQL_INGEST_WATERMARK_COLUMN", KEY_COLUMN)  # primary key or an updated_at column
+BATCH_SIZE = int(os.getenv("SQL_INGEST_BATCH_SIZE", "5000"))
+STATE_PATH = "data/sql_ingest_state.json"
+
+
+def load_watermark():
+    """Return the last ingested watermark value, or None for a first run"""
+    if not os.path.exists(STATE_PATH):
+        return None
+
+    with open(STATE_PATH, "r", encoding="utf-8") as f:
+        state = json.load(f)
+
+    # A different watermark column means the old value is meaningless
+    if state.get("column") != WATERMARK_COLUMN:
+        return None
+    return state.get("value")
+
+
+def save_watermark(value):
+    os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
+    tmp_path = STATE_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"column": WATERMARK_COLUMN, "value": value}, f)
+    os.replace(tmp_path, STATE_PATH)
+
+
+def iter_new_rows(engine, watermark=None, chunksize: int = BATCH_SIZE):
+    """
+    Yield DataFrames of rows past the watermark, ordered by the watermark column.
+
+    An updated_at watermark is compared with >= so rows written in the same
+    tick as the last run are re-read; upserts make that harmless.
+    """
+    if watermark is None:
+        query = f"SELECT * FROM {TABLE} ORDER BY {WATERMARK_COLUMN}"
+        params = {}
+    else:
+        op = ">" if WATERMARK_COLUMN == KEY_COLUMN else ">="
+        query = f"SELECT * FROM {TABLE} WHERE {WATERMARK_COLUMN} {op} :watermark ORDER BY {WATERMARK_COLUMN}"
+        params = {"watermark": watermark}
+
+    with engine.connect().execution_options(stream_results=True) as conn:
+        for df in pd.read_sql(text(query), conn, params=params, chunksize=chunksize):
+            if not df.empty:
+                yield df
+
+
+def build_documents(df: pd.DataFrame):
+    """Build texts, metadatas and source keys for a batch of business_data rows"""
+    texts = (
+        "Customer " + df["customer_name"].astype(str)
+        + " made a " + df["finance_type"].astype(str)
+        + " purchase of " + df["product"].astype(str)
+        + " worth " + df["amount"].astype(str)
+        + " in " + df["month"].astype(str)
+        + ". Sales count: " + df["quantity"].astype(str) + "."
+    ).tolist()
+
+    metadatas = (
+        df[["customer_name", "month", "finance_type"]]
+        .rename(columns={"customer_name": "customer", "finance_type": "finance"})
+        .assign(source="mysql", table=TABLE, row_id=df[KEY_COLUMN].astype(str))
+        .to_dict("records")
+    )
+
+    # One registry source per row, so a changed row replaces its own chunk
+    source_keys = (f"mysql:{TABLE}:" + df[KEY_COLUMN].astype(str)).tolist()
+    return texts, metadatas, source_keys
+
+
+def _to_json_value(value):
+    # numpy scalars -> python, timestamps -> 'YYYY-MM-DD HH:MM:SS'
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, (int, float, str)):
+        return value
+    return str(value)
+
+
+def previous_groups(source_keys: list[str], row_ids: list[str]):
+    """
+    Months and customers that already-ingested rows were indexed under.
+
+    Returns None when a changed row's old values are unknown (its source
+    links to another row's near-duplicate chunk), so the caller can fall
+    back to a full aggregate refresh.
+    """
+    months, customers = set(), set()
+    indexed = source_metadatas(source_keys)
+    for source_key, row_id in zip(source_keys, row_ids):
+        if source_key not in indexed:
+            continue  # a new row
+        own = [m for m in indexed[source_key] if m.get("row_id") == row_id]
+        if not own:
+            return None
+        months.update(m.get("month") for m in own)
+        customers.update(m.get("customer") for m in own)
+    return months, customers
+
+
+def ingest_business_data(engine=None, full_refresh: bool = False, stats: dict = None):
+    """
+    Incrementally ingest business_data rows into the vectorstore.
+
+    Only rows past the persisted watermark are read, in BATCH_SIZE chunks.
+    Each row is a registry source, so changed rows replace their old
+    chunks instead of being duplicated. Returns the number of rows ingested;
+    chunk and near-duplicate counts go into the optional stats dict.
+    """
+    engine = engine or get_engine()
+    watermark = None if full_refresh else load_watermark()
+
+    rows = 0
+    months, customers = set(), set()
+    groups_known = True
+    for df in iter_new_rows(engine, watermark):
+        texts, metadatas, source_keys = build_documents(df)
+        # Changed rows also leave the groups they were in before
+        previous = previous_groups(source_keys, [m["row_id"] for m in metadatas])
+        if previous is None:
+            groups_known = False
+        else:
+            months.update(previous[0])
+            customers.update(previous[1])
+        upsert_sources(source_keys, texts, metadatas, persist=False, stats=stats)
+
+        rows += len(df)
+        months.update(df["month"].unique().tolist())
+        customers.update(df["customer_name"].unique().tolist())
+        watermark = _to_json_value(df[WATERMARK_COLUMN].iloc[-1])
+        print(f"✓ Ingested {rows} rows from {TABLE} (watermark {watermark})")
+
+    if rows:
+        # Commit the index before the watermark so a crash re-reads, never skips
+        if not compact_vectorstore():
+            persist_vectorstore()
+        save_watermark(watermark)
+
+        # Keep the materialized chart aggregates in step with the new rows
+        if full_refresh or not groups_known:
+            aggregate_cache.full_refresh(engine)
+        else:
+            aggregate_cache.refresh_groups(engine, months, customers)
+        if analytics_snapshot.enabled():
+            analytics_snapshot.refresh(engine)
+    else:
+        print(f"✓ No new rows in {TABLE}")
+
+    return rows
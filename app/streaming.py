@@ -0,0 +1,215 @@
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse, StreamingResponse
+from typing import Iterator, AsyncIterator, Any
+import asyncio
+import threading
+import json
+import time
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Output layer for /ask/stream. Token events can be coalesced: the first
+# token of a frame waits up to SSE_COALESCE_MS for more (or until
+# SSE_COALESCE_MAX_CHARS are buffered), then everything buffered goes out
+# as one write, consecutive tokens merged into one "token" event. Control
+# events (start, end, error) are never delayed. Coalescing is off by default:
+# in benchmarks/sse_bench.py it only saves CPU when tokens arrive several
+# per window (a 20ms window with 5ms tokens); at one token per window it
+# costs more than it saves. Async event sources are consumed on the event
+# loop; a blocking iterator is drained on its own thread so a slow LLM never
+# stalls the loop.
+COALESCE_MS = float(os.getenv("SSE_COALESCE_MS", "0"))
+COALESCE_MAX_CHARS = int(os.getenv("SSE_COALESCE_MAX_CHARS", "512"))
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact JSON bytes, via orjson when installed"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=jsonable_encoder, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(jsonable_encoder(obj), separators=(",", ":"), ensure_ascii=False).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with dumps(), for endpoints that return plain dicts"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class LimitedStreamingResponse(StreamingResponse):
+    """StreamingResponse cut off after `timeout` seconds; `on_close` runs however it ends"""
+
+    def __init__(self, content, *args, timeout: float = None, on_close=None, **kwargs):
+        super().__init__(content, *args, **kwargs)
+        self.content, self.timeout, self.on_close = content, timeout, on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await asyncio.wait_for(super().__call__(scope, receive, send), self.timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠ Streaming response cut off after {self.timeout}s")
+        finally:
+            # Release what the body holds (e.g. a DB cursor) now, not at GC
+            close = getattr(self.content, "close", None)
+            try:
+                if close:
+                    try:
+                        close()
+                    except ValueError:
+                        # Mid-next() on a worker thread: close once that returns
+                        await asyncio.to_thread(_close_when_idle, self.content)
+            finally:
+                if self.on_close:
+                    self.on_close()
+
+
+def _close_when_idle(generator):
+    while generator.gi_running:
+        time.sleep(0.01)
+    generator.close()
+
+
+def frame(event: dict) -> bytes:
+    return b"data: " + dumps(event) + b"\n\n"
+
+
+def merge_tokens(events: list) -> list:
+    """Collapse runs of token events into one token event each"""
+    merged = []
+    for event in events:
+        if event["type"] == "token" and merged and merged[-1]["type"] == "token":
+            merged[-1] = {"type": "token", "content": merged[-1]["content"] + event["content"]}
+        else:
+            merged.append(event)
+    return merged
+
+
+async def coalesced_frames(
+    events,
+    interval_ms: float = None,
+    max_chars: int = None,
+) -> AsyncIterator[bytes]:
+    """SSE bytes for an event iterator (async or blocking), one write per coalescing window"""
+    interval = (COALESCE_MS if interval_ms is None else interval_ms) / 1000
+    max_chars = COALESCE_MAX_CHARS if max_chars is None else max_chars
+    is_async = hasattr(events, "__aiter__")
+
+    if is_async and interval <= 0:
+        # Nothing to merge and nothing blocking: one frame per event
+        try:
+            async for event in events:
+                yield frame(event)
+                if event["type"] == "end":
+                    return
+        except Exception as e:
+            yield frame({"type": "error", "content": str(e)}) + frame({"type": "end", "content": None})
+        return
+
+    loop = asyncio.get_running_loop()
+    lock = threading.Lock()
+    buffer = []
+    # notified: the consumer has been (or will be) woken for what is buffered
+    # urgent: what is buffered should go out without waiting for the window
+    state = {"chars": 0, "notified": True, "urgent": False, "done": False, "cancelled": False}
+    waiter = None
+
+    def wake():
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def notify():
+        try:
+            loop.call_soon_threadsafe(wake)
+        except RuntimeError:
+            pass  # loop already closed (client went away at shutdown)
+
+    def push(event) -> bool:
+        """Buffer an event; True when the consumer needs waking"""
+        with lock:
+            buffer.append(event)
+            if event["type"] == "token":
+                state["chars"] += len(event["content"] or "")
+            flush_now = event["type"] != "token" or interval <= 0 or state["chars"] >= max_chars
+            needs_wake = not state["notified"] or (flush_now and not state["urgent"])
+            state["notified"] = True
+            state["urgent"] = state["urgent"] or flush_now
+        return needs_wake
+
+    def fail(e: Exception):
+        with lock:
+            buffer.extend([{"type": "error", "content": str(e)}, {"type": "end", "content": None}])
+
+    def finish():
+        with lock:
+            state["done"] = True
+
+    def produce():
+        try:
+            for event in events:
+                if state["cancelled"]:
+                    break
+                if push(event):
+                    notify()
+        except Exception as e:
+            fail(e)
+        finally:
+            close = getattr(events, "close", None)
+            if close:
+                close()
+            finish()
+            notify()
+
+    async def produce_async():
+        try:
+            async for event in events:
+                if push(event):
+                    wake()
+        except Exception as e:
+            fail(e)
+        finally:
+            finish()
+            wake()
+
+    if is_async:
+        producer = loop.create_task(produce_async())
+    else:
+        producer = None
+        threading.Thread(target=produce, name="sse-producer", daemon=True).start()
+    try:
+        while True:
+            # Sleep until the producer has something
+            with lock:
+                idle = not buffer and not state["done"]
+                if idle:
+                    state["notified"] = False
+                    waiter = loop.create_future()
+            if idle:
+                await waiter
+
+            # Hold the window open for more tokens unless something is urgent
+            with lock:
+                hold = interval > 0 and not state["urgent"] and not state["done"]
+                if hold:
+                    waiter = loop.create_future()
+            if hold:
+                timer = loop.call_later(interval, wake)
+                await waiter
+                timer.cancel()
+
+            with lock:
+                batch = buffer[:]
+                del buffer[:]
+                done = state["done"]
+                state.update(chars=0, urgent=False)
+            if batch:
+                yield b"".join(frame(event) for event in (merge_tokens(batch) if interval > 0 else batch))
+            if done or any(event["type"] == "end" for event in batch):
+                return
+    finally:
+        state["cancelled"] = True
+        if producer is not None:
+            producer.cancel()
@@ -1,8 +1,14 @@
 from langchain_huggingface.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
-from langchain_community.retrievers import BM25Retriever
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_classic.retrievers import EnsembleRetriever
 from langchain_classic.schema import Document
+from app.keyword_index import KeywordIndex
+from app import source_registry, dedup
+import numpy as np
+import threading
+import faiss
+import uuid
 import os
 
 # Initialize embeddings model
@@ -12,34 +18,19 @@ embeddings = HuggingFaceEmbeddings(
 
 VECTOR_DIR = "data/faiss_index"
 
+# Compact FAISS once this share of its vectors belongs to deleted sources
+COMPACT_THRESHOLD = float(os.getenv("VECTOR_COMPACT_THRESHOLD", "0.2"))
+# Coalesce index saves from bursts of source updates
+PERSIST_DELAY_SECONDS = float(os.getenv("VECTOR_PERSIST_DELAY_SECONDS", "2.0"))
+
 # Global variables to store retrievers
 vector_db = None  # FAISS for semantic search
-bm25_retriever = None  # BM25 for keyword search
+keyword_index = None  # BM25 for keyword search
 
-
-def create_vectorstore(texts):
-    """
-    Create both FAISS (semantic) and BM25 (keyword) indexes
-    Called when uploading new PDF
-    """
-    global vector_db, bm25_retriever
-    
-    # VALIDATION: Filter out None or empty strings
-    valid_texts = [t for t in texts if t and isinstance(t, str) and t.strip()]
-    
-    if not valid_texts:
-        print("⚠ No valid texts to index. Skipping vectorstore creation.")
-        return
-
-    # Create FAISS semantic search index
-    vector_db = FAISS.from_texts(valid_texts, embeddings)
-    vector_db.save_local(VECTOR_DIR)
-    
-    # Create BM25 retriever for keyword-based search
-    docs = [Document(page_content=text) for text in valid_texts]
-    bm25_retriever = BM25Retriever.from_documents(docs)
-    
-    print(f"✓ Created vectorstore with {len(valid_texts)} chunks")
+# Serializes index writers. Searches take no lock here: compaction swaps in a
+# new FAISS object, and KeywordIndex guards its own postings.
+_write_lock = threading.RLock()
+_persist_timer = None
 
 
 def get_vectorstore():
@@ -48,7 +39,7 @@ def get_vectorstore():
     Loads from disk if not already in memory
     """
     global vector_db
-    
+
     if vector_db is None and os.path.exists(VECTOR_DIR):
         try:
             vector_db = FAISS.load_local(
@@ -56,71 +47,97 @@ def get_vectorstore():
                 embeddings,
                 allow_dangerous_deserialization=True
             )
+            source_registry.load()
             print("✓ Loaded FAISS vectorstore from disk")
+            
+            if dedup.DEDUP_ENABLED and not os.path.exists(dedup.INDEX_PATH):
+                live = {
+                    doc_id: d.page_content for doc_id, d in vector_db.docstore._dict.items()
+                    if isinstance(d, Document) and doc_id not in source_registry.tombstones
+                }
+                dedup.backfill(list(live.keys()), list(live.values()))
         except Exception as e:
             print(f"⚠ Failed to load FAISS index: {e}")
             return None
-    
+
     return vector_db
 
 
-def get_bm25_retriever():
+def get_keyword_index():
     """
-    Get BM25 retriever
+    Get the BM25 keyword index
     Creates from existing FAISS documents if not initialized
     """
-    global bm25_retriever, vector_db
-    
-    if bm25_retriever is None:
-        vector_db = get_vectorstore()
-        
-        if vector_db is not None:
-            # Extract all documents from FAISS and create BM25
+    global keyword_index
+
+    if keyword_index is None:
+        db = get_vectorstore()
+
+        if db is not None:
+            # Extract all live documents from FAISS
             try:
-                all_docs = list(vector_db.docstore._dict.values())
-                # VALIDATION: Filter out None or empty page_content
-                docs = [d for d in all_docs if isinstance(d, Document) and d.page_content and isinstance(d.page_content, str) and d.page_content.strip()]
-                
+                docs = {
+                    doc_id: d for doc_id, d in db.docstore._dict.items()
+                    # VALIDATION: Filter out None or empty page_content
+                    if isinstance(d, Document) and d.page_content and isinstance(d.page_content, str) and d.page_content.strip()
+                    and doc_id not in source_registry.tombstones
+                }
+
                 if not docs:
                     print("⚠ No valid documents found for BM25")
                     return None
-                    
-                bm25_retriever = BM25Retriever.from_documents(docs)
-                print(f"✓ Initialized BM25 retriever from {len(docs)} FAISS documents")
+
+                index = KeywordIndex()
+                index.add_documents(list(docs.keys()), list(docs.values()))
+                keyword_index = index
+                print(f"✓ Initialized BM25 index from {len(docs)} FAISS documents")
             except Exception as e:
                 print(f"⚠ Error initializing BM25: {e}")
                 return None
-    
-    return bm25_retriever
+
+    return keyword_index
+
+
+def get_bm25_retriever(k: int = 4):
+    """
+    Get BM25 retriever over the keyword index
+    """
+    index = get_keyword_index()
+    return index.as_retriever(k=k) if index is not None else None
 
 
 def get_hybrid_retriever(k: int = 4):
     """
     Create hybrid retriever combining FAISS and BM25
-    
+
     Args:
         k: number of results to return
-    
+
     Returns:
         EnsembleRetriever with weighted combination
     """
     semantic_retriever = get_vectorstore()
     keyword_retriever = get_bm25_retriever()
-    
+
     if semantic_retriever is None or keyword_retriever is None:
         return None
-    
+
+    # Hide chunks of deleted/replaced sources until compaction drops them
+    search_kwargs = {"k": k}
+    if source_registry.tombstones:
+        search_kwargs.update(filter=source_registry.is_live, fetch_k=max(20, k * 4))
+
     # Ensemble retriever: combines both search methods
     # weights: [0.6, 0.4] means 60% semantic, 40% keyword
     try:
         ensemble_retriever = EnsembleRetriever(
             retrievers=[
-                semantic_retriever.as_retriever(search_kwargs={"k": k}),
+                semantic_retriever.as_retriever(search_kwargs=search_kwargs),
                 keyword_retriever
             ],
             weights=[0.6, 0.4]
         )
-        
+
         print(f"✓ Created hybrid retriever with k={k}")
         return ensemble_retriever
     except Exception as e:
@@ -128,59 +145,298 @@ def get_hybrid_retriever(k: int = 4):
         return None
 
 
-def add_texts(texts: list[str], metadatas: list[dict]):
+def hybrid_search(query: str, k: int = 4) -> tuple[list, float]:
+    """
+    Hybrid search that also reports how well the results match.
+    Fuses semantic and BM25 hits with the same 0.6/0.4 weighted
+    reciprocal-rank scoring as get_hybrid_retriever and returns
+    (documents, best semantic relevance in [0, 1]).
     """
-    Add new texts to both FAISS and BM25
-    Called when ingesting MySQL data
-    
+    db = get_vectorstore()
+    index = get_keyword_index()
+    if db is None or index is None:
+        return [], 0.0
+
+    search_kwargs = {}
+    if source_registry.tombstones:
+        search_kwargs.update(filter=source_registry.is_live, fetch_k=max(20, k * 4))
+    semantic = db.similarity_search_with_relevance_scores(query, k=k, **search_kwargs)
+    keyword = index.search(query, k=k)
+
+    fused, documents = {}, {}
+    for weight, ranked in ((0.6, [doc for doc, _ in semantic]), (0.4, keyword)):
+        for rank, doc in enumerate(ranked):
+            fused[doc.page_content] = fused.get(doc.page_content, 0.0) + weight / (rank + 1 + 60)
+            documents.setdefault(doc.page_content, doc)
+
+    ranked = sorted(fused, key=fused.get, reverse=True)
+    relevance = max((score for _, score in semantic), default=0.0)
+    return [documents[content] for content in ranked], min(max(float(relevance), 0.0), 1.0)
+
+
+def add_texts(texts: list[str], metadatas: list[dict], ids: list[str] = None, persist: bool = True, stats: dict = None):
+    """
+    Add new texts to both FAISS and BM25, skipping near-duplicates of
+    chunks that are already indexed
+
     Args:
         texts: list of text chunks to add
         metadatas: metadata for each chunk
+        ids: optional docstore ids for each chunk (generated if omitted)
+        persist: save FAISS right away; batch callers pass False and
+            call persist_vectorstore() once at the end
+        stats: optional dict that receives chunk/duplicate counts
+
+    Returns:
+        ids of the chunks that were added
     """
-    global vector_db, bm25_retriever
-    
+    added, _ = _add_texts(texts, metadatas, ids, persist, stats)
+    return added
+
+
+def _add_texts(texts, metadatas, ids, persist, stats):
+    """add_texts, also returning {requested id: canonical chunk id} for duplicates"""
+    global vector_db
+
     # VALIDATION: Filter out None or empty strings
-    # We must also filter metadatas to match the filtered texts
+    # We must also filter metadatas (and ids) to match the filtered texts
     valid_data = []
     for i, t in enumerate(texts):
         if t and isinstance(t, str) and t.strip():
-             valid_data.append((t, metadatas[i] if i < len(metadatas) else {}))
-    
+             chunk_id = ids[i] if ids else str(uuid.uuid4())
+             metadata = dict(metadatas[i] if i < len(metadatas) else {}, chunk_id=chunk_id)
+             valid_data.append((t, metadata, chunk_id))
+
     if not valid_data:
         print("⚠ No valid texts to add. Skipping.")
-        return
-
-    valid_texts, valid_metadatas = zip(*valid_data)
-    valid_texts = list(valid_texts)
-    valid_metadatas = list(valid_metadatas)
-    
-    # Add to FAISS vectorstore
-    if vector_db is None:
-        # Create new if doesn't exist
-        vector_db = FAISS.from_texts(
-            texts=valid_texts,
-            embedding=embeddings,
-            metadatas=valid_metadatas
-        )
-        print(f"✓ Created FAISS with {len(valid_texts)} texts")
-    else:
-        # Add to existing
-        vector_db.add_texts(
-            texts=valid_texts,
-            metadatas=valid_metadatas
-        )
-        print(f"✓ Added {len(valid_texts)} texts to FAISS")
-    
-    # Save FAISS to disk
-    vector_db.save_local(VECTOR_DIR)
-    
-    # Recreate BM25 with all documents
+        return [], {}
+
+    valid_texts, valid_metadatas, valid_ids = (list(x) for x in zip(*valid_data))
+
+    with _write_lock:
+        # Near-duplicate suppression (boilerplate, overlaps, revised re-uploads)
+        get_vectorstore()
+        keep, duplicates, pending = dedup.filter_duplicates(valid_texts, valid_ids)
+        duplicates = {valid_ids[i]: canonical_id for i, canonical_id in duplicates.items()}
+        if stats is not None:
+            stats["chunks"] = stats.get("chunks", 0) + len(valid_texts)
+            stats["duplicates"] = stats.get("duplicates", 0) + len(duplicates)
+            stats["indexed"] = stats.get("indexed", 0) + len(keep)
+        if duplicates:
+            print(f"✓ Skipped {len(duplicates)} near-duplicate chunks")
+        if not keep:
+            return [], duplicates
+
+        valid_texts = [valid_texts[i] for i in keep]
+        valid_metadatas = [valid_metadatas[i] for i in keep]
+        valid_ids = [valid_ids[i] for i in keep]
+
+        # Add to FAISS vectorstore (load the saved index first so a fresh
+        # process appends to it instead of overwriting it)
+        if get_vectorstore() is None:
+            # Create new if doesn't exist
+            vector_db = FAISS.from_texts(
+                texts=valid_texts,
+                embedding=embeddings,
+                metadatas=valid_metadatas,
+                ids=valid_ids
+            )
+            print(f"✓ Created FAISS with {len(valid_texts)} texts")
+        else:
+            # Add to existing
+            vector_db.add_texts(
+                texts=valid_texts,
+                metadatas=valid_metadatas,
+                ids=valid_ids
+            )
+            print(f"✓ Added {len(valid_texts)} texts to FAISS")
+
+        # Add to BM25 incrementally
+        index = get_keyword_index()
+        if index is not None:
+            index.add_documents(valid_ids, [vector_db.docstore._dict[i] for i in valid_ids])
+
+        # Only stored chunks may become canonicals for later near-duplicates
+        dedup.add(pending)
+
+        if persist:
+            persist_vectorstore()
+
+    return valid_ids, duplicates
+
+
+def upsert_sources(source_keys: list[str], texts: list[str], metadatas: list[dict], persist: bool = True, stats: dict = None) -> list[str]:
+    """
+    Add texts that belong to registered sources, replacing whatever those
+    sources contributed before. Cost is proportional to the sources being
+    replaced, not to the corpus.
+
+    Near-duplicates are dropped, or in DEDUP_MODE=link registered against
+    their canonical chunk so the source keeps it alive.
+
+    Args:
+        source_keys: source key of each text (one source may span many texts)
+        texts: list of text chunks
+        metadatas: metadata for each chunk
+        persist: save right away, or leave it to the caller
+        stats: optional dict that receives chunk/duplicate counts
+
+    Returns:
+        ids of the chunks stored for these sources
+    """
+    with _write_lock:
+        for source_key in dict.fromkeys(source_keys):
+            _remove_source(source_key)
+
+        chunk_ids = [str(uuid.uuid4()) for _ in texts]
+        added, duplicates = _add_texts(texts, metadatas, chunk_ids, False, stats)
+        added = set(added)
+
+        stored = []
+        for source_key, chunk_id in zip(source_keys, chunk_ids):
+            if chunk_id in added:
+                source_registry.register(source_key, [chunk_id])
+                stored.append(chunk_id)
+                continue
+
+            # Link to the canonical chunk only if the registry manages it
+            # (chunks indexed before the registry existed are never deleted)
+            canonical_id = duplicates.get(chunk_id)
+            if dedup.DEDUP_MODE == "link" and (canonical_id in added or source_registry.is_registered(canonical_id)):
+                source_registry.register(source_key, [canonical_id])
+                stored.append(canonical_id)
+
+        if persist:
+            persist_vectorstore()
+
+    return stored
+
+
+def source_metadatas(source_keys: list[str]) -> dict:
+    """Metadata of the chunks each registered source currently points at"""
+    source_registry.load()
+    db = get_vectorstore()
+    result = {}
+    for source_key in source_keys:
+        if source_key not in source_registry.sources:
+            continue
+        docs = [db.docstore._dict.get(chunk_id) for chunk_id in source_registry.sources[source_key]] if db else []
+        result[source_key] = [doc.metadata for doc in docs if isinstance(doc, Document)]
+    return result
+
+
+def replace_source(source_key: str, texts: list[str], metadatas: list[dict] = None, persist: bool = True, stats: dict = None) -> int:
+    """Re-ingest a single source in place; returns the number of chunks stored"""
+    metadatas = metadatas or [{} for _ in texts]
+
+    with _write_lock:
+        if not texts:
+            delete_source(source_key, persist=persist)
+            return 0
+        return len(upsert_sources([source_key] * len(texts), texts, metadatas, persist=persist, stats=stats))
+
+
+def delete_source(source_key: str, persist: bool = True) -> int:
+    """Remove a source from search; returns the number of chunks removed"""
+    with _write_lock:
+        removed = _remove_source(source_key)
+        if persist:
+            persist_vectorstore()
+    return removed
+
+
+def _remove_source(source_key: str) -> int:
+    count, dead = source_registry.unregister(source_key)
+
+    # BM25 drops them for real; FAISS hides them until compaction
+    index = get_keyword_index()
+    if index is not None:
+        for chunk_id in dead:
+            index.remove(chunk_id)
+    dedup.remove(dead)
+
+    return count
+
+
+def persist_vectorstore():
+    """
+    Save FAISS, the source registry and the MinHash index to disk
+    """
+    with _write_lock:
+        if vector_db is None:
+            return
+
+        vector_db.save_local(VECTOR_DIR)
+        source_registry.save()
+        dedup.save()
+
+
+def schedule_persist():
+    """
+    Persist shortly in the background, coalescing bursts of updates into
+    one save, then compact if enough tombstones have accumulated
+    """
+    global _persist_timer
+
+    with _write_lock:
+        if _persist_timer is not None:
+            return
+        _persist_timer = threading.Timer(PERSIST_DELAY_SECONDS, _background_persist)
+        _persist_timer.daemon = True
+        _persist_timer.start()
+
+
+def _background_persist():
+    global _persist_timer
+
+    with _write_lock:
+        _persist_timer = None
+
     try:
-        docs = list(vector_db.docstore._dict.values())
-        # Filter again just in case the store has old bad data
-        valid_docs = [d for d in docs if isinstance(d, Document) and d.page_content and isinstance(d.page_content, str)]
-        if valid_docs:
-            bm25_retriever = BM25Retriever.from_documents(valid_docs)
-            print(f"✓ Updated BM25 retriever with {len(valid_docs)} documents")
+        if not compact_vectorstore():
+            persist_vectorstore()
     except Exception as e:
-         print(f"⚠ Error updating BM25: {e}")
\ No newline at end of file
+        print(f"⚠ Background persist failed: {e}")
+
+
+def vectorstore_stats() -> dict:
+    db = get_vectorstore()
+    return source_registry.stats(db.index.ntotal if db is not None else 0)
+
+
+def compact_vectorstore(force: bool = False) -> bool:
+    """
+    Physically drop tombstoned chunks from FAISS once they pass
+    COMPACT_THRESHOLD (or always, with force). The compacted index is built
+    as a copy and swapped in, so searches never see a half-compacted index.
+
+    Returns:
+        True if a compaction ran (and the result was persisted)
+    """
+    global vector_db
+
+    with _write_lock:
+        db = get_vectorstore()
+        dead = source_registry.tombstones & set(db.index_to_docstore_id.values()) if db is not None else set()
+
+        if not dead or (not force and len(dead) / db.index.ntotal < COMPACT_THRESHOLD):
+            return False
+
+        positions = sorted(db.index_to_docstore_id.items())
+        dead_positions = np.array([i for i, doc_id in positions if doc_id in dead], dtype=np.int64)
+        live_ids = [doc_id for _, doc_id in positions if doc_id not in dead]
+
+        index = faiss.clone_index(db.index)
+        index.remove_ids(dead_positions)
+
+        vector_db = FAISS(
+            embedding_function=embeddings,
+            index=index,
+            docstore=InMemoryDocstore({doc_id: db.docstore._dict[doc_id] for doc_id in live_ids}),
+            index_to_docstore_id=dict(enumerate(live_ids)),
+        )
+        source_registry.clear_tombstones(dead)
+        persist_vectorstore()
+        print(f"✓ Compacted FAISS: dropped {len(dead)} chunks, {len(live_ids)} remain")
+
+    return True
@@ -0,0 +1,276 @@
+"""
+Analytics benchmark harness over a synthetic business_data table.
+
+Generates business_data in SQLite (standing in for MySQL) at each
+requested row count and times, end to end:
+  - aggregate cache: full refresh, then sales_by_month / top_customer
+  - aggregation specs through SQL and the columnar snapshot (cold / warm)
+  - chart construction: capped grouped charts and day/week/month series
+  - row export streaming
+  - SQL-to-vector ingestion (sql_ingest) on a smaller table, since every
+    row is embedded
+
+Usage:
+    python -m benchmarks.analytics_bench --rows 10000 100000 1000000 --output benchmarks/results/analytics.json
+    python -m benchmarks.analytics_bench --baseline benchmarks/results/analytics.json
+    python -m benchmarks.analytics_bench --rows 100000 --ingest-rows 0   # skip embedding
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from benchmarks.common import Stage, run_metadata, finish
+
+# Charts over day/week buckets need a timestamp column; must be set before app imports
+os.environ.setdefault("BUSINESS_DATE_COLUMN", "created_at")
+
+MONTHS = [
+    "January", "February", "March", "April", "May", "June", "July",
+    "August", "September", "October", "November", "December",
+]
+FINANCE_TYPES = ["credit", "cash", "loan", "lease"]
+
+
+def make_business_db(path: str, rows: int, customers: int = 5000, products: int = 200, days: int = 1460, seed: int = 42):
+    """Write a synthetic business_data table (with a created_at timestamp) to a SQLite file"""
+    rng = random.Random(seed)
+    start = datetime(2021, 1, 1)
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE business_data (
+            id INTEGER PRIMARY KEY,
+            customer_name TEXT, finance_type TEXT, product TEXT,
+            amount REAL, month TEXT, quantity INTEGER, created_at TIMESTAMP
+        )
+    """)
+
+    batch = []
+    for i in range(1, rows + 1):
+        created = start + timedelta(seconds=rng.randint(0, days * 86400))
+        batch.append((
+            i,
+            f"Customer {rng.randint(1, customers)}",
+            rng.choice(FINANCE_TYPES),
+            f"Product {rng.randint(1, products)}",
+            round(rng.uniform(5, 5000), 2),
+            MONTHS[created.month - 1],
+            rng.randint(1, 20),
+            created.strftime("%Y-%m-%d %H:%M:%S"),
+        ))
+        if len(batch) == 50000:
+            conn.executemany("INSERT INTO business_data VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+            batch = []
+    if batch:
+        conn.executemany("INSERT INTO business_data VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+    conn.commit()
+    conn.close()
+
+
+def bench_specs():
+    from app.aggregations import AggregationSpec
+
+    return {
+        "sales_by_month": AggregationSpec("month"),
+        "top_customer": AggregationSpec("customer", top_n=1),
+        "top_10_products_by_quantity": AggregationSpec("product", field="quantity", top_n=10),
+        "avg_amount_by_finance_type": AggregationSpec("finance_type", metric="avg"),
+        "customers_in_q1": AggregationSpec("customer", filters=(("month", ("January", "February", "March")),), top_n=5),
+    }
+
+
+def _latency(fn, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    total = sum(samples) / 1000
+    return {
+        "p50_ms": round(statistics.median(samples), 4),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1] if len(samples) > 1 else samples[0], 4),
+        "queries_per_sec": round(repeat / total, 2) if total else None,
+    }
+
+
+def bench_cache(rows: int, repeat: int) -> dict:
+    from app import aggregate_cache, business_db
+    from app.analytics import sales_by_month, top_customer
+
+    aggregate_cache._state = None
+    with Stage() as stage:
+        aggregate_cache.full_refresh(business_db.get_engine())
+    return {
+        "full_refresh": stage.report(rows=rows),
+        "sales_by_month": _latency(sales_by_month, repeat),
+        "top_customer": _latency(top_customer, repeat),
+    }
+
+
+def bench_aggregations(engine, repeat: int, name_prefix: str) -> dict:
+    from app import analytics_snapshot
+    from app.aggregations import run_aggregation
+
+    specs = {}
+    for name, spec in bench_specs().items():
+        def cold():
+            analytics_snapshot._results.clear()
+            analytics_snapshot.run_aggregation(spec)
+
+        specs[name] = {
+            "sql": _latency(lambda: run_aggregation(spec, engine), repeat),
+            "snapshot_cold": _latency(cold, repeat),
+            "snapshot_warm": _latency(lambda: analytics_snapshot.run_aggregation(spec), repeat),
+        }
+        print(
+            f"✓ {name_prefix} {name}: sql {specs[name]['sql']['p50_ms']:.2f}ms, "
+            f"snapshot {specs[name]['snapshot_cold']['p50_ms']:.2f}ms cold / "
+            f"{specs[name]['snapshot_warm']['p50_ms']:.4f}ms warm"
+        )
+    return specs
+
+
+def bench_charts(repeat: int, max_points: int) -> dict:
+    from app.aggregations import AggregationSpec
+    from app.router import spec_chart, series_chart
+
+    charts = {
+        "customers_capped": lambda: spec_chart(AggregationSpec("customer"), max_points),
+        "products_capped": lambda: spec_chart(AggregationSpec("product"), max_points),
+        "series_day": lambda: series_chart("day", max_points=max_points),
+        "series_week": lambda: series_chart("week", max_points=max_points),
+        "series_month": lambda: series_chart("month", max_points=max_points),
+    }
+    results = {}
+    for name, build in charts.items():
+        chart = build()
+        results[name] = {
+            **_latency(build, repeat),
+            "total_points": chart.get("total_points"),
+            "points": len(chart.get("labels", [])),
+        }
+    return results
+
+
+def bench_export(rows: int) -> dict:
+    from app.analytics_export import export_rows
+
+    size = 0
+    with Stage() as stage:
+        for chunk in export_rows("ndjson"):
+            size += len(chunk)
+    return {**stage.report(rows=rows), "mb": round(size / 1e6, 2)}
+
+
+def bench_rows(rows: int, repeat: int, max_points: int) -> dict:
+    from app import business_db, analytics_snapshot, aggregate_cache
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "business.db")
+        with Stage() as stage:
+            make_business_db(db_path, rows)
+        generate = stage.report(rows=rows)
+
+        engine = business_db.configure(f"sqlite:///{db_path}")
+        analytics_snapshot.SNAPSHOT_PATH = os.path.join(tmp, "business_data.arrow")
+        cache_path, aggregate_cache.CACHE_PATH = aggregate_cache.CACHE_PATH, os.path.join(tmp, "aggregate_cache.json")
+
+        with Stage() as stage:
+            analytics_snapshot.refresh(engine)
+        snapshot_build = stage.report(rows=rows)
+        snapshot_build["file_mb"] = round(os.path.getsize(analytics_snapshot.SNAPSHOT_PATH) / 1e6, 2)
+
+        result = {
+            "name": f"rows-{rows}",
+            "rows": rows,
+            "generate": generate,
+            "snapshot_build": snapshot_build,
+            "aggregate_cache": bench_cache(rows, repeat),
+            "specs": bench_aggregations(engine, repeat, f"{rows} rows"),
+            "charts": bench_charts(repeat, max_points),
+            "export": bench_export(rows),
+        }
+        print(
+            f"✓ {rows} rows: cache refresh {result['aggregate_cache']['full_refresh']['seconds']:.2f}s, "
+            f"day series {result['charts']['series_day']['p50_ms']:.1f}ms, "
+            f"export {result['export']['rows_per_sec']:.0f} rows/s"
+        )
+        engine.dispose()
+        aggregate_cache.CACHE_PATH = cache_path
+
+    return result
+
+
+def _reset_ingest_state():
+    from app import vectorstore, source_registry, dedup, aggregate_cache
+
+    vectorstore.vector_db = None
+    vectorstore.keyword_index = None
+    source_registry.sources, source_registry.tombstones, source_registry._refs = {}, set(), {}
+    source_registry._loaded = False
+    dedup.signatures, dedup.buckets = {}, {}
+    dedup._loaded = False
+    aggregate_cache._state = None
+
+
+def bench_ingest(rows: int) -> dict:
+    """sql_ingest end to end into an empty index, run in a scratch working directory"""
+    from app import business_db
+    from app.sql_ingest import ingest_business_data
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        make_business_db(os.path.join(tmp, "business.db"), rows, seed=7)
+        engine = business_db.configure(f"sqlite:///{os.path.join(tmp, 'business.db')}")
+        os.chdir(tmp)
+        try:
+            _reset_ingest_state()
+            stats = {}
+            with Stage() as stage:
+                ingested = ingest_business_data(engine, stats=stats)
+            with Stage() as incremental:
+                ingest_business_data(engine)
+        finally:
+            os.chdir(cwd)
+            _reset_ingest_state()
+            engine.dispose()
+
+    result = {
+        "name": f"ingest-{rows}",
+        "rows": ingested,
+        "end_to_end": stage.report(rows=ingested, chunks=stats.get("chunks", 0)),
+        "incremental_noop_seconds": round(incremental.seconds, 6),
+        "duplicates": stats.get("duplicates", 0),
+    }
+    print(f"✓ ingest {rows} rows: {result['end_to_end']['seconds']:.2f}s ({result['end_to_end']['rows_per_sec']} rows/s)")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analytics benchmark over synthetic business_data")
+    parser.add_argument("--rows", nargs="+", type=int, default=[10000, 100000], help="business_data row counts")
+    parser.add_argument("--ingest-rows", nargs="*", type=int, default=[2000], help="row counts for sql_ingest (0 or none to skip)")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per query")
+    parser.add_argument("--max-points", type=int, default=500, help="chart point budget")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="earlier report to check for throughput regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed throughput drop (fraction)")
+    args = parser.parse_args()
+
+    results = [bench_rows(rows, args.repeat, args.max_points) for rows in args.rows]
+    results += [bench_ingest(rows) for rows in args.ingest_rows if rows > 0]
+
+    report = {
+        "benchmark": "analytics",
+        "meta": run_metadata(max_points=args.max_points),
+        "results": results,
+    }
+    finish(report, args.output, args.baseline, args.tolerance)
+
+
+if __name__ == "__main__":
+    main()
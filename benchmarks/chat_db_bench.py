@@ -0,0 +1,163 @@
+"""
+Chat database concurrency benchmark: SQLite defaults, the tuned profile
+and write-behind message persistence.
+
+Writer threads replay the /ask/stream write pattern (user message commit,
+updated_at commit, assistant message commit) while reader threads page
+conversations and messages. Each profile runs against a fresh database
+file and reports request throughput, latency and "database is locked"
+failures. The write-behind profile queues the two messages instead, and
+readers flush their conversation first, as the endpoints do.
+
+Usage:
+    python -m benchmarks.chat_db_bench --writers 8 --readers 4 --requests 200
+    python -m benchmarks.chat_db_bench --output benchmarks/results/chat_db.json
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from benchmarks.common import Stage, run_metadata, finish
+
+
+def _percentiles(samples: list) -> dict:
+    if not samples:
+        return {"p50_ms": None, "p95_ms": None}
+    samples = sorted(samples)
+    return {
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[max(0, int(len(samples) * 0.95) - 1)], 3),
+    }
+
+
+def bench_profile(name: str, writers: int, readers: int, requests: int) -> dict:
+    from app import database, message_writer
+    from app.database import build_engine, User, Conversation, Message
+    from app.migrations import migrate
+    from app.conversation_queries import conversations_statement, messages_statement, DEFAULT_PAGE_SIZE
+
+    tuned = name != "default"
+    write_behind = name == "write_behind"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(f"sqlite:///{os.path.join(tmp, 'chat.db')}", tuned=tuned)
+        migrate(engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+        session_factory, database.SessionLocal = database.SessionLocal, Session
+
+        with Session() as db:
+            db.add(User(id=1, username="bench", email="bench@example.com", hashed_password="x"))
+            db.add_all([Conversation(id=i, user_id=1, title=f"c{i}") for i in range(1, writers + 1)])
+            db.commit()
+
+        write_latency, read_latency = [], []
+        errors = {"locked": 0, "other": 0}
+        lock = threading.Lock()
+        stop_readers = threading.Event()
+
+        def record(samples, start):
+            with lock:
+                samples.append((time.perf_counter() - start) * 1000)
+
+        def fail(e):
+            with lock:
+                errors["locked" if "locked" in str(e) else "other"] += 1
+
+        def writer(conversation_id):
+            for i in range(requests):
+                start = time.perf_counter()
+                try:
+                    if write_behind:
+                        message_writer.enqueue_message(conversation_id, "user", f"question {i}")
+                        message_writer.enqueue_message(conversation_id, "assistant", "answer " * 50)
+                        record(write_latency, start)
+                        continue
+                    with Session() as db:
+                        db.add(Message(conversation_id=conversation_id, role="user", content=f"question {i}"))
+                        db.commit()
+                        db.query(Conversation).filter(Conversation.id == conversation_id).update(
+                            {"updated_at": datetime.utcnow()}
+                        )
+                        db.commit()
+                        db.add(Message(conversation_id=conversation_id, role="assistant", content="answer " * 50))
+                        db.commit()
+                    record(write_latency, start)
+                except OperationalError as e:
+                    fail(e)
+
+        def reader():
+            while not stop_readers.is_set():
+                start = time.perf_counter()
+                try:
+                    message_writer.flush()
+                    with Session() as db:
+                        rows = db.execute(conversations_statement(1, DEFAULT_PAGE_SIZE)).all()
+                        db.execute(messages_statement(rows[0].id if rows else 1, DEFAULT_PAGE_SIZE)).all()
+                    record(read_latency, start)
+                except OperationalError as e:
+                    fail(e)
+
+        reader_threads = [threading.Thread(target=reader) for _ in range(readers)]
+        writer_threads = [threading.Thread(target=writer, args=(i,)) for i in range(1, writers + 1)]
+        for thread in reader_threads:
+            thread.start()
+        with Stage() as stage:
+            for thread in writer_threads:
+                thread.start()
+            for thread in writer_threads:
+                thread.join()
+            message_writer.flush()
+        stop_readers.set()
+        for thread in reader_threads:
+            thread.join()
+        database.SessionLocal = session_factory
+        engine.dispose()
+
+    completed = len(write_latency)
+    result = {
+        "name": name,
+        "writers": writers,
+        "readers": readers,
+        "requests_attempted": writers * requests,
+        "requests_completed": completed,
+        "errors": errors,
+        "writes": {**stage.report(requests=completed, messages=completed * 2), **_percentiles(write_latency)},
+        "reads": {"count": len(read_latency), **_percentiles(read_latency)},
+    }
+    print(
+        f"✓ {result['name']}: {result['writes']['requests_per_sec']} requests/s "
+        f"(p95 {result['writes']['p95_ms']}ms), {errors['locked']} locked errors, "
+        f"reads p95 {result['reads']['p95_ms']}ms"
+    )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat database write concurrency benchmark")
+    parser.add_argument("--writers", type=int, default=8, help="concurrent /ask/stream-style writers")
+    parser.add_argument("--readers", type=int, default=4, help="concurrent conversation readers")
+    parser.add_argument("--requests", type=int, default=200, help="requests per writer")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="earlier report to check for throughput regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed throughput drop (fraction)")
+    args = parser.parse_args()
+
+    results = [
+        bench_profile(name, args.writers, args.readers, args.requests)
+        for name in ("default", "tuned", "write_behind")
+    ]
+    report = {
+        "benchmark": "chat_db",
+        "meta": run_metadata(),
+        "results": results,
+    }
+    finish(report, args.output, args.baseline, args.tolerance)
+
+
+if __name__ == "__main__":
+    main()
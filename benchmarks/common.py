@@ -0,0 +1,153 @@
+"""
+Shared helpers for the benchmark scripts: timing with peak RSS sampling,
+run metadata, JSON reports and regression comparison.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def current_rss_mb() -> float:
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 1e6
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError, AttributeError):
+        import resource
+        # ru_maxrss is the lifetime peak: KB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+class Stage:
+    """
+    Context manager timing one stage and sampling RSS in the background
+
+        with Stage() as stage:
+            work()
+        stage.seconds, stage.peak_rss_mb
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.seconds = 0.0
+        self.peak_rss_mb = 0.0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_rss_mb = max(self.peak_rss_mb, current_rss_mb())
+
+    def __enter__(self):
+        self.peak_rss_mb = current_rss_mb()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self._start
+        self._stop.set()
+        self._thread.join()
+        self.peak_rss_mb = max(self.peak_rss_mb, current_rss_mb())
+        return False
+
+    def report(self, **throughput) -> dict:
+        """Stage result; keyword args are item counts turned into per-second rates"""
+        result = {"seconds": round(self.seconds, 6), "peak_rss_mb": round(self.peak_rss_mb, 1)}
+        for name, count in throughput.items():
+            result[f"{name}_per_sec"] = round(count / self.seconds, 2) if self.seconds else None
+        return result
+
+
+def run_metadata(**extra) -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        **extra,
+    }
+
+
+def write_report(report: dict, output: str = None):
+    text = json.dumps(report, indent=2, default=str)
+    if output:
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"✓ Wrote report to {output}")
+    else:
+        print(text)
+
+
+def _rates(report: dict) -> dict:
+    """Flatten every *_per_sec value in a report to {path: value}"""
+    rates = {}
+
+    def walk(node, path):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                walk(value, f"{path}.{key}" if path else key)
+        elif isinstance(node, list):
+            for item in node:
+                walk(item, f"{path}[{item.get('name', '')}]" if isinstance(item, dict) else path)
+        elif path.endswith("_per_sec") and isinstance(node, (int, float)):
+            rates[path] = node
+
+    walk(report.get("results", report), "")
+    return rates
+
+
+def compare_reports(baseline_path: str, report: dict, tolerance: float = 0.2) -> list[str]:
+    """
+    List throughput metrics that dropped more than `tolerance` (a fraction)
+    against a baseline report of the same benchmark
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    old, new = _rates(baseline), _rates(report)
+    regressions = []
+    for key, before in old.items():
+        after = new.get(key)
+        if after is None or not before:
+            continue
+        change = (after - before) / before
+        if change < -tolerance:
+            regressions.append(f"{key}: {before} -> {after} ({change:+.0%})")
+    return regressions
+
+
+def finish(report: dict, output: str = None, baseline: str = None, tolerance: float = 0.2):
+    """Write the report and exit non-zero on regressions against the baseline"""
+    write_report(report, output)
+
+    if baseline:
+        regressions = compare_reports(baseline, report, tolerance)
+        if regressions:
+            print(f"\n⚠ {len(regressions)} regressions against {baseline}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"✓ No regressions beyond {tolerance:.0%} against {baseline}")
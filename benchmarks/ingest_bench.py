@@ -0,0 +1,204 @@
+"""
+Offline ingestion throughput benchmark.
+
+Generates synthetic PDF, DOCX, CSV, JSON and text corpora at several sizes
+and times each ingestion stage separately: extraction, splitting,
+embedding, FAISS add, BM25 build and save. Every stage reports throughput
+and peak RSS; the JSON report can be compared against an earlier run.
+
+Usage:
+    python -m benchmarks.ingest_bench --sizes 10 100 --output benchmarks/results/ingest.json
+    python -m benchmarks.ingest_bench --baseline benchmarks/results/ingest.json
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import tempfile
+from docx import Document as DocxDocument
+from benchmarks.common import Stage, run_metadata, finish
+from app.ingest import extract_text, splitter
+
+FORMATS = ["pdf", "docx", "csv", "json", "txt"]
+WORDS = (
+    "revenue customer invoice quarter forecast margin product region supplier "
+    "contract shipment budget payment account growth report analysis market "
+    "order inventory discount refund policy employee training compliance audit"
+).split()
+
+
+def _sentences(rng: random.Random, n_words: int) -> list[str]:
+    sentences = []
+    while n_words > 0:
+        length = rng.randint(8, 20)
+        words = [rng.choice(WORDS) for _ in range(min(length, n_words))]
+        sentences.append(" ".join(words).capitalize() + ".")
+        n_words -= length
+    return sentences
+
+
+def _write_pdf(path: str, lines: list[str], lines_per_page: int = 45):
+    """Minimal multi-page PDF with Helvetica text, readable by pypdf"""
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_refs = []
+
+    for page_lines in pages:
+        text = "".join(
+            f"({line.replace(chr(92), '').replace('(', '').replace(')', '')}) Tj T* " for line in page_lines
+        )
+        stream = f"BT /F1 10 Tf 12 TL 40 800 Td {text}ET".encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        page_refs.append(len(objects))
+
+    kids = " ".join(f"{ref} 0 R" for ref in page_refs).encode()
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_refs)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def generate_corpus(directory: str, fmt: str, n_docs: int, words_per_doc: int, seed: int = 42) -> list[str]:
+    """Write n_docs synthetic files of one format; returns their paths"""
+    rng = random.Random(seed)
+    paths = []
+
+    for i in range(n_docs):
+        path = os.path.join(directory, f"doc_{i:05d}.{fmt}")
+        sentences = _sentences(rng, words_per_doc)
+
+        if fmt == "txt":
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("\n\n".join(" ".join(sentences[j:j + 5]) for j in range(0, len(sentences), 5)))
+        elif fmt == "pdf":
+            _write_pdf(path, sentences)
+        elif fmt == "docx":
+            doc = DocxDocument()
+            for sentence in sentences:
+                doc.add_paragraph(sentence)
+            doc.save(path)
+        elif fmt in ("csv", "json"):
+            records = [
+                {
+                    "id": j,
+                    "customer": f"Customer {rng.randint(1, 500)}",
+                    "product": rng.choice(WORDS),
+                    "amount": round(rng.uniform(10, 5000), 2),
+                    "note": sentence,
+                }
+                for j, sentence in enumerate(sentences)
+            ]
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                if fmt == "csv":
+                    writer = csv.DictWriter(f, fieldnames=list(records[0].keys()))
+                    writer.writeheader()
+                    writer.writerows(records)
+                else:
+                    json.dump(records, f)
+
+        paths.append(path)
+
+    return paths
+
+
+def bench_corpus(fmt: str, n_docs: int, words_per_doc: int, embeddings) -> dict:
+    from langchain_community.vectorstores import FAISS
+    from langchain_classic.schema import Document
+    from app.keyword_index import KeywordIndex
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = generate_corpus(tmp, fmt, n_docs, words_per_doc)
+        total_mb = sum(os.path.getsize(p) for p in paths) / 1e6
+        stages = {}
+
+        with Stage() as stage:
+            texts = [extract_text(p) for p in paths]
+        stages["extract"] = stage.report(docs=len(paths), mb=total_mb)
+
+        with Stage() as stage:
+            chunks = [c for text in texts for c in splitter.split_text(text)]
+        stages["split"] = stage.report(docs=len(texts), chunks=len(chunks))
+
+        with Stage() as stage:
+            vectors = embeddings.embed_documents(chunks)
+        stages["embed"] = stage.report(chunks=len(chunks))
+
+        ids = [f"chunk-{i}" for i in range(len(chunks))]
+        with Stage() as stage:
+            db = FAISS.from_embeddings(list(zip(chunks, vectors)), embeddings, ids=ids)
+        stages["faiss_add"] = stage.report(chunks=len(chunks))
+
+        with Stage() as stage:
+            index = KeywordIndex()
+            index.add_documents(ids, [Document(page_content=c) for c in chunks])
+        stages["bm25_build"] = stage.report(chunks=len(chunks))
+
+        with Stage() as stage:
+            db.save_local(os.path.join(tmp, "faiss_index"))
+        stages["save"] = stage.report(chunks=len(chunks))
+
+    total = sum(s["seconds"] for s in stages.values())
+    result = {
+        "name": f"{fmt}-{n_docs}",
+        "format": fmt,
+        "docs": n_docs,
+        "words_per_doc": words_per_doc,
+        "input_mb": round(total_mb, 3),
+        "chunks": len(chunks),
+        "stages": stages,
+        "end_to_end": {
+            "seconds": round(total, 6),
+            "docs_per_sec": round(n_docs / total, 2) if total else None,
+            "chunks_per_sec": round(len(chunks) / total, 2) if total else None,
+        },
+    }
+    print(
+        f"✓ {result['name']}: {len(chunks)} chunks in {total:.2f}s "
+        + ", ".join(f"{name} {s['seconds']:.3f}s" for name, s in stages.items())
+    )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestion throughput benchmark")
+    parser.add_argument("--formats", nargs="+", default=FORMATS, choices=FORMATS)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10, 100, 500], help="documents per corpus")
+    parser.add_argument("--words-per-doc", type=int, default=800)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="earlier report to check for throughput regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed throughput drop (fraction)")
+    args = parser.parse_args()
+
+    from app.vectorstore import embeddings
+
+    results = [
+        bench_corpus(fmt, n_docs, args.words_per_doc, embeddings)
+        for n_docs in args.sizes
+        for fmt in args.formats
+    ]
+    report = {
+        "benchmark": "ingest",
+        "meta": run_metadata(embedding_model=getattr(embeddings, "model_name", None)),
+        "results": results,
+    }
+    finish(report, args.output, args.baseline, args.tolerance)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Intent routing benchmark: accuracy and latency on a labelled question set.
+
+Compares the legacy substring keyword checks with the rules-only
+classifier and with the full classifier (rules plus embedding fallback).
+Latency is measured uncached, per question.
+
+Usage:
+    python -m benchmarks.intent_bench --output benchmarks/results/intent.json
+    python -m benchmarks.intent_bench --no-embeddings --baseline benchmarks/results/intent.json
+"""
+import argparse
+import statistics
+import time
+from benchmarks.common import run_metadata, finish
+
+LABELLED = [
+    # chart
+    ("show me a chart of sales by month", "chart"),
+    ("plot revenue per customer", "chart"),
+    ("graph total amount by product", "chart"),
+    ("visualize monthly sales", "chart"),
+    ("can you draw a bar chart of finance types", "chart"),
+    ("pie chart of sales by finance type", "chart"),
+    ("plot daily sales for march", "chart"),
+    ("I'd like a graph of quantity sold per product", "chart"),
+    ("sales trend over time", "chart"),
+    ("visualise the weekly revenue", "chart"),
+    ("line chart of amount by month", "chart"),
+    ("histogram of purchase amounts", "chart"),
+    # aggregation
+    ("which customer spent the most", "aggregation"),
+    ("Which customer spent the most money?", "aggregation"),
+    ("what is the total amount of sales", "aggregation"),
+    ("how many purchases did Alice make", "aggregation"),
+    ("top 5 customers by revenue", "aggregation"),
+    ("average amount per product", "aggregation"),
+    ("who spent the least in january", "aggregation"),
+    ("total quantity sold in march", "aggregation"),
+    ("which product has the highest sales", "aggregation"),
+    ("number of orders per finance type", "aggregation"),
+    ("what was the maximum purchase amount", "aggregation"),
+    ("sum of sales for february", "aggregation"),
+    ("lowest revenue month", "aggregation"),
+    ("count purchases by customer", "aggregation"),
+    # rag
+    ("what is our refund policy", "rag"),
+    ("show me the onboarding document", "rag"),
+    ("explain the supplier contract terms", "rag"),
+    ("summarize the quarterly report", "rag"),
+    ("which documents mention compliance", "rag"),
+    ("tell me about the company history", "rag"),
+    ("how do I reset my password", "rag"),
+    ("according to the handbook, how many vacation days do we get", "rag"),
+    ("what does the audit report say about inventory", "rag"),
+    ("why was the shipment delayed", "rag"),
+    ("describe the training procedure for new employees", "rag"),
+    ("who is the contact person for the Acme contract", "rag"),
+    ("define gross margin as used in the report", "rag"),
+    ("show the meeting notes from last week", "rag"),
+]
+
+
+def legacy_route(query: str) -> str:
+    """The substring checks the intent engine replaced, in the old order"""
+    if any(k in query.lower() for k in ["chart", "graph", "plot", "show", "trend", "visualize"]):
+        return "chart"
+    if any(k in query.lower() for k in ["most", "total", "sum", "highest", "maximum", "max", "spent", "Which"]):
+        return "aggregation"
+    return "rag"
+
+
+def evaluate(name: str, route, repeat: int) -> dict:
+    correct = 0
+    confusion = {}
+    samples = []
+    for query, expected in LABELLED:
+        predicted = route(query)
+        correct += predicted == expected
+        confusion.setdefault(expected, {}).setdefault(predicted, 0)
+        confusion[expected][predicted] += 1
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            route(query)
+        samples.append((time.perf_counter() - start) / repeat * 1e6)
+
+    samples.sort()
+    result = {
+        "name": name,
+        "accuracy": round(correct / len(LABELLED), 4),
+        "p50_us": round(statistics.median(samples), 2),
+        "p95_us": round(samples[int(len(samples) * 0.95) - 1], 2),
+        "queries_per_sec": round(1e6 / statistics.mean(samples), 2),
+        "confusion": confusion,
+    }
+    print(f"✓ {name}: accuracy {result['accuracy']:.1%}, p50 {result['p50_us']:.1f}µs, p95 {result['p95_us']:.1f}µs")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Intent routing accuracy and latency")
+    parser.add_argument("--repeat", type=int, default=200, help="timed runs per question")
+    parser.add_argument("--no-embeddings", action="store_true", help="skip the embedding fallback variant")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="earlier report to check for throughput regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed throughput drop (fraction)")
+    args = parser.parse_args()
+
+    from app import intent
+
+    results = [
+        evaluate("legacy_keywords", legacy_route, args.repeat),
+        evaluate("rules", lambda q: intent.classify_rules(q).route, args.repeat),
+    ]
+    if not args.no_embeddings:
+        # Uncached so every ambiguous question pays for its embedding
+        results.append(evaluate("rules_with_embeddings", lambda q: intent.classify.__wrapped__(q).route, max(1, args.repeat // 20)))
+
+    report = {
+        "benchmark": "intent",
+        "meta": run_metadata(questions=len(LABELLED), min_confidence=intent.MIN_CONFIDENCE),
+        "results": results,
+    }
+    finish(report, args.output, args.baseline, args.tolerance)
+
+
+if __name__ == "__main__":
+    main()
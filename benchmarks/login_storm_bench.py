@@ -0,0 +1,161 @@
+"""
+Login storm benchmark: does the rest of the API keep its latency while
+bcrypt is saturated?
+
+Drives the FastAPI app in-process (httpx ASGI transport) against a
+scratch chat database. A steady probe requests /auth/me (a sync endpoint,
+so it needs an AnyIO threadpool thread) and /conversations, first on an
+idle server and then while many clients log in at once. The storm runs
+twice:
+  - shared: bcrypt on AnyIO's default threadpool (the previous behaviour)
+  - dedicated: bcrypt on the bounded password pool with admission control
+
+Usage:
+    python -m benchmarks.login_storm_bench --logins 400 --concurrency 200
+    python -m benchmarks.login_storm_bench --rounds 12 --output benchmarks/results/login_storm.json
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from benchmarks.common import run_metadata, finish
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmp.name, 'chat.db')}")
+os.environ.setdefault("AGGREGATE_REFRESH_SECONDS", "0")
+
+PASSWORD = "storm-password"
+
+
+def _percentiles(samples: list) -> dict:
+    if not samples:
+        return {"count": 0, "p50_ms": None, "p95_ms": None, "max_ms": None}
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "p50_ms": round(statistics.median(samples), 2),
+        "p95_ms": round(samples[max(0, int(len(samples) * 0.95) - 1)], 2),
+        "max_ms": round(samples[-1], 2),
+    }
+
+
+async def _probe(client, headers: dict, stop: asyncio.Event, interval: float) -> dict:
+    latency = {"/auth/me": [], "/conversations": []}
+    while not stop.is_set():
+        for path, samples in latency.items():
+            start = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            response.raise_for_status()
+            samples.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(interval)
+    return {path: _percentiles(samples) for path, samples in latency.items()}
+
+
+async def _storm(client, logins: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses, latency = {}, []
+
+    async def login(i):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/auth/login", json={"username": f"storm{i % 50}", "password": PASSWORD})
+            latency.append((time.perf_counter() - start) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(login(i) for i in range(logins)))
+    seconds = time.perf_counter() - start
+    return {
+        "seconds": round(seconds, 3),
+        "logins_per_sec": round(statuses.get(200, 0) / seconds, 2),
+        "statuses": statuses,
+        "latency": _percentiles(latency),
+    }
+
+
+def _use_shared_threadpool(main):
+    """Route bcrypt through AnyIO's default threadpool, as sync endpoints did"""
+    from fastapi.concurrency import run_in_threadpool
+    from app.auth import hash_password, verify_password
+
+    async def hash_shared(password):
+        return await run_in_threadpool(hash_password, password)
+
+    async def verify_shared(password, hashed):
+        return await run_in_threadpool(verify_password, password, hashed)
+
+    main.hash_password_async, main.verify_password_async = hash_shared, verify_shared
+
+
+async def run(args) -> list:
+    import httpx
+    from app import main, auth
+
+    auth.BCRYPT_ROUNDS = args.rounds
+    dedicated = (main.hash_password_async, main.verify_password_async)
+    transport = httpx.ASGITransport(app=main.app)
+    results = []
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        token = None
+        for i in range(50):
+            response = await client.post("/auth/register", json={
+                "username": f"storm{i}", "email": f"storm{i}@example.com", "password": PASSWORD
+            })
+            token = token or response.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        await client.post("/conversations", json={"title": "probe"}, headers=headers)
+
+        for name in ("idle", "shared", "dedicated"):
+            if name == "shared":
+                _use_shared_threadpool(main)
+            elif name == "dedicated":
+                main.hash_password_async, main.verify_password_async = dedicated
+
+            stop = asyncio.Event()
+            probe = asyncio.ensure_future(_probe(client, headers, stop, args.probe_interval))
+            if name == "idle":
+                await asyncio.sleep(args.idle_seconds)
+                storm = None
+            else:
+                storm = await _storm(client, args.logins, args.concurrency)
+            stop.set()
+            result = {"name": name, "probe": await probe}
+            if storm:
+                result["storm"] = storm
+            results.append(result)
+
+            me = result["probe"]["/auth/me"]
+            line = f"✓ {name}: /auth/me p95 {me['p95_ms']}ms (max {me['max_ms']}ms)"
+            if storm:
+                line += f", {storm['logins_per_sec']} logins/s, statuses {storm['statuses']}"
+            print(line)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Login storm vs. API latency")
+    parser.add_argument("--logins", type=int, default=400, help="logins per storm")
+    parser.add_argument("--concurrency", type=int, default=200, help="concurrent login clients")
+    parser.add_argument("--rounds", type=int, default=10, help="bcrypt cost for the benchmark users")
+    parser.add_argument("--idle-seconds", type=float, default=2.0, help="probe duration without a storm")
+    parser.add_argument("--probe-interval", type=float, default=0.01, help="pause between probe requests")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="earlier report to check for throughput regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed throughput drop (fraction)")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    report = {
+        "benchmark": "login_storm",
+        "meta": run_metadata(rounds=args.rounds, logins=args.logins, concurrency=args.concurrency),
+        "results": results,
+    }
+    finish(report, args.output, args.baseline, args.tolerance)
+
+
+if __name__ == "__main__":
+    main()
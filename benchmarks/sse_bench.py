@@ -0,0 +1,189 @@
+"""
+SSE streaming benchmark: server CPU per streamed token with many
+concurrent /ask/stream-style responses.
+
+Starts a small uvicorn server in a subprocess that streams synthetic
+LLM answers (one token every --token-ms per stream) and opens --streams
+concurrent SSE requests against it. The server's own CPU time (read from
+a /cpu endpoint before and after) is divided by the tokens delivered.
+Modes:
+  - legacy:    one json.dumps frame and one write per token (previous
+               event_generator; tokens paced on the event loop)
+  - per_token: the streaming layer with coalescing off (SSE_COALESCE_MS=0,
+               the default)
+  - coalesced: the streaming layer with a --coalesce-ms window and orjson
+Like /ask/stream, the layer modes read an async token source, so no
+thread is started per stream.
+
+Usage:
+    python -m benchmarks.sse_bench --streams 500 --tokens 200 --token-ms 5
+    python -m benchmarks.sse_bench --output benchmarks/results/sse.json
+"""
+import argparse
+import asyncio
+import json
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from benchmarks.common import run_metadata, finish
+
+
+async def _tokens_async(count: int, token_ms: float):
+    for i in range(count):
+        await asyncio.sleep(token_ms / 1000)
+        yield {"type": "token", "content": f"w{i} "}
+    yield {"type": "end", "content": None}
+
+
+def build_app():
+    from fastapi import FastAPI
+    from fastapi.responses import StreamingResponse
+    from app.streaming import coalesced_frames, frame
+
+    app = FastAPI()
+
+    @app.get("/cpu")
+    def cpu():
+        return {"cpu_seconds": time.process_time()}
+
+    @app.get("/stream/legacy")
+    async def legacy(tokens: int, token_ms: float):
+        async def generate():
+            yield f"data: {json.dumps({'type': 'start', 'mode': 'rag'})}\n\n"
+            async for item in _tokens_async(tokens, token_ms):
+                yield f"data: {json.dumps(item)}\n\n"
+        return StreamingResponse(generate(), media_type="text/event-stream")
+
+    @app.get("/stream/layer")
+    async def layer(tokens: int, token_ms: float, coalesce_ms: float):
+        async def generate():
+            yield frame({"type": "start", "mode": "rag"})
+            async for chunk in coalesced_frames(_tokens_async(tokens, token_ms), interval_ms=coalesce_ms):
+                yield chunk
+        return StreamingResponse(generate(), media_type="text/event-stream")
+
+    return app
+
+
+def serve(port: int):
+    import uvicorn
+
+    uvicorn.run(build_app(), host="127.0.0.1", port=port, log_level="warning", backlog=4096, timeout_keep_alive=300)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _wait_ready(client, base: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            (await client.get(f"{base}/cpu")).raise_for_status()
+            return
+        except Exception:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+async def _run_mode(client, base: str, name: str, path: str, params: dict, streams: int, tokens: int) -> dict:
+    cpu_before = (await client.get(f"{base}/cpu")).json()["cpu_seconds"]
+    reads, gaps, complete = [], [], 0
+
+    async def one():
+        nonlocal complete
+        count, body, last = 0, [], None
+        async with client.stream("GET", f"{base}{path}", params=params) as response:
+            async for chunk in response.aiter_raw():
+                now = time.perf_counter()
+                if last is not None:
+                    gaps.append((now - last) * 1000)
+                last = now
+                count += 1
+                body.append(chunk)
+        reads.append(count)
+        text = b"".join(body).decode()
+        if '"end"' in text and len(re.findall(r"w\d+ ", text)) == tokens:
+            complete += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(streams)))
+    seconds = time.perf_counter() - start
+    cpu = (await client.get(f"{base}/cpu")).json()["cpu_seconds"] - cpu_before
+
+    delivered = streams * tokens
+    result = {
+        "name": name,
+        "seconds": round(seconds, 3),
+        "server_cpu_seconds": round(cpu, 3),
+        "cpu_us_per_token": round(cpu / delivered * 1e6, 2),
+        "tokens_per_cpu_sec": round(delivered / cpu, 1) if cpu else None,
+        "complete_streams": complete,
+        "reads_per_stream": round(statistics.mean(reads), 1),
+        "p50_gap_ms": round(statistics.median(gaps), 2) if gaps else None,
+    }
+    print(f"✓ {name}: {result['cpu_us_per_token']}µs CPU/token, "
+          f"{result['reads_per_stream']} reads/stream, {complete}/{streams} complete")
+    return result
+
+
+async def run(args) -> list:
+    import httpx
+
+    port = _free_port()
+    server = subprocess.Popen([sys.executable, "-m", "benchmarks.sse_bench", "--serve", str(port)])
+    base = f"http://127.0.0.1:{port}"
+    limits = httpx.Limits(max_connections=args.streams + 10, max_keepalive_connections=args.streams + 10)
+    try:
+        async with httpx.AsyncClient(limits=limits, timeout=300) as client:
+            await _wait_ready(client, base)
+            shared = {"tokens": args.tokens, "token_ms": args.token_ms}
+            modes = [
+                ("legacy", "/stream/legacy", shared),
+                ("per_token", "/stream/layer", {**shared, "coalesce_ms": 0}),
+                ("coalesced", "/stream/layer", {**shared, "coalesce_ms": args.coalesce_ms}),
+            ]
+            return [
+                await _run_mode(client, base, name, path, params, args.streams, args.tokens)
+                for name, path, params in modes
+            ]
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Server CPU per streamed SSE token")
+    parser.add_argument("--streams", type=int, default=500, help="concurrent SSE responses")
+    parser.add_argument("--tokens", type=int, default=200, help="tokens per response")
+    parser.add_argument("--token-ms", type=float, default=5, help="delay between tokens of one response")
+    parser.add_argument("--coalesce-ms", type=float, default=20, help="coalescing window for the coalesced mode")
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="earlier report to check for throughput regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed throughput drop (fraction)")
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve)
+        return
+
+    results = asyncio.run(run(args))
+    report = {
+        "benchmark": "sse",
+        "meta": run_metadata(
+            streams=args.streams, tokens=args.tokens, token_ms=args.token_ms, coalesce_ms=args.coalesce_ms
+        ),
+        "results": results,
+    }
+    finish(report, args.output, args.baseline, args.tolerance)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""Shared SQLite stand-in for the MySQL business_data table, used by the tests"""
+import sqlite3
+from sqlalchemy import create_engine
+
+ROWS = [
+    (1, "Alice", "credit", "Laptop", 1200.0, "January", 1),
+    (2, "Bob", "cash", "Phone", 800.0, "January", 2),
+    (3, "Alice", "credit", "Monitor", 300.0, "February", 1),
+    (4, "Carol", "loan", "Desk", 450.0, "March", 3),
+    (5, "Bob", "cash", "Chair", 150.0, "March", 4),
+]
+
+
+def make_engine(path):
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE business_data (
+            id INTEGER PRIMARY KEY,
+            customer_name TEXT, finance_type TEXT, product TEXT,
+            amount REAL, month TEXT, quantity INTEGER
+        )
+    """)
+    conn.executemany("INSERT INTO business_data VALUES (?, ?, ?, ?, ?, ?, ?)", ROWS)
+    conn.commit()
+    conn.close()
+    return create_engine(f"sqlite:///{path}")
@@ -31,7 +31,7 @@ try:
     print("\nChecking BM25 retriever...")
     retriever = get_bm25_retriever()
     if retriever:
-        print(f"BM25 retriever initialized successfully with {len(retriever.docs)} docs.")
+        print(f"BM25 retriever initialized successfully with {len(retriever.index)} docs.")
     else:
         print("BM25 retriever failed to initialize (expected if no valid docs).")
 
@@ -22,6 +22,8 @@ import {
   getConversations,
   createConversation,
   getConversation,
+  getOlderMessages,
+  getMessageMetadata,
   deleteConversation,
 } from "./api";
 
@@ -35,8 +37,12 @@ function App() {
 
   // Conversation state
   const [conversations, setConversations] = useState([]);
+  const [conversationsCursor, setConversationsCursor] = useState(null);
+  const [loadingConversations, setLoadingConversations] = useState(false);
   const [currentConversation, setCurrentConversation] = useState(null);
   const [messages, setMessages] = useState([]);
+  const [olderCursor, setOlderCursor] = useState(null);
+  const [loadingOlder, setLoadingOlder] = useState(false);
 
   // UI state
   const [query, setQuery] = useState("");
@@ -49,6 +55,8 @@ function App() {
   const messagesContainerRef = useRef(null);
   const fileInputRef = useRef(null);
   const textareaRef = useRef(null);
+  // Set before a messages update that must not jump to the bottom
+  const scrollRestoreRef = useRef(null);
 
   // ======================
   // AUTH HANDLERS
@@ -64,16 +72,19 @@ function App() {
     setAuthenticated(false);
     setCurrentUser(null);
     setConversations([]);
+    setConversationsCursor(null);
     setCurrentConversation(null);
     setMessages([]);
+    setOlderCursor(null);
   };
 
   // ======================
   // LOAD CONVERSATIONS
   // ======================
   const loadConversations = async () => {
-    const convs = await getConversations();
+    const { conversations: convs, nextCursor } = await getConversations();
     setConversations(convs);
+    setConversationsCursor(nextCursor);
 
     // Auto-select most recent or create new
     if (convs.length > 0 && !currentConversation) {
@@ -83,6 +94,20 @@ function App() {
     }
   };
 
+  const loadMoreConversations = async () => {
+    if (!conversationsCursor || loadingConversations) return;
+    setLoadingConversations(true);
+    const { conversations: page, nextCursor } = await getConversations(conversationsCursor);
+    setLoadingConversations(false);
+
+    // A conversation created meanwhile can shift the pages; skip repeats
+    setConversations((prev) => {
+      const seen = new Set(prev.map((c) => c.id));
+      return [...prev, ...page.filter((c) => !seen.has(c.id))];
+    });
+    setConversationsCursor(nextCursor);
+  };
+
   // ======================
   // CONVERSATION HANDLERS
   // ======================
@@ -92,45 +117,86 @@ function App() {
       setConversations((prev) => [newConv, ...prev]);
       setCurrentConversation(newConv);
       setMessages([]);
+      setOlderCursor(null);
+    }
+  };
+
+  // Large chart/source payloads are not inlined (metadata_size > 0 without
+  // metadata); they are fetched by loadMessageMetadata when expanded.
+  const transformMessage = (msg) => {
+    if (msg.role === "user") {
+      return { type: "user", id: msg.id, content: msg.content };
+    }
+
+    let metadata = null;
+    try {
+      metadata = msg.metadata && typeof msg.metadata === 'string' ? JSON.parse(msg.metadata) : msg.metadata;
+    } catch (e) {
+      console.error("Failed to parse metadata:", e);
     }
+
+    return {
+      type: "assistant",
+      id: msg.id,
+      mode: msg.mode,
+      answer: msg.content,
+      chart: msg.mode === "chart" ? metadata : null,
+      sources: msg.mode === "aggregation" ? metadata : [],
+      metadataPending: !msg.metadata && msg.metadata_size > 0,
+      success: true,
+    };
   };
 
   const loadConversation = async (conversationId) => {
     const conv = await getConversation(conversationId);
     if (conv) {
       setCurrentConversation(conv);
-      console.log("Loaded conversation:", conv); // DEBUG
-      console.log("Raw messages:", conv.messages); // DEBUG
+      setMessages(conv.messages.map(transformMessage));
+      setOlderCursor(conv.nextCursor);
+    }
+  };
 
-      // Transform messages
-      const transformedMessages = conv.messages.map((msg) => {
-        if (msg.role === "user") {
-          return { type: "user", content: msg.content };
-        } else {
-          let metadata = null;
-          try {
-            if (msg.metadata && typeof msg.metadata === 'string') {
-              metadata = JSON.parse(msg.metadata);
-            } else {
-              metadata = msg.metadata;
-            }
-          } catch (e) {
-            console.error("Failed to parse metadata:", e);
-          }
-
-          return {
-            type: "assistant",
-            mode: msg.mode,
-            answer: msg.content,
-            chart: msg.mode === "chart" ? metadata : null,
-            sources: msg.mode === "aggregation" ? metadata : [],
-            success: true,
-          };
-        }
-      });
+  const loadOlderMessages = async () => {
+    if (!currentConversation || !olderCursor || loadingOlder) return;
+    setLoadingOlder(true);
+    const page = await getOlderMessages(currentConversation.id, olderCursor);
+    setLoadingOlder(false);
+    if (!page) return;
 
-      setMessages(transformedMessages);
-    }
+    // Keep the viewport on the messages that were already there
+    const el = messagesContainerRef.current;
+    const fromBottom = el ? el.scrollHeight - el.scrollTop : 0;
+    scrollRestoreRef.current = (container) => {
+      container.scrollTop = container.scrollHeight - fromBottom;
+    };
+    setMessages((prev) => [...page.messages.map(transformMessage), ...prev]);
+    setOlderCursor(page.nextCursor);
+  };
+
+  const loadMessageMetadata = async (messageId) => {
+    const conversationId = currentConversation?.id;
+    // Expanding a message mid-history should not scroll to the bottom
+    const top = messagesContainerRef.current?.scrollTop;
+    const keepScroll = (container) => {
+      container.scrollTop = top;
+    };
+
+    scrollRestoreRef.current = keepScroll;
+    setMessages((prev) => prev.map((m) => (m.id === messageId ? { ...m, metadataLoading: true } : m)));
+    const metadata = conversationId ? await getMessageMetadata(conversationId, messageId) : null;
+
+    scrollRestoreRef.current = keepScroll;
+    setMessages((prev) => prev.map((m) => {
+      if (m.id !== messageId) return m;
+      if (!metadata) return { ...m, metadataLoading: false };
+      return {
+        ...m,
+        chart: m.mode === "chart" ? metadata : m.chart,
+        sources: m.mode === "aggregation" ? metadata : m.sources,
+        metadataPending: false,
+        metadataLoading: false,
+      };
+    }));
   };
 
   const handleDeleteConversation = async (conversationId, e) => {
@@ -209,8 +275,14 @@ function App() {
   useEffect(() => {
     const el = messagesContainerRef.current;
     if (!el) return;
+    const restore = scrollRestoreRef.current;
+    scrollRestoreRef.current = null;
     setTimeout(() => {
-      el.scrollTop = el.scrollHeight;
+      if (restore) {
+        restore(el);
+      } else {
+        el.scrollTop = el.scrollHeight;
+      }
     }, 0);
   }, [messages, loading]);
 
@@ -372,6 +444,20 @@ function App() {
       );
     }
 
+    if (msg.mode === "chart" && msg.metadataPending) {
+      return (
+        <div className="chart-box">
+          <button
+            className="load-more-btn"
+            onClick={() => loadMessageMetadata(msg.id)}
+            disabled={msg.metadataLoading}
+          >
+            {msg.metadataLoading ? "Loading chart..." : "Show chart"}
+          </button>
+        </div>
+      );
+    }
+
     if (msg.mode === "chart") {
       const chartData =
         msg.chart?.labels?.length && msg.chart?.datasets?.[0]?.data
@@ -433,6 +519,16 @@ function App() {
         </ReactMarkdown>
         {msg.streaming && <span className="cursor-blink"></span>}
 
+        {msg.metadataPending && (
+          <button
+            className="load-more-btn"
+            onClick={() => loadMessageMetadata(msg.id)}
+            disabled={msg.metadataLoading}
+          >
+            {msg.metadataLoading ? "Loading details..." : "Show details"}
+          </button>
+        )}
+
         {msg.sources?.length > 0 && (
           <div className="sources">
             <strong>Sources:</strong>
@@ -551,6 +647,16 @@ function App() {
                   </div>
                 ))
               )}
+
+              {conversationsCursor && (
+                <button
+                  className="load-more-btn"
+                  onClick={loadMoreConversations}
+                  disabled={loadingConversations}
+                >
+                  {loadingConversations ? "Loading..." : "Load more"}
+                </button>
+              )}
             </div>
 
             {/* Admin Controls */}
@@ -644,8 +750,14 @@ function App() {
             </div>
           )}
 
+          {olderCursor && (
+            <button className="load-more-btn" onClick={loadOlderMessages} disabled={loadingOlder}>
+              {loadingOlder ? "Loading..." : "Load older messages"}
+            </button>
+          )}
+
           {messages.map((msg, idx) => (
-            <div key={idx} className={`message-row ${msg.type}`}>
+            <div key={msg.id ?? `local-${idx}`} className={`message-row ${msg.type}`}>
               {/* Avatar */}
               <div className="message-avatar">
                 {msg.type === "user" ? (
@@ -76,17 +76,21 @@ export const isAuthenticated = () => {
 
 // ==================== CONVERSATION API ====================
 
-export const getConversations = async () => {
+// One page, newest first; nextCursor (from X-Next-Cursor) fetches the next one
+export const getConversations = async (cursor = null) => {
   try {
-    const response = await fetch(`${API_BASE_URL}/conversations`, {
+    const url = cursor
+      ? `${API_BASE_URL}/conversations?cursor=${encodeURIComponent(cursor)}`
+      : `${API_BASE_URL}/conversations`;
+    const response = await fetch(url, {
       headers: authHeaders(),
     });
 
     if (!response.ok) throw new Error('Failed to fetch conversations');
-    return await response.json();
+    return { conversations: await response.json(), nextCursor: response.headers.get('X-Next-Cursor') };
   } catch (err) {
     console.error('Error fetching conversations:', err);
-    return [];
+    return { conversations: [], nextCursor: null };
   }
 };
 
@@ -117,13 +121,47 @@ export const getConversation = async (conversationId) => {
     );
 
     if (!response.ok) throw new Error('Failed to fetch conversation');
-    return await response.json();
+    const data = await response.json();
+    // Set when older messages exist; pass it to getOlderMessages as `before`
+    return { ...data, nextCursor: response.headers.get('X-Next-Cursor') };
   } catch (err) {
     console.error('Error fetching conversation:', err);
     return null;
   }
 };
 
+export const getOlderMessages = async (conversationId, before) => {
+  try {
+    const response = await fetch(
+      `${API_BASE_URL}/conversations/${conversationId}/messages?before=${encodeURIComponent(before)}`,
+      { headers: authHeaders() }
+    );
+
+    if (!response.ok) throw new Error('Failed to fetch messages');
+    const messages = await response.json();
+    // The endpoint pages newest first; the chat shows oldest first
+    return { messages: messages.reverse(), nextCursor: response.headers.get('X-Next-Cursor') };
+  } catch (err) {
+    console.error('Error fetching messages:', err);
+    return null;
+  }
+};
+
+export const getMessageMetadata = async (conversationId, messageId) => {
+  try {
+    const response = await fetch(
+      `${API_BASE_URL}/conversations/${conversationId}/messages/${messageId}/metadata`,
+      { headers: authHeaders() }
+    );
+
+    if (!response.ok) throw new Error('Failed to fetch message metadata');
+    return await response.json();
+  } catch (err) {
+    console.error('Error fetching message metadata:', err);
+    return null;
+  }
+};
+
 export const deleteConversation = async (conversationId) => {
   try {
     const response = await fetch(
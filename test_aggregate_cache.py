@@ -0,0 +1,111 @@
+import os
+import sqlite3
+import tempfile
+from app import aggregate_cache
+from business_fixture import make_engine
+
+
+def _move_row(path: str, row_id: int, month: str, customer: str, **columns):
+    conn = sqlite3.connect(path)
+    assignments = ", ".join(f"{name} = ?" for name in ["month", "customer_name", *columns])
+    conn.execute(f"UPDATE business_data SET {assignments} WHERE id = ?", [month, customer, *columns.values(), row_id])
+    conn.commit()
+    conn.close()
+
+
+def test_moved_row_refreshes_old_and_new_groups():
+    saved = aggregate_cache.CACHE_PATH, aggregate_cache._state
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "business.db")
+        engine = make_engine(path)
+        aggregate_cache.CACHE_PATH = os.path.join(tmp, "aggregate_cache.json")
+        aggregate_cache._state = None
+        try:
+            aggregate_cache.full_refresh(engine)
+
+            # Carol's only row moves from March to April and to Dave
+            _move_row(path, 4, "April", "Dave")
+            aggregate_cache.refresh_groups(engine, {"March", "April"}, {"Carol", "Dave"})
+            state = aggregate_cache.get(engine)
+            assert state["sales_by_month"]["March"] == 150.0 and state["sales_by_month"]["April"] == 450.0
+            assert "Carol" not in state["sales_by_customer"] and state["sales_by_customer"]["Dave"] == 450.0
+
+            expected = {name: aggregate_cache._query(engine, name) for name in aggregate_cache.AGGREGATES}
+            assert {name: state[name] for name in aggregate_cache.AGGREGATES} == expected
+        finally:
+            aggregate_cache.CACHE_PATH, aggregate_cache._state = saved
+            engine.dispose()
+    print("PASS: groups a row left are recomputed, and emptied groups dropped")
+
+
+def test_ingest_refreshes_groups_a_changed_row_left():
+    from app import sql_ingest
+    from vectorstore_fixture import temp_store
+
+    saved = (aggregate_cache.CACHE_PATH, aggregate_cache._state, aggregate_cache.full_refresh,
+             sql_ingest.STATE_PATH, sql_ingest.WATERMARK_COLUMN)
+    full_refreshes = []
+
+    def counting_full_refresh(engine):
+        full_refreshes.append(engine)
+        return saved[2](engine)
+
+    with temp_store() as tmp:
+        path = os.path.join(tmp, "business.db")
+        engine = make_engine(path)
+        conn = sqlite3.connect(path)
+        conn.execute("ALTER TABLE business_data ADD COLUMN updated_at INTEGER")
+        conn.execute("UPDATE business_data SET updated_at = id")
+        conn.commit()
+        conn.close()
+        aggregate_cache.CACHE_PATH = os.path.join(tmp, "aggregate_cache.json")
+        aggregate_cache._state = None
+        aggregate_cache.full_refresh = counting_full_refresh
+        sql_ingest.STATE_PATH = os.path.join(tmp, "sql_ingest_state.json")
+        sql_ingest.WATERMARK_COLUMN = "updated_at"
+        try:
+            assert sql_ingest.ingest_business_data(engine) == 5
+            assert len(full_refreshes) == 1  # no cache yet
+
+            _move_row(path, 4, "April", "Dave", updated_at=6)
+            assert sql_ingest.ingest_business_data(engine) == 2  # rows 5 and 4
+            assert len(full_refreshes) == 1
+            state = aggregate_cache.get(engine)
+            assert "Carol" not in state["sales_by_customer"] and state["sales_by_month"]["March"] == 150.0
+            assert state["sales_by_month"]["April"] == 450.0
+        finally:
+            (aggregate_cache.CACHE_PATH, aggregate_cache._state, aggregate_cache.full_refresh,
+             sql_ingest.STATE_PATH, sql_ingest.WATERMARK_COLUMN) = saved
+            engine.dispose()
+    print("PASS: an ingested update refreshes the groups the row moved out of")
+
+
+def test_reloads_when_another_worker_refreshes():
+    saved = aggregate_cache.CACHE_PATH, aggregate_cache._state, aggregate_cache._stamp
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "business.db")
+        engine = make_engine(path)
+        aggregate_cache.CACHE_PATH = os.path.join(tmp, "aggregate_cache.json")
+        aggregate_cache._state = None
+        try:
+            stale = aggregate_cache.full_refresh(engine)
+            stamp = aggregate_cache._stamp
+
+            # Another worker ingests and rewrites the file; this one still holds the old state
+            _move_row(path, 4, "April", "Dave")
+            aggregate_cache.refresh_groups(engine, {"March", "April"}, {"Carol", "Dave"})
+            aggregate_cache._state, aggregate_cache._stamp = stale, stamp
+
+            state = aggregate_cache.get(engine)
+            assert state is not stale and state["sales_by_month"]["April"] == 450.0
+            assert aggregate_cache.get(engine) is state  # unchanged file: no reload
+        finally:
+            aggregate_cache.CACHE_PATH, aggregate_cache._state, aggregate_cache._stamp = saved
+            engine.dispose()
+    print("PASS: a cache file rewritten by another worker is reloaded on the next read")
+
+
+if __name__ == "__main__":
+    test_moved_row_refreshes_old_and_new_groups()
+    test_ingest_refreshes_groups_a_changed_row_left()
+    test_reloads_when_another_worker_refreshes()
@@ -0,0 +1,77 @@
+import os
+import tempfile
+from app import business_db, analytics_snapshot, aggregate_cache
+from app.aggregations import AggregationSpec, parse_query, run_aggregation, to_answer
+from app.router import handle_aggregation_query, handle_chart_query, spec_chart, SALES_BY_MONTH
+from business_fixture import make_engine
+
+CASES = [
+    ("top 3 products by quantity", AggregationSpec("product", field="quantity", top_n=3)),
+    ("which customer spent the least?", AggregationSpec("customer", top_n=1, descending=False)),
+    ("average amount per finance type", AggregationSpec("finance_type", metric="avg")),
+    ("how many sales per month", AggregationSpec("month", metric="count")),
+    ("total sales by product in january and in may",
+     AggregationSpec("product", filters=(("month", ("January", "May")),))),
+    ("what products may we discontinue", None),
+    ("show me the onboarding document", None),
+]
+
+
+def test_parse_query():
+    for query, expected in CASES:
+        assert parse_query(query) == expected, query
+    # Chart requests only need a dimension
+    assert parse_query("chart by customer", require_measure=False) == AggregationSpec("customer")
+    print("PASS: questions map onto aggregation specs")
+
+
+def test_answers_keep_large_totals_exact():
+    answer = to_answer(AggregationSpec("customer", top_n=1), [("Alice", 1234567.89)])["answer"]
+    assert answer == "Alice has the highest total amount: 1,234,567.89."
+    answer = to_answer(AggregationSpec("product", field="quantity"), [("Laptop", 2500000.0), ("Phone", 12.0)])["answer"]
+    assert answer == "Total quantity by product (product: value): Laptop: 2,500,000, Phone: 12."
+    print("PASS: totals of a million and more are written out in full")
+
+
+def test_router_answers_from_sql():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "business.db")
+        make_engine(path).dispose()
+        business_db.configure(f"sqlite:///{path}")
+        mode, analytics_snapshot.ANALYTICS_MODE = analytics_snapshot.ANALYTICS_MODE, "sql"
+        try:
+            assert run_aggregation(parse_query("top 2 products by quantity")) == [("Chair", 4.0), ("Desk", 3.0)]
+
+            result = handle_aggregation_query("which customer spent the least?")
+            assert result["answer"] == "Carol has the lowest total amount: 450.00."
+            assert result["sources"][0]["aggregation"] == "SUM(amount) GROUP BY customer_name LIMIT 1"
+
+            # Nothing to group by: no canned answer, the caller falls back to RAG
+            assert handle_aggregation_query("total sales") is None
+
+            result = handle_aggregation_query("how many purchases per customer in march")
+            assert "Bob: 1" in result["answer"] and "Carol: 1" in result["answer"] and "Alice" not in result["answer"]
+
+            # The cached monthly chart and the SQL one agree, in calendar order
+            cache = aggregate_cache.CACHE_PATH, aggregate_cache._state
+            aggregate_cache.CACHE_PATH, aggregate_cache._state = os.path.join(tmp, "aggregate_cache.json"), None
+            try:
+                chart = handle_chart_query("chart sales by month")
+            finally:
+                aggregate_cache.CACHE_PATH, aggregate_cache._state = cache
+            assert chart["labels"] == ["January", "February", "March"] and chart["datasets"][0]["data"] == [2000.0, 300.0, 600.0]
+            assert spec_chart(SALES_BY_MONTH)["labels"] == chart["labels"]
+
+            chart = handle_chart_query("chart average amount by finance type")
+            assert chart["labels"] == ["credit", "cash", "loan"] and chart["datasets"][0]["data"] == [750.0, 475.0, 450.0]
+            assert chart["datasets"][0]["label"] == "Average amount by finance type"
+        finally:
+            analytics_snapshot.ANALYTICS_MODE = mode
+            business_db.reset()
+    print("PASS: parsed questions are answered and charted from SQL")
+
+
+if __name__ == "__main__":
+    test_parse_query()
+    test_answers_keep_large_totals_exact()
+    test_router_answers_from_sql()
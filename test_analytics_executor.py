@@ -0,0 +1,102 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from sqlalchemy import text
+from app import analytics_executor, business_db
+from app.analytics_executor import run_analytics, executor_metrics, AnalyticsBusy, AnalyticsTimeout, ClientDisconnected
+from business_fixture import make_engine
+
+# Counts to a billion: runs for minutes unless interrupted
+SLOW_QUERY = text("WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 1000000000) SELECT count(*) FROM n")
+
+
+def _slow_query():
+    with business_db.get_engine().connect() as conn:
+        return conn.execute(SLOW_QUERY).scalar()
+
+
+def _wait_idle(seconds: float = 5):
+    deadline = time.monotonic() + seconds
+    while executor_metrics()["in_flight"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return executor_metrics()["in_flight"] == 0
+
+
+class DisconnectedRequest:
+    async def is_disconnected(self):
+        return True
+
+
+def test_timeout_interrupts_running_query():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "business.db")
+        make_engine(path).dispose()
+        business_db.configure(f"sqlite:///{path}")
+        try:
+            before = executor_metrics()
+            started = time.monotonic()
+            try:
+                asyncio.run(run_analytics(_slow_query, timeout=0.2))
+                assert False, "expected a timeout"
+            except AnalyticsTimeout:
+                pass
+            assert time.monotonic() - started < 2
+
+            # The worker's query was interrupted, so the thread is free again
+            assert _wait_idle()
+            after = executor_metrics()
+            assert after["timeouts"] == before["timeouts"] + 1 and after["failed"] == before["failed"] + 1
+        finally:
+            business_db.reset()
+    print("PASS: a timed-out query is interrupted and frees its worker")
+
+
+def test_disconnect_cancels_queued_job_and_full_queue_rejects():
+    release = threading.Event()
+    ran = []
+
+    async def scenario():
+        # Occupy every worker so the next job has to queue
+        blockers = [
+            asyncio.ensure_future(run_analytics(release.wait, timeout=30))
+            for _ in range(analytics_executor.WORKERS)
+        ]
+        await asyncio.sleep(0.05)
+
+        max_queue, analytics_executor.MAX_QUEUE = analytics_executor.MAX_QUEUE, 1
+        try:
+            poll, analytics_executor.DISCONNECT_POLL_SECONDS = analytics_executor.DISCONNECT_POLL_SECONDS, 0.01
+            queued = asyncio.ensure_future(run_analytics(ran.append, "queued", request=DisconnectedRequest(), timeout=30))
+            await asyncio.sleep(0)
+            try:
+                await run_analytics(ran.append, "rejected")
+                assert False, "expected the full queue to reject the job"
+            except AnalyticsBusy:
+                pass
+
+            try:
+                await queued
+                assert False, "expected the disconnect to cancel the job"
+            except ClientDisconnected:
+                pass
+        finally:
+            analytics_executor.MAX_QUEUE = max_queue
+            analytics_executor.DISCONNECT_POLL_SECONDS = poll
+            release.set()
+        assert await asyncio.gather(*blockers) == [True] * len(blockers)
+
+    before = executor_metrics()
+    asyncio.run(scenario())
+    assert _wait_idle()
+    time.sleep(0.05)
+    after = executor_metrics()
+    assert ran == []  # neither the cancelled nor the rejected job ever ran
+    assert after["disconnects"] == before["disconnects"] + 1 and after["rejected"] == before["rejected"] + 1
+    print("PASS: a disconnected client's queued job never runs; a full queue rejects new jobs")
+
+
+if __name__ == "__main__":
+    test_timeout_interrupts_running_query()
+    test_disconnect_cancels_queued_job_and_full_queue_rejects()
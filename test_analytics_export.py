@@ -0,0 +1,80 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+from app import analytics_export
+from app.analytics_export import iter_partitions, export_rows, ExportBusy
+from app.streaming import LimitedStreamingResponse
+from business_fixture import make_engine
+
+
+def test_streams_in_partitions():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(os.path.join(tmp, "business.db"))
+        partitions = list(iter_partitions(engine=engine, batch_size=2))
+        assert [len(p) for p in partitions] == [2, 2, 1]
+
+        partitions = list(iter_partitions((("customer", ("Bob",)),), engine=engine, batch_size=2))
+        assert [row[0] for p in partitions for row in p] == [2, 5]
+        engine.dispose()
+    print("PASS: rows come off the cursor in fixed-size partitions")
+
+
+def test_ndjson_and_csv():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(os.path.join(tmp, "business.db"))
+        lines = "".join(export_rows("ndjson", (("month", ("March",)),), engine=engine)).splitlines()
+        assert [json.loads(line)["product"] for line in lines] == ["Desk", "Chair"]
+
+        text = "".join(export_rows("csv", limit=2, engine=engine))
+        assert text.splitlines() == [
+            "id,customer_name,finance_type,product,amount,month,quantity",
+            "1,Alice,credit,Laptop,1200.00,January,1",
+            "2,Bob,cash,Phone,800.00,January,2",
+        ]
+        assert "".join(export_rows("csv", (("customer", ("Nobody",)),), engine=engine)).count("\n") == 1
+        engine.dispose()
+    print("PASS: NDJSON and CSV encodings, filters and limit")
+
+
+def test_export_slots_and_time_limit():
+    for _ in range(analytics_export.EXPORT_MAX_CONCURRENT):
+        analytics_export.acquire_slot()
+    try:
+        analytics_export.acquire_slot()
+        assert False, "expected ExportBusy"
+    except ExportBusy:
+        pass
+    for _ in range(analytics_export.EXPORT_MAX_CONCURRENT):
+        analytics_export.release_slot()
+
+    closed, released, sent = [], [], []
+
+    def endless():
+        try:
+            while True:
+                time.sleep(0.01)
+                yield "row\n"
+        finally:
+            closed.append(True)
+
+    async def receive():
+        await asyncio.sleep(60)  # a client that never disconnects
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    response = LimitedStreamingResponse(endless(), timeout=0.3, on_close=lambda: released.append(True))
+    start = time.perf_counter()
+    asyncio.run(response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send))
+    assert time.perf_counter() - start < 2
+    assert released == [True] and closed == [True] and len(sent) > 1
+    print("PASS: exports are capped and a slow export is cut off and cleaned up")
+
+
+if __name__ == "__main__":
+    test_streams_in_partitions()
+    test_ndjson_and_csv()
+    test_export_slots_and_time_limit()
@@ -0,0 +1,86 @@
+import asyncio
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.database import Base, User, build_async_engine
+from app.auth import get_current_user, create_access_token, invalidate_user, user_cache_metrics, password_changed_epoch
+
+
+async def make_session():
+    engine = build_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    db = async_sessionmaker(engine, expire_on_commit=False)()
+    db.add(User(id=1, username="alice", email="alice@example.com", hashed_password="x", role="user"))
+    await db.commit()
+    return engine, db
+
+
+def _bearer(token: str) -> HTTPAuthorizationCredentials:
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+def test_cache_hits_skip_the_database():
+    async def run():
+        engine, db = await make_session()
+        statements = []
+        event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        token = create_access_token({"sub": "alice"})
+
+        first = await get_current_user(_bearer(token), db)
+        hits = user_cache_metrics()["hits"]
+        second = await get_current_user(_bearer(token), db)
+        assert first == second and first.role == "user"
+        assert len(statements) == 1 and user_cache_metrics()["hits"] == hits + 1
+
+        user = await db.get(User, 1)
+        user.role = "admin"
+        await db.commit()
+        assert (await get_current_user(_bearer(token), db)).role == "user"
+        invalidate_user(1)
+        assert (await get_current_user(_bearer(token), db)).role == "admin"
+        await db.close()
+        await engine.dispose()
+
+    asyncio.run(run())
+    print("PASS: repeated tokens are served from the cache until invalidated")
+
+
+def test_password_change_revokes_older_tokens():
+    async def run():
+        engine, db = await make_session()
+        token = create_access_token({"sub": "alice"})
+        await get_current_user(_bearer(token), db)
+
+        user = await db.get(User, 1)
+        user.password_changed_at = (datetime.utcnow() + timedelta(seconds=5)).replace(microsecond=0)
+        await db.commit()
+        invalidate_user(1)
+        try:
+            await get_current_user(_bearer(token), db)
+            assert False, "token issued before the password change was accepted"
+        except HTTPException as e:
+            assert e.status_code == 401
+
+        # Same second as the change: rejected; the token change_password issues: accepted
+        changed_at = password_changed_epoch(user)
+        same_second = create_access_token({"sub": "alice"}, issued_at=changed_at)
+        try:
+            await get_current_user(_bearer(same_second), db)
+            assert False, "token from the second of the password change was accepted"
+        except HTTPException as e:
+            assert e.status_code == 401
+        fresh = create_access_token({"sub": "alice"}, issued_at=changed_at + 1)
+        assert (await get_current_user(_bearer(fresh), db)).username == "alice"
+        await db.close()
+        await engine.dispose()
+
+    asyncio.run(run())
+    print("PASS: tokens issued before (or in the second of) a password change are rejected")
+
+
+if __name__ == "__main__":
+    test_cache_hits_skip_the_database()
+    test_password_change_revokes_older_tokens()
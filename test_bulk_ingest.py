@@ -0,0 +1,58 @@
+import os
+from app import bulk_ingest, vectorstore, source_registry
+from vectorstore_fixture import temp_store
+
+
+def _write(path: str, text: str):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_manifest_ingest_resumes_and_replaces():
+    with temp_store() as tmp:
+        a, b, missing = (os.path.join(tmp, name) for name in ("a.txt", "b.md", "missing.txt"))
+        _write(a, "travel policy covers flights and hotels for approved business trips")
+        _write(b, "# Laptops\nengineering laptops are refreshed every three years")
+        manifest = os.path.join(tmp, "files.txt")
+        _write(manifest, f"# corpus\n{a}\n\n{b}\n{missing}\n")
+        state = os.path.join(tmp, "done.txt")
+
+        paths = list(bulk_ingest.iter_manifest(manifest))
+        assert paths == [a, b, missing]
+
+        stats = bulk_ingest.bulk_ingest(paths, workers=2, batch_size=1, state_path=state)
+        assert (stats["docs"], stats["chunks"], stats["failed"], stats["batches"]) == (2, 2, 1, 2)
+        assert bulk_ingest.load_done(state) == {a, b}
+        assert set(source_registry.sources) == {f"file:{a}", f"file:{b}"}
+        assert vectorstore.get_vectorstore().index.ntotal == 2
+        assert os.path.exists(os.path.join(vectorstore.VECTOR_DIR, "index.faiss"))
+
+        # A re-run skips completed files and retries only the failed one
+        stats = bulk_ingest.bulk_ingest(paths, workers=2, batch_size=1, state_path=state)
+        assert (stats["docs"], stats["skipped"], stats["failed"]) == (0, 2, 1)
+        assert vectorstore.get_vectorstore().index.ntotal == 2
+
+        # Re-ingesting a changed file replaces its chunks instead of adding to them
+        _write(a, "travel policy now also covers rail tickets and meals")
+        stats = bulk_ingest.bulk_ingest([a], workers=1, state_path=os.path.join(tmp, "again.txt"))
+        assert stats["docs"] == 1 and len(source_registry.sources[f"file:{a}"]) == 1
+        texts = {doc.page_content for doc in vectorstore.get_vectorstore().docstore._dict.values()
+                 if source_registry.is_live(doc.metadata)}
+        assert "travel policy now also covers rail tickets and meals" in texts
+        assert not any("flights and hotels" in text for text in texts)
+
+        # A file that now extracts to nothing loses its old chunks
+        _write(a, "   \n")
+        stats = bulk_ingest.bulk_ingest([a], workers=1, state_path=os.path.join(tmp, "emptied.txt"))
+        assert stats["docs"] == 1 and stats["removed"] == 1
+        assert f"file:{a}" not in source_registry.sources
+        assert bulk_ingest.load_done(os.path.join(tmp, "emptied.txt")) == {a}
+        hits = vectorstore.get_vectorstore().similarity_search(
+            "travel policy rail tickets", k=4, filter=source_registry.is_live, fetch_k=20
+        )
+        assert [doc.page_content for doc in hits] == ["# Laptops\nengineering laptops are refreshed every three years"]
+    print("PASS: manifest ingest commits per batch, resumes, retries failures, replaces changed files and clears emptied ones")
+
+
+if __name__ == "__main__":
+    test_manifest_ingest_resumes_and_replaces()
@@ -0,0 +1,92 @@
+import asyncio
+import os
+import tempfile
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from app import database, message_writer
+from app.database import build_engine, build_async_engine, get_async_db
+from app.migrations import migrate
+
+
+def _register(client, username: str) -> dict:
+    response = client.post("/auth/register", json={"username": username, "email": f"{username}@example.com", "password": "secret123"})
+    assert response.status_code == 201, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def test_conversation_endpoints_on_async_sessions():
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        sync_engine = build_engine(f"sqlite:///{os.path.join(tmp, 'chat.db')}")
+        async_engine = build_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'chat.db')}")
+        async_session = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+        saved = database.engine, database.SessionLocal
+        database.engine, database.SessionLocal = sync_engine, sessionmaker(bind=sync_engine)
+        interval, message_writer.FLUSH_INTERVAL_MS = message_writer.FLUSH_INTERVAL_MS, 60000
+        stopping, message_writer._stopping = message_writer._stopping, False
+
+        async def temp_db():
+            async with async_session() as db:
+                yield db
+
+        # app.main migrates database.engine and creates its LLM cache in the working directory on import
+        os.chdir(tmp)
+        try:
+            from app.main import app
+        finally:
+            os.chdir(cwd)
+        migrate(sync_engine)
+        app.dependency_overrides[get_async_db] = temp_db
+        client = TestClient(app)
+        try:
+            alice, bob = _register(client, "alice"), _register(client, "bob")
+            assert client.post("/auth/register", json={"username": "alice", "email": "a2@example.com", "password": "secret123"}).status_code == 400
+            assert client.post("/auth/login", json={"username": "alice", "password": "wrong"}).status_code == 401
+            assert client.post("/auth/login", json={"username": "alice", "password": "secret123"}).status_code == 200
+
+            ids = [client.post("/conversations", json={"title": f"c{i}"}, headers=alice).json()["id"] for i in range(3)]
+
+            # Keyset pages, newest first
+            page = client.get("/conversations", params={"limit": 2}, headers=alice)
+            assert [c["id"] for c in page.json()] == ids[::-1][:2]
+            last = client.get("/conversations", params={"limit": 2, "cursor": page.headers["X-Next-Cursor"]}, headers=alice)
+            assert [c["id"] for c in last.json()] == [ids[0]] and "X-Next-Cursor" not in last.headers
+            assert client.get("/conversations", headers=bob).json() == []
+
+            # Queued messages are visible to the next read
+            for i in range(4):
+                message_writer.enqueue_message(ids[0], "user", f"q{i}")
+            message_writer.enqueue_message(ids[0], "assistant", "chart", mode="chart", meta='{"type": "bar"}')
+            conversation = client.get(f"/conversations/{ids[0]}", params={"limit": 2}, headers=alice)
+            assert conversation.status_code == 200
+            messages = conversation.json()["messages"]
+            assert [m["content"] for m in messages] == ["q3", "chart"]
+            older = client.get(f"/conversations/{ids[0]}/messages", params={"before": conversation.headers["X-Next-Cursor"]}, headers=alice)
+            assert [m["content"] for m in older.json()] == ["q2", "q1", "q0"]
+            metadata = client.get(f"/conversations/{ids[0]}/messages/{messages[1]['id']}/metadata", headers=alice)
+            assert metadata.json() == {"type": "bar"}
+
+            # Other users get 404 for every operation
+            assert client.get(f"/conversations/{ids[0]}", headers=bob).status_code == 404
+            assert client.patch(f"/conversations/{ids[0]}/title", params={"title": "x"}, headers=bob).status_code == 404
+            assert client.delete(f"/conversations/{ids[0]}", headers=bob).status_code == 404
+
+            assert client.patch(f"/conversations/{ids[0]}/title", params={"title": "renamed"}, headers=alice).status_code == 200
+            assert client.get(f"/conversations/{ids[0]}", headers=alice).json()["title"] == "renamed"
+            assert client.delete(f"/conversations/{ids[0]}", headers=alice).status_code == 200
+            assert client.get(f"/conversations/{ids[0]}", headers=alice).status_code == 404
+            with database.SessionLocal() as db:
+                assert db.query(database.Message).count() == 0
+        finally:
+            app.dependency_overrides.pop(get_async_db, None)
+            database.engine, database.SessionLocal = saved
+            message_writer.FLUSH_INTERVAL_MS = interval
+            message_writer._stopping = stopping
+            sync_engine.dispose()
+            asyncio.run(async_engine.dispose())
+    print("PASS: auth and conversation endpoints work end to end on async sessions")
+
+
+if __name__ == "__main__":
+    test_conversation_endpoints_on_async_sessions()
@@ -0,0 +1,81 @@
+import asyncio
+import os
+import tempfile
+from collections import namedtuple
+from datetime import datetime
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app import database, conversation_memory
+from app.database import build_engine, build_async_engine, User, Conversation, Message
+from app.migrations import migrate
+from app.conversation_memory import select_window, estimate_tokens, load_history, update_summary
+
+Row = namedtuple("Row", "id role content mode")
+
+
+def test_window_respects_budget():
+    rows = [Row(i, "user" if i % 2 else "assistant", "x" * 40, "rag") for i in range(1, 21)]
+    window = select_window(rows, budget=40)
+    assert len(window) == 3 and sum(estimate_tokens(line) for line in window) <= 40
+    assert window[-1] == _line(rows[-1])
+
+    oversized = select_window([Row(1, "user", "y" * 1000, "rag")], budget=10)
+    assert len(oversized) == 1 and estimate_tokens(oversized[0]) <= 11
+    assert select_window([Row(1, "assistant", "", "chart")]) == ["Assistant: [chart result]"]
+    print("PASS: the history window is the newest messages within the token budget")
+
+
+def _line(row) -> str:
+    return f"{row.role.capitalize()}: {row.content}"
+
+
+def test_rolling_summary_keeps_the_prompt_bounded():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "chat.db")
+        engine = build_engine(f"sqlite:///{path}")
+        migrate(engine)
+        session_factory, database.SessionLocal = database.SessionLocal, sessionmaker(bind=engine)
+        summarize, calls = conversation_memory.summarize_turns, []
+
+        def fake_summarize(summary, lines):
+            calls.append(lines)
+            return (summary or "") + f"[{len(lines)} folded]"
+
+        conversation_memory.summarize_turns = fake_summarize
+        try:
+            with database.SessionLocal() as db:
+                db.add(User(id=1, username="alice", email="alice@example.com", hashed_password="x"))
+                db.add(Conversation(id=1, user_id=1, title="t", updated_at=datetime(2024, 1, 1)))
+                db.add_all([Message(conversation_id=1, role="user" if i % 2 else "assistant", content=f"m{i}") for i in range(1, 31)])
+                db.commit()
+
+            window = conversation_memory.window_messages()
+            assert update_summary(1) == min(30 - window, conversation_memory.SUMMARY_FOLD_LIMIT)
+            assert update_summary(1) == 0
+            assert len(calls) == 1 and calls[0][0] == "User: m1"
+
+            async def history():
+                async_engine = build_async_engine(f"sqlite+aiosqlite:///{path}")
+                async with async_sessionmaker(async_engine, expire_on_commit=False)() as db:
+                    conversation = await db.get(Conversation, 1)
+                    text = await load_history(db, conversation)
+                await async_engine.dispose()
+                return text
+
+            text = asyncio.run(history())
+            lines = text.splitlines()
+            assert lines[0] == f"Summary of earlier conversation: [{30 - window} folded]"
+            assert lines[1:] == [f"{'User' if i % 2 else 'Assistant'}: m{i}" for i in range(31 - window, 31)]
+
+            with database.SessionLocal() as db:
+                assert db.get(Conversation, 1).updated_at == datetime(2024, 1, 1)
+        finally:
+            conversation_memory.summarize_turns = summarize
+            database.SessionLocal = session_factory
+            engine.dispose()
+    print("PASS: older turns are folded into the stored summary; the window stays fixed")
+
+
+if __name__ == "__main__":
+    test_window_respects_budget()
+    test_rolling_summary_keeps_the_prompt_bounded()
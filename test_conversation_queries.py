@@ -0,0 +1,96 @@
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.database import Base, User, Conversation, Message, build_async_engine
+from app import conversation_queries
+from app.conversation_queries import list_conversations, decode_cursor, list_messages, get_message_metadata
+
+
+async def make_session():
+    engine = build_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    db = async_sessionmaker(engine, expire_on_commit=False)()
+
+    db.add_all([
+        User(id=1, username="alice", email="alice@example.com", hashed_password="x"),
+        User(id=2, username="bob", email="bob@example.com", hashed_password="x"),
+    ])
+    start = datetime(2024, 1, 1)
+    for i in range(1, 8):
+        # Conversations 4 and 5 share a timestamp to exercise the id tie-break
+        updated = start + timedelta(hours=min(i, 4))
+        db.add(Conversation(id=i, user_id=1, title=f"c{i}", created_at=start, updated_at=updated))
+        db.add_all([Message(conversation_id=i, role="user", content="hi") for _ in range(i)])
+    db.add(Conversation(id=8, user_id=2, title="other", created_at=start, updated_at=start))
+    await db.commit()
+    return engine, db
+
+
+def test_keyset_pages():
+    async def run():
+        engine, db = await make_session()
+        seen, cursor = [], None
+        while True:
+            rows, cursor = await list_conversations(db, 1, limit=3, cursor=cursor)
+            seen += [(row["id"], row["message_count"]) for row in rows]
+            if cursor is None:
+                break
+        assert seen == [(7, 7), (6, 6), (5, 5), (4, 4), (3, 3), (2, 2), (1, 1)]
+        assert decode_cursor((await list_conversations(db, 1, limit=3))[1]) == (datetime(2024, 1, 1, 4), 5)
+        await db.close()
+        await engine.dispose()
+
+    asyncio.run(run())
+    print("PASS: pages are disjoint, ordered and carry message counts")
+
+
+def test_single_statement():
+    async def run():
+        engine, db = await make_session()
+        statements = []
+        event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        rows, _ = await list_conversations(db, 1, limit=50)
+        assert len(rows) == 7 and len(statements) == 1
+        assert (await list_conversations(db, 2))[0][0]["message_count"] == 0
+        await db.close()
+        await engine.dispose()
+
+    asyncio.run(run())
+    print("PASS: listing is one statement")
+
+
+def test_message_pages_and_deferred_metadata():
+    async def run():
+        engine, db = await make_session()
+        db.add(Message(conversation_id=1, role="assistant", content="", mode="chart", meta='{"labels": ["a"]}'))
+        db.add(Message(conversation_id=1, role="assistant", content="", mode="chart", meta='{"labels": ["' + "x" * 100 + '"]}'))
+        await db.commit()
+
+        inline_limit, conversation_queries.METADATA_INLINE_BYTES = conversation_queries.METADATA_INLINE_BYTES, 50
+        try:
+            page, before = await list_messages(db, 1, limit=2)
+            older, last = await list_messages(db, 1, limit=2, before=before)
+        finally:
+            conversation_queries.METADATA_INLINE_BYTES = inline_limit
+
+        large, small = page
+        assert large["id"] > small["id"] and before == small["id"]
+        assert large["metadata"] is None and large["metadata_size"] > 100
+        assert small["metadata"] == '{"labels": ["a"]}'
+        assert len(older) == 1 and older[0]["metadata_size"] == 0 and last is None
+        assert (await get_message_metadata(db, 1, large["id"])).startswith('{"labels": ["xxx')
+        assert await get_message_metadata(db, 2, large["id"]) is None
+        await db.close()
+        await engine.dispose()
+
+    asyncio.run(run())
+    print("PASS: messages page newest first; large metadata is deferred")
+
+
+if __name__ == "__main__":
+    test_keyset_pages()
+    test_single_statement()
+    test_message_pages_and_deferred_metadata()
@@ -0,0 +1,67 @@
+import asyncio
+import os
+import tempfile
+from app import database
+from app.database import build_engine, build_async_engine
+
+PRAGMAS = ("journal_mode", "synchronous", "cache_size", "mmap_size", "busy_timeout", "temp_store")
+# What SQLite reports back for the default profile (NORMAL = 1, MEMORY = 2)
+EXPECTED = {
+    "journal_mode": "wal",
+    "synchronous": 1,
+    "cache_size": -65536,
+    "mmap_size": 256 * 1024 * 1024,
+    "busy_timeout": 5000,
+    "temp_store": 2,
+}
+
+
+def _read_pragmas(conn) -> dict:
+    return {name: conn.exec_driver_sql(f"PRAGMA {name}").scalar() for name in PRAGMAS}
+
+
+def test_sqlite_profile_applied_to_every_connection():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(f"sqlite:///{os.path.join(tmp, 'chat.db')}")
+        try:
+            # Two connections at once, so both came through the connect event
+            with engine.connect() as first, engine.connect() as second:
+                assert _read_pragmas(first) == EXPECTED
+                assert _read_pragmas(second) == EXPECTED
+        finally:
+            engine.dispose()
+
+        untuned = build_engine(f"sqlite:///{os.path.join(tmp, 'untuned.db')}", tuned=False)
+        try:
+            with untuned.connect() as conn:
+                pragmas = _read_pragmas(conn)
+            assert pragmas["journal_mode"] == "delete" and pragmas["synchronous"] == 2
+        finally:
+            untuned.dispose()
+    print("PASS: every pooled SQLite connection gets the PRAGMA profile")
+
+
+def test_profile_overrides_and_async_engine():
+    saved = database.SQLITE_SYNCHRONOUS, database.SQLITE_BUSY_TIMEOUT_MS
+    database.SQLITE_SYNCHRONOUS, database.SQLITE_BUSY_TIMEOUT_MS = "FULL", 250
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = build_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'chat.db')}")
+
+            async def read():
+                async with engine.connect() as conn:
+                    return await conn.run_sync(lambda sync_conn: _read_pragmas(sync_conn))
+
+            try:
+                pragmas = asyncio.run(read())
+            finally:
+                asyncio.run(engine.dispose())
+    finally:
+        database.SQLITE_SYNCHRONOUS, database.SQLITE_BUSY_TIMEOUT_MS = saved
+    assert pragmas == {**EXPECTED, "synchronous": 2, "busy_timeout": 250}
+    print("PASS: the async engine applies the same profile, including overrides")
+
+
+if __name__ == "__main__":
+    test_sqlite_profile_applied_to_every_connection()
+    test_profile_overrides_and_async_engine()
@@ -0,0 +1,39 @@
+from app import dedup
+
+BASE = ("the quarterly travel policy covers economy flights hotel rooms up to one hundred and fifty dollars "
+        "per night and meals for all staff members travelling on approved company business trips abroad")
+
+
+def test_threshold_separates_near_duplicates_from_distinct_text():
+    near = BASE + " only"  # one extra word: estimated Jaccard well above the threshold
+    distinct = "customer alice bought a laptop on credit in january and paid it off in march with a bonus"
+
+    signature = dedup.minhash(BASE)
+    assert float((dedup.minhash(near) == signature).mean()) >= dedup.DEDUP_THRESHOLD
+    assert float((dedup.minhash(distinct) == signature).mean()) < 0.2
+
+    index = ({}, {})
+    dedup._insert("base", signature, index)
+    assert dedup.find_duplicate(dedup.minhash(near), index)[0] == "base"
+    assert dedup.find_duplicate(dedup.minhash(distinct), index) == (None, 0.0)
+    print("PASS: a near-duplicate clears the LSH threshold and a distinct text does not")
+
+
+def test_filter_duplicates_leaves_the_index_alone():
+    saved = dedup.signatures, dedup.buckets, dedup._loaded, dedup.DEDUP_ENABLED
+    dedup.signatures, dedup.buckets, dedup._loaded, dedup.DEDUP_ENABLED = {}, {}, True, True
+    try:
+        keep, duplicates, pending = dedup.filter_duplicates([BASE, BASE + " only", "something else entirely"], ["a", "b", "c"])
+        assert keep == [0, 2] and duplicates == {1: "a"} and set(pending) == {"a", "c"}
+        assert dedup.signatures == {}  # nothing indexed until the chunks are stored
+
+        dedup.add(pending)
+        assert dedup.filter_duplicates([BASE], ["d"])[1] == {0: "a"}
+    finally:
+        dedup.signatures, dedup.buckets, dedup._loaded, dedup.DEDUP_ENABLED = saved
+    print("PASS: signatures are only indexed once add() is called")
+
+
+if __name__ == "__main__":
+    test_threshold_separates_near_duplicates_from_distinct_text()
+    test_filter_duplicates_leaves_the_index_alone()
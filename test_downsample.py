@@ -0,0 +1,28 @@
+import math
+from app.downsample import lttb, cap_categories
+
+
+def test_lttb_keeps_shape():
+    rows = [(i, math.sin(i / 3) * 100) for i in range(1000)]
+    points = lttb(rows, 50)
+    assert len(points) == 50
+    assert points[0] == rows[0] and points[-1] == rows[-1]
+    assert [r[0] for r in points] == sorted(r[0] for r in points)
+    # peaks and troughs survive
+    assert max(p[1] for p in points) > 99 and min(p[1] for p in points) < -99
+    assert lttb(rows[:10], 50) == rows[:10]
+    print("PASS: LTTB keeps endpoints, order and extremes")
+
+
+def test_cap_categories():
+    rows = [(f"C{i}", float(i)) for i in range(1, 101)]
+    capped = cap_categories(rows, 5)
+    assert [r[0] for r in capped] == ["C100", "C99", "C98", "C97", "Other"]
+    assert sum(r[1] for r in capped) == sum(r[1] for r in rows)
+    assert cap_categories(rows, 5, additive=False)[-1] == ("C96", 96.0)
+    print("PASS: categories capped with an Other total")
+
+
+if __name__ == "__main__":
+    test_lttb_keeps_shape()
+    test_cap_categories()
@@ -0,0 +1,54 @@
+import asyncio
+import threading
+from app import intent as intent_module
+from app.intent import classify_rules, classify_async, Intent
+
+CASES = [
+    ("Which customer spent the most?", "aggregation"),
+    ("show me a chart of sales by month", "chart"),
+    ("graph total amount by product", "chart"),
+    ("top 3 products by quantity", "aggregation"),
+    ("show me the onboarding document", "rag"),
+    ("what is our refund policy", "rag"),
+]
+
+
+def test_rules_routing():
+    for query, expected in CASES:
+        intent = classify_rules(query)
+        assert intent.route == expected, (query, intent)
+        assert intent.method == "rules" and intent.confidence >= 0.7, (query, intent)
+    print("PASS: questions routed by the compiled rules")
+
+
+def test_no_cues_defaults_to_rag():
+    intent = classify_rules("hello there")
+    assert intent.route == "rag" and intent.confidence == 0.0 and intent.method == "default"
+    print("PASS: questions without cues go to RAG with zero confidence")
+
+
+def test_embedding_fallback_runs_off_the_event_loop():
+    threads = []
+
+    def fake_embedding_intent(query):
+        threads.append(threading.current_thread())
+        return Intent("aggregation", 0.9, "embedding")
+
+    saved = intent_module._embedding_intent, intent_module.EMBEDDING_FALLBACK
+    intent_module._embedding_intent, intent_module.EMBEDDING_FALLBACK = fake_embedding_intent, True
+    intent_module.classify.cache_clear()
+    try:
+        assert asyncio.run(classify_async("what is our refund policy")).method == "rules"
+        assert threads == []
+        assert asyncio.run(classify_async("who bought the thing")).method == "embedding"
+        assert threads and threads[0] is not threading.main_thread()
+    finally:
+        intent_module._embedding_intent, intent_module.EMBEDDING_FALLBACK = saved
+        intent_module.classify.cache_clear()
+    print("PASS: confident rules answer inline; the embedding fallback runs on a worker thread")
+
+
+if __name__ == "__main__":
+    test_rules_routing()
+    test_no_cues_defaults_to_rag()
+    test_embedding_fallback_runs_off_the_event_loop()
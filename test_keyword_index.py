@@ -0,0 +1,69 @@
+import sys
+import threading
+from langchain_classic.schema import Document
+from app.keyword_index import KeywordIndex
+
+
+def _doc(text: str) -> Document:
+    return Document(page_content=text)
+
+
+def test_add_replace_remove():
+    index = KeywordIndex()
+    index.add_documents(["a", "b"], [_doc("laptop sales january"), _doc("phone sales march")])
+    assert [d.page_content for d in index.search("laptop", k=2)] == ["laptop sales january"]
+
+    index.add_documents(["a"], [_doc("desk sales april")])
+    assert len(index) == 2 and index.search("laptop") == []
+    assert index.search("desk")[0].page_content == "desk sales april"
+
+    index.remove("b")
+    index.remove("missing")
+    assert len(index) == 1 and "phone" not in index.postings and index.total_length == 3
+    print("PASS: replacing and removing documents updates postings and lengths")
+
+
+def test_concurrent_add_and_search():
+    index = KeywordIndex()
+    index.add_documents([f"seed{i}" for i in range(2000)], [_doc(f"common term seed{i}") for i in range(2000)])
+    errors, stop = [], threading.Event()
+    # Switch threads often so searches overlap the writer mid-iteration
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+
+    def writer():
+        try:
+            for i in range(300):
+                index.add_documents([f"w{i}"], [_doc(f"common term w{i}")])
+                if i % 3 == 0:
+                    index.remove(f"w{i - 1}")
+        except Exception as e:
+            errors.append(e)
+        finally:
+            stop.set()
+
+    def reader():
+        try:
+            while not stop.is_set():
+                assert len(index.search("common term", k=5)) == 5
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(3)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert errors == []
+    assert index.total_length == sum(index.doc_lengths.values())
+    assert sum(len(posting) for posting in index.postings.values()) == sum(len(t) for t in index.doc_terms.values())
+    print("PASS: searches run safely while documents are added and removed")
+
+
+if __name__ == "__main__":
+    test_add_replace_remove()
+    test_concurrent_add_and_search()
@@ -0,0 +1,97 @@
+import os
+import tempfile
+from datetime import datetime
+from sqlalchemy.orm import sessionmaker
+from app import database, message_writer
+from app.database import build_engine, User, Conversation, Message
+from app.migrations import migrate
+
+
+def test_batched_flush_and_read_your_writes():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(f"sqlite:///{os.path.join(tmp, 'chat.db')}")
+        migrate(engine)
+        session_factory, database.SessionLocal = database.SessionLocal, sessionmaker(bind=engine)
+        interval, message_writer.FLUSH_INTERVAL_MS = message_writer.FLUSH_INTERVAL_MS, 60000
+        try:
+            with database.SessionLocal() as db:
+                db.add(User(id=1, username="alice", email="alice@example.com", hashed_password="x"))
+                db.add_all([Conversation(id=i, user_id=1, title="t", updated_at=datetime(2024, 1, 1)) for i in (1, 2)])
+                db.commit()
+
+            for i in range(5):
+                message_writer.enqueue_message(1, "user", f"q{i}")
+            message_writer.enqueue_message(2, "assistant", "a", mode="chart", meta="{}")
+
+            with database.SessionLocal() as db:
+                assert db.query(Message).count() == 0
+            assert message_writer.flush(3) == 0
+            flushes = message_writer.writer_metrics()["flushes"]
+            assert message_writer.flush(1) == 6
+            assert message_writer.writer_metrics()["flushes"] == flushes + 1
+            assert message_writer.flush(1) == 0
+
+            with database.SessionLocal() as db:
+                assert [m.content for m in db.query(Message).filter(Message.conversation_id == 1).order_by(Message.id)] == [f"q{i}" for i in range(5)]
+                assert all(c.updated_at > datetime(2024, 1, 1) for c in db.query(Conversation))
+
+            message_writer.enqueue_message(2, "user", "left over")
+            message_writer.stop()
+            with database.SessionLocal() as db:
+                assert db.query(Message).filter(Message.content == "left over").count() == 1
+            assert message_writer.writer_metrics()["queue_depth"] == 0
+        finally:
+            database.SessionLocal = session_factory
+            message_writer.FLUSH_INTERVAL_MS = interval
+            engine.dispose()
+    print("PASS: one transaction per batch, flush on read and on shutdown")
+
+
+def test_failing_batch_falls_back_to_row_writes():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(f"sqlite:///{os.path.join(tmp, 'chat.db')}")
+        migrate(engine)
+        session_factory, database.SessionLocal = database.SessionLocal, sessionmaker(bind=engine)
+        interval, message_writer.FLUSH_INTERVAL_MS = message_writer.FLUSH_INTERVAL_MS, 60000
+        write = message_writer._write
+
+        def write_rejecting_poison(batch):
+            if any(row["content"] == "poison" for row in batch):
+                raise RuntimeError("constraint failed")
+            write(batch)
+
+        message_writer._write = write_rejecting_poison
+        message_writer._stopping = False  # the other test stops the writer
+        try:
+            with database.SessionLocal() as db:
+                db.add(User(id=1, username="alice", email="alice@example.com", hashed_password="x"))
+                db.add(Conversation(id=1, user_id=1, title="t"))
+                db.commit()
+
+            for content in ("before", "poison", "after"):
+                message_writer.enqueue_message(1, "user", content)
+            dropped = message_writer.writer_metrics()["dropped"]
+
+            for _ in range(message_writer.FLUSH_MAX_RETRIES):
+                assert message_writer.flush(1) == 0
+                assert message_writer.writer_metrics()["queue_depth"] == 3
+            assert message_writer.flush(1) == 2
+            assert message_writer.flush(1) == 0
+
+            metrics = message_writer.writer_metrics()
+            assert metrics["queue_depth"] == 0 and metrics["pending_conversations"] == 0
+            assert metrics["dropped"] == dropped + 1
+            with database.SessionLocal() as db:
+                assert [m.content for m in db.query(Message).order_by(Message.id)] == ["before", "after"]
+        finally:
+            message_writer._write = write
+            message_writer.stop()
+            database.SessionLocal = session_factory
+            message_writer.FLUSH_INTERVAL_MS = interval
+            engine.dispose()
+    print("PASS: a failing batch is retried, then written row by row and the bad row dropped")
+
+
+if __name__ == "__main__":
+    test_batched_flush_and_read_your_writes()
+    test_failing_batch_falls_back_to_row_writes()
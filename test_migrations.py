@@ -0,0 +1,102 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from sqlalchemy import create_engine, inspect
+from app import migrations
+from app.migrations import migrate, applied_versions, explain_hot_queries, unindexed_queries, MIGRATIONS
+
+LEGACY_SCHEMA = """
+CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR(50) NOT NULL UNIQUE, email VARCHAR(100) NOT NULL UNIQUE,
+                    hashed_password VARCHAR(255) NOT NULL, created_at DATETIME, is_active BOOLEAN);
+CREATE TABLE conversations (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, title VARCHAR(200) NOT NULL,
+                            created_at DATETIME, updated_at DATETIME);
+CREATE TABLE messages (id INTEGER PRIMARY KEY, conversation_id INTEGER NOT NULL, role VARCHAR(20) NOT NULL,
+                       content TEXT NOT NULL, mode VARCHAR(20), meta TEXT, created_at DATETIME);
+INSERT INTO users VALUES (1, 'alice', 'alice@example.com', 'x', NULL, 1);
+"""
+
+
+def test_upgrades_legacy_database():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "chat.db")
+        conn = sqlite3.connect(path)
+        conn.executescript(LEGACY_SCHEMA)
+        conn.close()
+
+        engine = create_engine(f"sqlite:///{path}")
+        assert migrate(engine) == [version for version, _, _ in MIGRATIONS]
+        assert migrate(engine) == []
+        assert applied_versions(engine) == {version for version, _, _ in MIGRATIONS}
+
+        with engine.connect() as c:
+            assert c.exec_driver_sql("SELECT role FROM users").scalar() == "user"
+        indexes = {index["name"] for index in inspect(engine).get_indexes("messages")}
+        assert "ix_messages_conversation_id" in indexes
+        engine.dispose()
+    print("PASS: legacy database upgraded once, role backfilled, indexes created")
+
+
+def test_concurrent_workers_apply_each_migration_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "chat.db")
+        conn = sqlite3.connect(path)
+        conn.executescript(LEGACY_SCHEMA)
+        conn.close()
+
+        def slow(upgrade):
+            # Widen the window between checking the schema and recording the version
+            def run(conn):
+                upgrade(conn)
+                time.sleep(0.05)
+            return run
+
+        original = migrations.MIGRATIONS
+        migrations.MIGRATIONS = [(version, description, slow(upgrade)) for version, description, upgrade in original]
+        engines = [create_engine(f"sqlite:///{path}", connect_args={"timeout": 30}) for _ in range(4)]
+        start, results, errors = threading.Barrier(len(engines)), [], []
+
+        def worker(engine):
+            try:
+                start.wait()
+                results.append(migrate(engine))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(engine,)) for engine in engines]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            migrations.MIGRATIONS = original
+            for engine in engines:
+                engine.dispose()
+
+        assert errors == [], errors
+        applied = [version for versions in results for version in versions]
+        assert sorted(applied) == [version for version, _, _ in MIGRATIONS]
+    print("PASS: concurrent workers apply each migration exactly once")
+
+
+def test_hot_queries_use_indexes():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'chat.db')}")
+        migrate(engine)
+        plans = explain_hot_queries(engine)
+        assert plans and unindexed_queries(plans) == {}, plans
+
+        with engine.begin() as c:
+            c.exec_driver_sql("DROP INDEX ix_messages_conversation_id")
+        engine.dispose()  # pooled connections keep prepared EXPLAIN statements
+        assert "list_messages" in unindexed_queries(explain_hot_queries(engine))
+        engine.dispose()
+    print("PASS: every hot query is an index search; a missing index is reported")
+
+
+if __name__ == "__main__":
+    test_upgrades_legacy_database()
+    test_concurrent_workers_apply_each_migration_once()
+    test_hot_queries_use_indexes()
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+from app import password_executor
+from app.password_executor import PasswordHashBusy, password_executor_metrics
+
+
+def test_full_queue_is_rejected():
+    release = threading.Event()
+
+    async def run():
+        limits = password_executor.WORKERS, password_executor.MAX_QUEUE
+        password_executor.WORKERS, password_executor.MAX_QUEUE = 1, 1
+        try:
+            admitted = [asyncio.ensure_future(password_executor._run(release.wait)) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            rejected = password_executor_metrics()["rejected"]
+            try:
+                await password_executor._run(release.wait)
+                assert False, "third task was admitted past the queue limit"
+            except PasswordHashBusy:
+                pass
+            assert password_executor_metrics()["rejected"] == rejected + 1
+            release.set()
+            assert await asyncio.gather(*admitted) == [True, True]
+        finally:
+            release.set()
+            password_executor.WORKERS, password_executor.MAX_QUEUE = limits
+        assert password_executor_metrics()["in_flight"] == 0
+
+    asyncio.run(run())
+    print("PASS: tasks beyond workers + queue are turned away")
+
+
+def test_cancelled_request_keeps_its_slot_until_bcrypt_finishes():
+    release = threading.Event()
+
+    async def run():
+        limits = password_executor.WORKERS, password_executor.MAX_QUEUE
+        password_executor.WORKERS, password_executor.MAX_QUEUE = 1, 0
+        try:
+            task = asyncio.ensure_future(password_executor._run(release.wait))
+            await asyncio.sleep(0.05)
+            task.cancel()  # client disconnected; the pool thread is still busy
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            assert password_executor_metrics()["in_flight"] == 1
+            try:
+                await password_executor._run(release.wait)
+                assert False, "admitted while the cancelled call still holds the worker"
+            except PasswordHashBusy:
+                pass
+        finally:
+            release.set()
+            password_executor.WORKERS, password_executor.MAX_QUEUE = limits
+
+        for _ in range(100):
+            if password_executor_metrics()["in_flight"] == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert password_executor_metrics()["in_flight"] == 0
+
+    asyncio.run(run())
+    print("PASS: a cancelled request's slot is released only when its bcrypt call ends")
+
+
+def test_hash_round_trip():
+    async def run():
+        hashed = await password_executor.hash_password_async("secret")
+        assert await password_executor.verify_password_async("secret", hashed)
+        assert not await password_executor.verify_password_async("wrong", hashed)
+
+    asyncio.run(run())
+    print("PASS: hashing and verification run on the bcrypt pool")
+
+
+if __name__ == "__main__":
+    test_full_queue_is_rejected()
+    test_cancelled_request_keeps_its_slot_until_bcrypt_finishes()
+    test_hash_round_trip()
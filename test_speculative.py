@@ -0,0 +1,88 @@
+import asyncio
+import threading
+from app import speculative
+from app.intent import Intent
+from app.speculative import speculate, speculation_metrics
+
+ANSWER = {"answer": "Alice has the highest total amount: 1,500.00.", "sources": [{"source": "mysql"}]}
+DOCUMENTS = ["travel policy chunk"]
+
+
+def _race(analytics, retrieval, intent: Intent):
+    """Run speculate() with stand-ins for the analytics answer and hybrid search"""
+    saved = speculative.speculative_analytics, speculative.hybrid_search
+    speculative.speculative_analytics, speculative.hybrid_search = analytics, retrieval
+    try:
+        return asyncio.run(speculate("which customer is in the travel policy", intent))
+    finally:
+        speculative.speculative_analytics, speculative.hybrid_search = saved
+
+
+def test_matching_guess_wins_and_cancels_the_other_path():
+    release = threading.Event()
+
+    def blocked_retrieval(query, k):
+        release.wait(5)
+        return DOCUMENTS, 0.9
+
+    before = speculation_metrics()
+    try:
+        outcome = _race(lambda query, route: ANSWER, blocked_retrieval, Intent("aggregation", 0.4, "rules"))
+    finally:
+        release.set()
+    assert outcome.route == "aggregation" and outcome.result == ANSWER
+    after = speculation_metrics()
+    assert after["analytics_won"] == before["analytics_won"] + 1
+    assert after["cancelled"] == before["cancelled"] + 1 and after["active"] == 0
+
+    release.clear()
+
+    def blocked_analytics(query, route):
+        release.wait(5)
+        return ANSWER
+
+    try:
+        outcome = _race(blocked_analytics, lambda query, k: (DOCUMENTS, 0.8), Intent("rag", 0.4, "rules"))
+    finally:
+        release.set()
+    assert outcome.route == "rag" and outcome.documents == DOCUMENTS and outcome.relevance == 0.8
+    assert speculation_metrics()["cancelled"] == after["cancelled"] + 1
+    print("PASS: the guessed path wins as soon as it matches; the other is cancelled")
+
+
+def test_other_path_wins_when_the_guess_does_not_match():
+    before = speculation_metrics()
+
+    # Guessed analytics, but the question has no data behind it
+    outcome = _race(lambda query, route: None, lambda query, k: (DOCUMENTS, 0.7), Intent("chart", 0.4, "rules"))
+    assert outcome.route == "rag" and outcome.documents == DOCUMENTS
+
+    # Guessed RAG, but retrieval found nothing relevant enough
+    outcome = _race(lambda query, route: ANSWER, lambda query, k: (DOCUMENTS, 0.1), Intent("rag", 0.4, "rules"))
+    assert outcome.route == "aggregation" and outcome.result == ANSWER
+
+    # Neither matches: follow the classifier
+    outcome = _race(lambda query, route: None, lambda query, k: ([], 0.0), Intent("rag", 0.4, "rules"))
+    assert outcome.route == "rag" and outcome.documents is None
+
+    after = speculation_metrics()
+    assert after["rag_won"] == before["rag_won"] + 1 and after["analytics_won"] == before["analytics_won"] + 1
+    assert after["undecided"] == before["undecided"] + 1
+    print("PASS: a non-matching guess falls back to whichever path matched")
+
+
+def test_budget_exhausted_skips_speculation():
+    max_concurrent, speculative.MAX_CONCURRENT = speculative.MAX_CONCURRENT, 0
+    try:
+        before = speculation_metrics()["skipped_budget"]
+        assert _race(lambda query, route: ANSWER, lambda query, k: (DOCUMENTS, 0.9), Intent("rag", 0.4, "rules")) is None
+        assert speculation_metrics()["skipped_budget"] == before + 1
+    finally:
+        speculative.MAX_CONCURRENT = max_concurrent
+    print("PASS: speculation is skipped once the concurrency budget is used")
+
+
+if __name__ == "__main__":
+    test_matching_guess_wins_and_cancels_the_other_path()
+    test_other_path_wins_when_the_guess_does_not_match()
+    test_budget_exhausted_skips_speculation()
@@ -0,0 +1,113 @@
+import sqlite3
+import tempfile
+import os
+from app.sql_ingest import iter_new_rows, build_documents
+from app.aggregations import AggregationSpec, run_aggregation
+from app import business_db, analytics_snapshot
+from business_fixture import make_engine, ROWS
+
+
+def test_incremental_read():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(os.path.join(tmp, "business.db"))
+
+        batches = list(iter_new_rows(engine, watermark=None, chunksize=2))
+        assert [len(b) for b in batches] == [2, 2, 1]
+
+        batches = list(iter_new_rows(engine, watermark=3, chunksize=2))
+        assert [r for b in batches for r in b["id"]] == [4, 5]
+
+        assert list(iter_new_rows(engine, watermark=5)) == []
+        engine.dispose()
+    print("PASS: only rows past the watermark are read, in batches")
+
+
+def test_build_documents():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(os.path.join(tmp, "business.db"))
+        df = next(iter_new_rows(engine, chunksize=10))
+        engine.dispose()
+
+    texts, metadatas, source_keys = build_documents(df)
+    assert texts[0] == "Customer Alice made a credit purchase of Laptop worth 1200.0 in January. Sales count: 1."
+    assert metadatas[1]["customer"] == "Bob" and metadatas[1]["finance"] == "cash"
+    assert metadatas[1]["source"] == "mysql" and metadatas[1]["table"] == "business_data"
+    assert source_keys == [f"mysql:business_data:{i}" for i in range(1, 6)]
+    print("PASS: texts, metadata and per-row source keys built from the batch")
+
+
+def test_shared_engine():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "business.db")
+        make_engine(path).dispose()
+        business_db.configure(f"sqlite:///{path}", pool_size=2, max_overflow=0)
+        try:
+            rows = run_aggregation(AggregationSpec("customer", top_n=1))
+            assert rows == [("Alice", 1500.0)]
+
+            metrics = business_db.pool_metrics()
+            assert metrics["checkouts"] == metrics["checkins"] == 1
+            assert metrics["pool"]["size"] == 2 and metrics["pool"]["checked_out"] == 0
+        finally:
+            business_db.reset()
+    print("PASS: aggregations run on the configured shared engine, with pool metrics")
+
+
+def test_snapshot_matches_sql():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(os.path.join(tmp, "business.db"))
+        saved = analytics_snapshot.SNAPSHOT_PATH
+        analytics_snapshot.SNAPSHOT_PATH = os.path.join(tmp, "business_data.arrow")
+        try:
+            assert analytics_snapshot.refresh(engine) == len(ROWS)
+
+            for spec in [
+                AggregationSpec("customer", top_n=1),
+                AggregationSpec("product", metric="avg"),
+                AggregationSpec("finance_type", field="quantity", filters=(("month", ("January", "March")),)),
+            ]:
+                assert analytics_snapshot.run_aggregation(spec) == run_aggregation(spec, engine)
+        finally:
+            analytics_snapshot.SNAPSHOT_PATH = saved
+            engine.dispose()
+    print("PASS: snapshot aggregations match the SQL path")
+
+
+def test_snapshot_reloads_when_file_changes():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "business.db")
+        engine = make_engine(path)
+        saved = analytics_snapshot.SNAPSHOT_PATH
+        analytics_snapshot.SNAPSHOT_PATH = os.path.join(tmp, "business_data.arrow")
+        try:
+            analytics_snapshot.refresh(engine)
+            spec = AggregationSpec("customer", metric="count")
+            assert "Dave" not in dict(analytics_snapshot.run_aggregation(spec))
+
+            # Another worker rewrites the file; this process must notice
+            conn = sqlite3.connect(path)
+            conn.execute("INSERT INTO business_data VALUES (6, 'Dave', 'cash', 'Lamp', 40.0, 'April', 1)")
+            conn.commit()
+            conn.close()
+            frame, load = analytics_snapshot._frame, analytics_snapshot._load
+            analytics_snapshot._load = lambda: None
+            try:
+                analytics_snapshot.refresh(engine)
+            finally:
+                analytics_snapshot._load = load
+            assert analytics_snapshot._frame is frame
+
+            assert dict(analytics_snapshot.run_aggregation(spec))["Dave"] == 1.0
+            assert len(analytics_snapshot.get_frame()) == len(ROWS) + 1
+        finally:
+            analytics_snapshot.SNAPSHOT_PATH = saved
+            engine.dispose()
+    print("PASS: a snapshot rewritten elsewhere is reloaded on the next aggregation")
+
+
+if __name__ == "__main__":
+    test_incremental_read()
+    test_build_documents()
+    test_shared_engine()
+    test_snapshot_matches_sql()
+    test_snapshot_reloads_when_file_changes()
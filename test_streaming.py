@@ -0,0 +1,100 @@
+import asyncio
+import json
+import threading
+import time
+from app.streaming import coalesced_frames, merge_tokens, dumps
+
+
+def _events(chunks: list) -> list:
+    return [json.loads(part[len("data: "):]) for chunk in chunks for part in chunk.decode().split("\n\n") if part]
+
+
+def _collect(events, **kwargs) -> list:
+    async def run():
+        return [chunk async for chunk in coalesced_frames(events, **kwargs)]
+    return asyncio.run(run())
+
+
+def test_tokens_are_coalesced():
+    def burst():
+        for i in range(50):
+            yield {"type": "token", "content": f"t{i} "}
+        yield {"type": "end", "content": None}
+
+    chunks = _collect(burst(), interval_ms=50)
+    events = _events(chunks)
+    assert len(chunks) < 10 and events[-1] == {"type": "end", "content": None}
+    assert "".join(e["content"] for e in events if e["type"] == "token") == "".join(f"t{i} " for i in range(50))
+
+    per_token = _events(_collect(burst(), interval_ms=0))
+    assert len([e for e in per_token if e["type"] == "token"]) == 50
+    print("PASS: a token burst becomes a few frames with the same text")
+
+
+def test_size_window_and_control_events_flush_early():
+    def slow():
+        yield {"type": "token", "content": "x" * 20}
+        time.sleep(0.2)
+        yield {"type": "error", "content": "boom"}
+        yield {"type": "end", "content": None}
+
+    start = time.perf_counter()
+    chunks = _collect(slow(), interval_ms=10000, max_chars=10)
+    assert time.perf_counter() - start < 2
+    assert _events(chunks) == [
+        {"type": "token", "content": "x" * 20},
+        {"type": "error", "content": "boom"},
+        {"type": "end", "content": None},
+    ]
+    print("PASS: full buffers and control events are not held for the window")
+
+
+def test_iterator_errors_become_events():
+    def broken():
+        yield {"type": "token", "content": "a"}
+        raise RuntimeError("llm down")
+
+    assert _events(_collect(broken(), interval_ms=5)) == [
+        {"type": "token", "content": "a"},
+        {"type": "error", "content": "llm down"},
+        {"type": "end", "content": None},
+    ]
+    assert merge_tokens([{"type": "start"}, {"type": "token", "content": "a"}, {"type": "token", "content": "b"}]) == [
+        {"type": "start"}, {"type": "token", "content": "ab"},
+    ]
+    assert json.loads(dumps({1: "é"})) == {"1": "é"}
+    print("PASS: a failing token source ends the stream with an error event")
+
+
+def test_async_sources_need_no_thread():
+    async def tokens():
+        for i in range(20):
+            await asyncio.sleep(0.001)
+            yield {"type": "token", "content": f"t{i} "}
+        yield {"type": "end", "content": None}
+
+    async def broken():
+        yield {"type": "token", "content": "a"}
+        raise RuntimeError("llm down")
+
+    threads = threading.active_count()
+    per_token = _events(_collect(tokens(), interval_ms=0))
+    coalesced = _collect(tokens(), interval_ms=50)
+    assert threading.active_count() == threads
+    assert len(per_token) == 21 and len(coalesced) < 5
+    assert "".join(e["content"] for e in _events(coalesced) if e["type"] == "token") == "".join(f"t{i} " for i in range(20))
+
+    for interval in (0, 5):
+        assert _events(_collect(broken(), interval_ms=interval)) == [
+            {"type": "token", "content": "a"},
+            {"type": "error", "content": "llm down"},
+            {"type": "end", "content": None},
+        ]
+    print("PASS: async token sources stream per token or coalesced on the event loop")
+
+
+if __name__ == "__main__":
+    test_tokens_are_coalesced()
+    test_size_window_and_control_events_flush_early()
+    test_iterator_errors_become_events()
+    test_async_sources_need_no_thread()
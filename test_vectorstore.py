@@ -0,0 +1,68 @@
+import os
+from app import vectorstore, source_registry, dedup
+from vectorstore_fixture import temp_store
+
+
+def _keyword_texts() -> set:
+    return {doc.page_content for doc in vectorstore.get_keyword_index().docs.values()}
+
+
+def test_replace_delete_refcounts_and_compaction():
+    with temp_store(dedup_mode="link"):
+        shared = "quarterly travel policy covers flights hotels and meals for all staff members"
+        vectorstore.upsert_sources(["file:a", "file:a"], [shared, "alpha only text about laptops"], [{}, {}], persist=False)
+        vectorstore.upsert_sources(["file:b"], [shared], [{}], persist=False)
+        shared_id = source_registry.sources["file:a"][0]
+        assert source_registry.sources["file:b"] == [shared_id] and source_registry._refs[shared_id] == 2
+
+        # Replacing a source tombstones only the chunks nobody else uses
+        vectorstore.replace_source("file:a", ["alpha revised text about monitors"], persist=False)
+        assert shared_id not in source_registry.tombstones and len(source_registry.tombstones) == 1
+        assert _keyword_texts() == {shared, "alpha revised text about monitors"}
+
+        assert vectorstore.delete_source("file:b", persist=False) == 1
+        assert shared_id in source_registry.tombstones and len(source_registry.tombstones) == 2
+        assert _keyword_texts() == {"alpha revised text about monitors"}
+        hits = vectorstore.get_vectorstore().similarity_search(
+            shared, k=4, filter=source_registry.is_live, fetch_k=20
+        )
+        assert [doc.page_content for doc in hits] == ["alpha revised text about monitors"]
+
+        # Compaction drops the tombstoned vectors and persists the result
+        assert vectorstore.get_vectorstore().index.ntotal == 3
+        assert vectorstore.compact_vectorstore(force=True)
+        db = vectorstore.get_vectorstore()
+        assert db.index.ntotal == 1 and not source_registry.tombstones
+        assert list(db.docstore._dict) == list(db.index_to_docstore_id.values())
+        assert os.path.exists(os.path.join(vectorstore.VECTOR_DIR, "index.faiss"))
+        assert not vectorstore.compact_vectorstore(force=True)
+    print("PASS: shared chunks survive until their last source goes; compaction drops tombstones")
+
+
+def test_failed_write_leaves_no_minhash_signature():
+    text = "expense reports are due within thirty days of returning from any approved business trip"
+    with temp_store():
+        embeddings = vectorstore.embeddings
+
+        class FailingEmbeddings(type(embeddings)):
+            def embed_documents(self, texts):
+                raise RuntimeError("embedding service down")
+
+        vectorstore.embeddings = FailingEmbeddings()
+        try:
+            vectorstore.upsert_sources(["file:a"], [text], [{}], persist=False)
+            assert False, "expected the embedding failure to propagate"
+        except RuntimeError:
+            pass
+        assert dedup.signatures == {} and "file:a" not in source_registry.sources
+
+        # The retry is indexed, not linked to a chunk that was never stored
+        vectorstore.embeddings = embeddings
+        stored = vectorstore.upsert_sources(["file:a"], [text], [{}], persist=False)
+        assert list(dedup.signatures) == stored and stored[0] in vectorstore.get_vectorstore().docstore._dict
+    print("PASS: a failed vectorstore write does not leave a canonical MinHash signature")
+
+
+if __name__ == "__main__":
+    test_replace_delete_refcounts_and_compaction()
+    test_failed_write_leaves_no_minhash_signature()
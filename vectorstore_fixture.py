@@ -0,0 +1,45 @@
+"""Offline, throwaway vectorstore for the tests: no model download, nothing under data/"""
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from app import vectorstore, source_registry, dedup
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic offline embeddings, so the test never loads a model"""
+
+    def _vector(self, text: str) -> list:
+        rng = np.random.default_rng(int(hashlib.md5(text.encode()).hexdigest()[:8], 16))
+        return rng.standard_normal(16).tolist()
+
+    def embed_documents(self, texts: list) -> list:
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> list:
+        return self._vector(text)
+
+
+@contextmanager
+def temp_store(dedup_mode: str = None):
+    """Point the vectorstore, registry and MinHash index at an empty temp dir"""
+    saved = (vectorstore.VECTOR_DIR, source_registry.REGISTRY_PATH, dedup.INDEX_PATH, vectorstore.embeddings, dedup.DEDUP_MODE)
+    with tempfile.TemporaryDirectory() as tmp:
+        vectorstore.VECTOR_DIR = os.path.join(tmp, "faiss_index")
+        source_registry.REGISTRY_PATH = os.path.join(vectorstore.VECTOR_DIR, "sources.json")
+        dedup.INDEX_PATH = os.path.join(vectorstore.VECTOR_DIR, "minhash.pkl")
+        vectorstore.embeddings = HashEmbeddings()
+        vectorstore.vector_db = vectorstore.keyword_index = None
+        source_registry.sources, source_registry.tombstones, source_registry._refs = {}, set(), {}
+        source_registry._loaded = True
+        dedup.signatures, dedup.buckets = {}, {}
+        dedup._loaded = True
+        dedup.DEDUP_MODE = dedup_mode or dedup.DEDUP_MODE
+        try:
+            yield tmp
+        finally:
+            (vectorstore.VECTOR_DIR, source_registry.REGISTRY_PATH, dedup.INDEX_PATH,
+             vectorstore.embeddings, dedup.DEDUP_MODE) = saved
+            vectorstore.vector_db = vectorstore.keyword_index = None